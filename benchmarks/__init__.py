@@ -0,0 +1,4 @@
+"""Offline benchmarks against local stand-ins for the Data API and media host
+
+See benchmarks.run for usage. Nothing here is imported by ytdl.
+"""
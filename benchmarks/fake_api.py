@@ -0,0 +1,190 @@
+"""Local stand-in for the YouTube Data API v3
+
+Serves /youtube/v3/search and /youtube/v3/videos with deterministic
+results, so SearchClient and DetailsFetcher can be measured without a
+network or quota. Point the tool at it with
+
+    YOUTUBE_API_BASE_URL=http://127.0.0.1:PORT/youtube/v3
+
+Latency, transient errors (429/503) and a quota limit (403
+quotaExceeded once the units are used up) are configurable.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Same costs as ytdl.api.ENDPOINT_COSTS
+COSTS = {'search': 100, 'videos': 1}
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer that does not print clients dropping their connection"""
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def video_id_for(*parts):
+    """Deterministic 11-character video ID"""
+    digest = hashlib.sha1('/'.join(map(str, parts)).encode('utf-8')).digest()
+    return base64.urlsafe_b64encode(digest).decode('ascii')[:11]
+
+
+class FakeApiServer:
+    """Threaded HTTP server answering search and videos requests
+
+    Each query returns up to total_results videos across pages. Queries
+    that share words overlap, so batch searches see duplicates the way
+    they do against the real API.
+    """
+    def __init__(self, host='127.0.0.1', port=0, latency=0.02, jitter=0.01, error_rate=0.0,
+                 quota_limit=None, total_results=500, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_limit = quota_limit
+        self.total_results = total_results
+        self.quota_used = 0
+        self.requests = {'search': 0, 'videos': 0}
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = QuietHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/youtube/v3"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        with self._lock:
+            return {'requests': dict(self.requests), 'errors': self.errors, 'quota_used': self.quota_used}
+
+    def respond(self, endpoint, params):
+        """Return (status, body) for one request"""
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+            error_status = self._random.choice((429, 503))
+            cost = COSTS.get(endpoint, 1)
+            over_quota = self.quota_limit is not None and self.quota_used + cost > self.quota_limit
+            if endpoint in self.requests:
+                self.requests[endpoint] += 1
+            if fail or over_quota:
+                self.errors += 1
+            else:
+                self.quota_used += cost
+        time.sleep(delay)
+        if over_quota:
+            return 403, error_body(403, 'quotaExceeded')
+        if fail:
+            return error_status, error_body(error_status, 'rateLimitExceeded' if error_status == 429 else 'backendError')
+        if endpoint == 'search':
+            return 200, self.search(params)
+        if endpoint == 'videos':
+            return 200, self.videos(params)
+        return 404, error_body(404, 'notFound')
+
+    def search(self, params):
+        query = params.get('q', '')
+        page_size = min(50, int(params.get('maxResults', 5)))
+        start = int(params.get('pageToken') or 0)
+        end = min(start + page_size, self.total_results)
+        words = query.split() or ['']
+        items = []
+        for index in range(start, end):
+            # Alternate between IDs owned by the whole query and by its first word
+            owner = query if index % 2 else words[0]
+            video_id = video_id_for(owner, index)
+            items.append({
+                'kind': 'youtube#searchResult',
+                'id': {'kind': 'youtube#video', 'videoId': video_id},
+                'snippet': {
+                    'publishedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1500000000 + index * 86400)),
+                    'title': f"{query} #{index}",
+                    'channelTitle': f"channel {index % 17}",
+                },
+            })
+        data = {'kind': 'youtube#searchListResponse', 'items': items}
+        if end < self.total_results:
+            data['nextPageToken'] = str(end)
+        return data
+
+    def videos(self, params):
+        items = []
+        for video_id in filter(None, params.get('id', '').split(',')):
+            seed = int(hashlib.sha1(video_id.encode('utf-8')).hexdigest()[:8], 16)
+            items.append({
+                'id': video_id,
+                'contentDetails': {'duration': f"PT{seed % 3}H{seed % 60}M{seed % 59}S"},
+                'statistics': {'viewCount': str(seed % 2000000)},
+            })
+        return {'kind': 'youtube#videoListResponse', 'items': items}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                endpoint = parsed.path.rstrip('/').rsplit('/', 1)[-1]
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                status, data = server.respond(endpoint, params)
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def error_body(code, reason):
+    return {'error': {'code': code, 'message': reason, 'errors': [{'reason': reason}]}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake YouTube Data API server")
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds added to every response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered 429/503")
+    parser.add_argument('--quota', type=int, help="quota units before every request gets quotaExceeded")
+    args = parser.parse_args()
+    server = FakeApiServer(port=args.port, latency=args.latency, error_rate=args.error_rate,
+                           quota_limit=args.quota).start()
+    print(f"YOUTUBE_API_BASE_URL={server.base_url}")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Local media host for download benchmarks
+
+Serves synthetic media files that yt-dlp's generic extractor treats as
+direct links (by Content-Type), plus RSS feeds listing them, which the
+generic extractor turns into playlists:
+
+    /media/<name>.m4a    audio/mp4
+    /media/<name>.mp4    video/mp4
+    /feed/<name>.xml     RSS feed with `entries` items
+
+Every name serves the same bytes, so any number of distinct "videos" can
+be downloaded. Range requests are supported and an optional bandwidth
+limit per connection makes transfer time realistic. When ffmpeg is on
+PATH the files are real (sine tone, test pattern) so the transcode stage
+has work to do; otherwise they are random bytes.
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from xml.sax.saxutils import escape
+
+from benchmarks.fake_api import QuietHTTPServer
+
+CONTENT_TYPES = {'m4a': 'audio/mp4', 'mp4': 'video/mp4'}
+WRITE_SIZE = 64 * 1024
+
+
+def make_media(ext, seconds=30, size=4 * 1024 * 1024, seed=0):
+    """Return the bytes of one synthetic file, encoded with ffmpeg when available"""
+    if shutil.which('ffmpeg'):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, f'media.{ext}')
+            inputs = ['-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}']
+            if ext == 'mp4':
+                inputs = ['-f', 'lavfi', '-i', f'testsrc=duration={seconds}:size=640x360:rate=25'] + inputs
+            result = subprocess.run(['ffmpeg', '-y', '-loglevel', 'error'] + inputs + ['-shortest', path],
+                                    stdin=subprocess.DEVNULL, capture_output=True)
+            if result.returncode == 0 and os.path.exists(path) and os.path.getsize(path) > 1024:
+                with open(path, 'rb') as f:
+                    return f.read()
+    return random.Random(seed).randbytes(size)
+
+
+class MediaServer:
+    """Threaded HTTP server for synthetic media files and RSS feeds"""
+    def __init__(self, host='127.0.0.1', port=0, seconds=30, size=4 * 1024 * 1024, bandwidth=None, entries=100):
+        self.bandwidth = bandwidth
+        self.entries = entries
+        self.files = {ext: make_media(ext, seconds, size) for ext in CONTENT_TYPES}
+        self.bytes_sent = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = QuietHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def media_url(self, name, ext='m4a'):
+        return f"{self.base_url}/media/{name}.{ext}"
+
+    def feed_url(self, name):
+        return f"{self.base_url}/feed/{name}.xml"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def feed(self, name, ext='m4a'):
+        items = ''.join(
+            f"<item><title>{escape(name)} {index}</title><guid>{escape(name)}-{index:05d}</guid>"
+            f"<enclosure url=\"{escape(self.media_url(f'{name}-{index:05d}', ext))}\" type=\"{CONTENT_TYPES[ext]}\"/>"
+            f"</item>"
+            for index in range(self.entries)
+        )
+        return (f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><rss version=\"2.0\"><channel>"
+                f"<title>{escape(name)}</title>{items}</channel></rss>").encode('utf-8')
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes
+            disable_nagle_algorithm = True
+
+            def do_HEAD(self):
+                self.serve(send_body=False)
+
+            def do_GET(self):
+                self.serve(send_body=True)
+
+            def serve(self, send_body):
+                with server._lock:
+                    server.requests += 1
+                match = re.fullmatch(r'/(media|feed)/([\w.-]+)\.(\w+)', self.path.split('?')[0])
+                if match and match.group(1) == 'feed':
+                    self.send_bytes(200, 'application/rss+xml', server.feed(match.group(2)), send_body)
+                    return
+                if not match or match.group(3) not in CONTENT_TYPES:
+                    self.send_bytes(404, 'text/plain', b'not found', send_body)
+                    return
+                data = server.files[match.group(3)]
+                start, end = 0, len(data) - 1
+                byte_range = re.fullmatch(r'bytes=(\d*)-(\d*)', self.headers.get('Range', ''))
+                if byte_range and any(byte_range.groups()):
+                    first, last = byte_range.groups()
+                    if first:
+                        start, end = int(first), min(int(last or end), end)
+                    else:
+                        start = max(0, len(data) - int(last))
+                    if start > end:
+                        self.send_response(416)
+                        self.send_header('Content-Range', f'bytes */{len(data)}')
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPES[match.group(3)])
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('Content-Length', str(end - start + 1))
+                self.end_headers()
+                if send_body:
+                    self.send_paced(memoryview(data)[start:end + 1])
+
+            def send_bytes(self, status, content_type, body, send_body):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def send_paced(self, view):
+                started = time.monotonic()
+                sent = 0
+                try:
+                    while sent < len(view):
+                        block = view[sent:sent + WRITE_SIZE]
+                        self.wfile.write(block)
+                        sent += len(block)
+                        if server.bandwidth:
+                            ahead = sent / server.bandwidth - (time.monotonic() - started)
+                            if ahead > 0:
+                                time.sleep(ahead)
+                except ConnectionError:
+                    # Extraction only reads the headers and hangs up
+                    pass
+                finally:
+                    with server._lock:
+                        server.bytes_sent += sent
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic media files and RSS feeds")
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--seconds', type=int, default=30, help="length of the generated media")
+    parser.add_argument('--size', type=int, default=4 * 1024 * 1024, help="file size without ffmpeg")
+    parser.add_argument('--bandwidth', type=float, help="bytes per second per connection")
+    parser.add_argument('--entries', type=int, default=100, help="items per RSS feed")
+    args = parser.parse_args()
+    server = MediaServer(port=args.port, seconds=args.seconds, size=args.size, bandwidth=args.bandwidth,
+                         entries=args.entries).start()
+    print(f"media: {server.media_url('example')}  feed: {server.feed_url('example')}")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
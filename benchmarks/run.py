@@ -0,0 +1,305 @@
+"""Offline benchmark harness
+
+Starts the fake Data API (benchmarks.fake_api) and the media host
+(benchmarks.media_server) on localhost, then runs each scenario once per
+worker count, every run in a fresh child process so its peak RSS is its
+own:
+
+    python -m benchmarks.run
+    python -m benchmarks.run --scenario download --workers 1 4 --jobs 40
+    python -m benchmarks.run --save bench.json
+    python -m benchmarks.run --baseline bench.json --tolerance 0.3
+
+Scenarios:
+    search    batch search (SearchClient.iter_matrix) and detail lookups
+    extract   playlist extraction (playlist.extract_many) over RSS feeds
+    download  DownloadScheduler jobs: extract, fetch and transcode stages
+
+With --baseline the run exits with status 1 if a throughput figure drops,
+or peak RSS grows, by more than the tolerance. Children get an empty
+temporary YTDL_DATA_DIR, so every run starts cold and nothing from real
+use is read or written.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ('search', 'extract', 'download')
+# Figure compared against the baseline for each scenario
+THROUGHPUT = {
+    'search': 'searches_per_sec',
+    'extract': 'entries_per_sec',
+    'download': 'mb_per_sec',
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers, 0 when empty"""
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def rate(count, seconds):
+    """Events per second, 0 when nothing was processed (a scenario can fail at once)"""
+    return count / max(seconds, 1e-9) if count else 0
+
+
+def latency_ms(values):
+    return {
+        'p50': round(percentile(values, 0.5) * 1000, 1),
+        'p95': round(percentile(values, 0.95) * 1000, 1),
+        'max': round(max(values, default=0) * 1000, 1),
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process
+
+    ffmpeg is left out: RUSAGE_CHILDREN also counts the parent's memory
+    at fork time, which would hide the real figure.
+    """
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20, 1)
+
+
+def run_search(config, workers):
+    from ytdl.api import ApiClient
+    from ytdl.search import SearchClient
+
+    client = ApiClient('benchmark', base_url=config['api_url'], max_qps=0)
+    search = SearchClient('benchmark', client=client)
+    # Pairs of keywords share their first word, so the fan-out sees duplicates
+    keywords = [f"topic{index // 2} variant{index}" for index in range(config['searches'])]
+    started = time.monotonic()
+    videos = 0
+    for page in search.iter_matrix(keywords, ['ja'], ['beginner'], config['max_results'], workers=workers):
+        videos += len(page)
+    elapsed = time.monotonic() - started
+    search.details.close()
+
+    by_endpoint = {}
+    for entry in client.recent:
+        by_endpoint.setdefault(entry['endpoint'], []).append(entry['latency'])
+    stats = client.stats()
+    return {
+        'searches': len(keywords),
+        'videos': videos,
+        'seconds': round(elapsed, 3),
+        'searches_per_sec': round(rate(len(keywords), elapsed), 2),
+        'videos_per_sec': round(rate(videos, elapsed), 1),
+        'search_ms': latency_ms(by_endpoint.get('search', [])),
+        'videos_ms': latency_ms(by_endpoint.get('videos', [])),
+        'details': search.details.stats(),
+        'requests': stats['requests'],
+        'retries': stats['retries'],
+        'errors': stats['errors'],
+    }
+
+
+def run_extract(config, workers, output_dir):
+    from ytdl import playlist
+
+    urls = [f"{config['media_url']}/feed/feed{index}.xml" for index in range(config['feeds'])]
+    started = time.monotonic()
+    results = playlist.extract_many(urls, output_dir, max_workers=workers)
+    elapsed = time.monotonic() - started
+    entries = sum(count for _, _, count, _ in results)
+    errors = [str(error) for _, _, _, error in results if error]
+    return {
+        'feeds': len(urls),
+        'entries': entries,
+        'seconds': round(elapsed, 3),
+        'entries_per_sec': round(rate(entries, elapsed), 1),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+    }
+
+
+def run_download(config, workers, output_dir):
+    from ytdl.downloader import DownloadJob, DownloadScheduler
+
+    ext = 'mp4' if config['format'] == 'mp4' else 'm4a'
+    fetched = {}
+
+    def on_progress(job, d):
+        if d.get('status') == 'finished':
+            fetched[job.id] = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+
+    scheduler = DownloadScheduler(output_dir, max_workers=workers, on_progress=on_progress)
+    started = time.monotonic()
+    jobs = [scheduler.submit(f"{config['media_url']}/media/job{index:05d}.{ext}", config['format'])
+            for index in range(config['jobs'])]
+    scheduler.wait()
+    elapsed = time.monotonic() - started
+    scheduler.shutdown()
+
+    done = [job for job in jobs if job.state == DownloadJob.DONE]
+    failed = [job for job in jobs if job.state == DownloadJob.FAILED]
+    # Bytes fetched, not output size, so a copy and a transcode compare fairly
+    total_bytes = sum(fetched.get(job.id, 0) for job in done)
+    return {
+        'jobs': len(jobs),
+        'done': len(done),
+        'failed': len(failed),
+        'first_error': failed[0].error if failed else None,
+        'seconds': round(elapsed, 3),
+        'mb': round(total_bytes / 2 ** 20, 1),
+        'mb_per_sec': round(rate(total_bytes / 2 ** 20, elapsed), 2),
+        'jobs_per_sec': round(rate(len(done), elapsed), 2),
+        'extract_ms': latency_ms([job.extract_seconds for job in done if job.extract_seconds is not None]),
+        'fetch_ms': latency_ms([job.fetch_seconds for job in done if job.fetch_seconds is not None]),
+        'transcode_ms': latency_ms([job.postprocess_seconds for job in done if job.postprocess_seconds is not None]),
+        'postprocess': sorted({job.postprocess for job in done if job.postprocess}),
+    }
+
+
+def run_child(scenario, config, workers):
+    """Run one scenario in this process and print its result as JSON"""
+    sys.path.insert(0, ROOT)
+    with tempfile.TemporaryDirectory() as output_dir:
+        if scenario == 'search':
+            result = run_search(config, workers)
+        elif scenario == 'extract':
+            result = run_extract(config, workers, output_dir)
+        else:
+            result = run_download(config, workers, output_dir)
+    result['rss_mb'] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+def spawn(scenario, config, workers, timeout):
+    """Run a scenario in a child process and return its result dict"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(os.environ, YTDL_DATA_DIR=data_dir,
+                   PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+        command = [sys.executable, '-m', 'benchmarks.run', '--child', scenario,
+                   '--config', json.dumps(config), '--workers', str(workers)]
+        try:
+            completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {'error': f"timed out after {timeout}s"}
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return {'error': (completed.stderr.strip().splitlines() or [f"exit {completed.returncode}"])[-1]}
+    return json.loads(lines[-1])
+
+
+def summary_line(scenario, workers, result):
+    if 'error' in result:
+        return f"{scenario:<9} {workers:>3}  ERROR {result['error']}"
+    rss = f"rss {result['rss_mb']:.0f} MB"
+    if scenario == 'search':
+        return (f"{scenario:<9} {workers:>3}  {result['searches_per_sec']:8.2f} searches/s "
+                f"{result['videos_per_sec']:8.1f} videos/s  search p50/p95 {result['search_ms']['p50']}/"
+                f"{result['search_ms']['p95']} ms  details {result['details']['ids_per_call']} ids/call  {rss}")
+    if scenario == 'extract':
+        return (f"{scenario:<9} {workers:>3}  {result['entries_per_sec']:8.1f} entries/s "
+                f"({result['entries']} entries, {result['errors']} errors)  {rss}")
+    return (f"{scenario:<9} {workers:>3}  {result['mb_per_sec']:8.2f} MB/s {result['jobs_per_sec']:6.2f} jobs/s  "
+            f"extract p50/p95 {result['extract_ms']['p50']}/{result['extract_ms']['p95']} ms  "
+            f"fetch {result['fetch_ms']['p50']}/{result['fetch_ms']['p95']} ms  "
+            f"transcode {result['transcode_ms']['p50']}/{result['transcode_ms']['p95']} ms  "
+            f"({result['done']}/{result['jobs']} done)  {rss}")
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions against a saved baseline"""
+    regressions = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if not before or 'error' in before:
+            continue
+        if 'error' in result:
+            regressions.append(f"{key}: {result['error']}")
+            continue
+        metric = THROUGHPUT[key.split(':')[0]]
+        if result[metric] < before[metric] * (1 - tolerance):
+            regressions.append(f"{key}: {metric} {result[metric]} < {before[metric]} (baseline)")
+        if result['rss_mb'] > before['rss_mb'] * (1 + tolerance):
+            regressions.append(f"{key}: rss_mb {result['rss_mb']} > {before['rss_mb']} (baseline)")
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description=__doc__.split('\n')[0])
+    parser.add_argument('--scenario', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8])
+    parser.add_argument('--searches', type=int, default=24, help="searches per search run")
+    parser.add_argument('--max-results', type=int, default=100, help="results per search")
+    parser.add_argument('--feeds', type=int, default=8, help="playlists per extract run")
+    parser.add_argument('--entries', type=int, default=200, help="entries per playlist")
+    parser.add_argument('--jobs', type=int, default=48, help="downloads per download run")
+    parser.add_argument('--format', choices=('audio', 'mp3', 'mp4'), default='audio')
+    parser.add_argument('--api-latency', type=float, default=0.05, help="seconds per fake API response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of API responses that are 429/503")
+    parser.add_argument('--media-seconds', type=int, default=60, help="length of the synthetic media")
+    parser.add_argument('--media-size', type=int, default=4 * 2 ** 20, help="file size when ffmpeg is missing")
+    parser.add_argument('--bandwidth', type=float, help="media bytes per second per connection")
+    parser.add_argument('--timeout', type=float, default=600, help="seconds allowed per run")
+    parser.add_argument('--save', metavar='PATH', help="write the results as JSON")
+    parser.add_argument('--baseline', metavar='PATH', help="compare with results saved by --save")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument('--child', choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument('--config', help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.child:
+        run_child(args.child, json.loads(args.config), args.workers[0])
+        return 0
+
+    from benchmarks.fake_api import FakeApiServer
+    from benchmarks.media_server import MediaServer
+
+    api = FakeApiServer(latency=args.api_latency, error_rate=args.error_rate).start()
+    media = MediaServer(seconds=args.media_seconds, size=args.media_size, bandwidth=args.bandwidth,
+                        entries=args.entries).start()
+    config = {
+        'api_url': api.base_url,
+        'media_url': media.base_url,
+        'searches': args.searches,
+        'max_results': args.max_results,
+        'feeds': args.feeds,
+        'jobs': args.jobs,
+        'format': args.format,
+    }
+    print(f"media: {len(media.files['m4a']) / 2 ** 20:.1f} MB m4a, {len(media.files['mp4']) / 2 ** 20:.1f} MB mp4; "
+          f"API latency {args.api_latency * 1000:.0f} ms; python {sys.version.split()[0]}")
+    results = {}
+    try:
+        for scenario in args.scenario:
+            for workers in args.workers:
+                result = spawn(scenario, config, workers, args.timeout)
+                results[f"{scenario}:{workers}"] = result
+                print(summary_line(scenario, workers, result), flush=True)
+    finally:
+        api.stop()
+        media.stop()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 1 if any('error' in result for result in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,7 @@
+"""YouTube downloader engine
+
+Search, playlist extraction, download and transcode logic shared by the
+Tk GUI (ytdl.gui) and the command line interface (ytdl.cli). Nothing in
+this package imports tkinter except ytdl.gui, and heavy dependencies such
+as yt_dlp and requests are imported on first use.
+"""
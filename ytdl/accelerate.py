@@ -0,0 +1,282 @@
+"""Accelerated MP4 downloads
+
+Opt-in path for long videos. The video and audio formats picked by the
+mp4 format selector are fetched at the same time instead of one after
+the other. Plain HTTP formats are split into parallel byte-range
+requests that are written straight to their offset in a preallocated
+.part file; finished ranges are listed in a .part.ranges file next to
+it, so an interrupted download resumes where it stopped. Fragmented
+(DASH/HLS) formats go through yt-dlp with concurrent fragment
+downloads. The two files are then muxed with `ffmpeg -c copy`, which
+streams and never holds a whole file in memory.
+"""
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DEFAULT_SEGMENTS = 8
+DEFAULT_CHUNK_SIZE = 10 * 1024 * 1024
+# Attempts per byte range before the whole download fails
+RANGE_RETRIES = 3
+READ_SIZE = 256 * 1024
+RANGES_SUFFIX = '.ranges'
+
+
+class SegmentedDownloadError(Exception):
+    """Raised when a byte-range download cannot be completed"""
+
+
+def parse_size(value):
+    """Parse a size such as 10M, 512K or 1048576 into bytes"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kmg]?)i?b?\s*', str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"invalid size: {value}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** ' kmg'.index(unit.lower() or ' '))
+
+
+def probe_size(session, url, headers, timeout):
+    """Return the size of url from a one-byte range request, or None"""
+    response = session.get(url, headers={**headers, 'Range': 'bytes=0-0'}, timeout=timeout, stream=True)
+    with response:
+        match = re.search(r'/(\d+)$', response.headers.get('Content-Range', ''))
+        if response.status_code == 206 and match:
+            return int(match.group(1))
+    return None
+
+
+def read_finished_ranges(part_path, chunk_size, size=None):
+    """Return (size, starts) for the ranges an interrupted fetch_segmented finished
+
+    starts is empty unless the .part file, its .ranges file and the size
+    and chunk size they were written with all match.
+    """
+    try:
+        with open(part_path + RANGES_SUFFIX) as f:
+            # Only complete lines count; the last one may have been cut off
+            header, *lines, _ = f.read().split('\n')
+        recorded_size, recorded_chunk = (int(value) for value in header.split())
+        starts = {int(line) for line in lines}
+        if (recorded_chunk != chunk_size or size not in (None, recorded_size)
+                or os.path.getsize(part_path) != recorded_size):
+            return size, set()
+    except (OSError, ValueError):
+        return size, set()
+    return recorded_size, {start for start in starts if 0 <= start < recorded_size and start % chunk_size == 0}
+
+
+def finished_bytes(size, starts, chunk_size):
+    return sum(min(start + chunk_size, size) - start for start in starts)
+
+
+def fetch_segmented(url, path, size=None, headers=None, segments=DEFAULT_SEGMENTS, chunk_size=DEFAULT_CHUNK_SIZE,
+                    on_progress=None, stop_event=None, timeout=(5, 30)):
+    """Download url into path using `segments` parallel range requests
+
+    The file is cut into chunk_size ranges that the segment threads take
+    in order. Ranges finished by an earlier, interrupted call are skipped.
+    on_progress(downloaded, total) is called as data arrives; an
+    exception raised from it (or stop_event being set) aborts every
+    segment. Returns False if the server does not support ranges.
+    """
+    import requests
+
+    headers = dict(headers or {})
+    stop_event = stop_event or threading.Event()
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=segments)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        part_path = path + '.part'
+        ranges_path = part_path + RANGES_SUFFIX
+        size, finished = read_finished_ranges(part_path, chunk_size, size)
+        if size is None:
+            size = probe_size(session, url, headers, timeout)
+        if not size:
+            return False
+
+        if not finished:
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+            with open(ranges_path, 'w') as log:
+                log.write(f"{size} {chunk_size}\n")
+
+        ranges = iter([(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)
+                       if start not in finished])
+        lock = threading.Lock()
+        downloaded = [finished_bytes(size, finished, chunk_size)]
+
+        def report(count):
+            with lock:
+                downloaded[0] += count
+                done = downloaded[0]
+            if on_progress:
+                on_progress(done, size)
+
+        def fetch_range(f, start, end):
+            """Fetch one range; a retry continues from the last byte written"""
+            offset = start
+            for attempt in range(RANGE_RETRIES):
+                try:
+                    response = session.get(url, headers={**headers, 'Range': f'bytes={offset}-{end}'},
+                                           timeout=timeout, stream=True)
+                    with response:
+                        if response.status_code != 206:
+                            raise SegmentedDownloadError(f"HTTP {response.status_code} for range {offset}-{end}")
+                        f.seek(offset)
+                        for block in response.iter_content(READ_SIZE):
+                            if stop_event.is_set():
+                                return False
+                            block = block[:end + 1 - offset]
+                            f.write(block)
+                            offset += len(block)
+                            report(len(block))
+                    if offset > end:
+                        f.flush()
+                        return True
+                    raise SegmentedDownloadError(f"short read for range {start}-{end}")
+                except (requests.RequestException, SegmentedDownloadError):
+                    if attempt == RANGE_RETRIES - 1:
+                        raise
+
+        def segment_worker():
+            try:
+                with open(part_path, 'r+b') as f, open(ranges_path, 'a') as log:
+                    while not stop_event.is_set():
+                        with lock:
+                            chunk = next(ranges, None)
+                        if chunk is None:
+                            return
+                        if fetch_range(f, *chunk):
+                            with lock:
+                                log.write(f"{chunk[0]}\n")
+                                log.flush()
+            except BaseException:
+                stop_event.set()
+                raise
+
+        report(0)
+        with ThreadPoolExecutor(max_workers=max(1, segments)) as pool:
+            futures = [pool.submit(segment_worker) for _ in range(max(1, segments))]
+            for future in futures:
+                future.result()
+        if stop_event.is_set():
+            raise SegmentedDownloadError("download stopped")
+
+    os.replace(part_path, path)
+    os.remove(ranges_path)
+    return True
+
+
+def merge_av(video_path, audio_path, output_path, on_start=None):
+    """Mux a video-only and an audio-only file with ffmpeg stream copy"""
+    process = subprocess.Popen(
+        ['ffmpeg', '-y', '-loglevel', 'error', '-i', video_path, '-i', audio_path,
+         '-map', '0:v:0', '-map', '1:a:0', '-c', 'copy', output_path],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    if on_start:
+        on_start(process)
+    _, stderr = process.communicate()
+    if process.returncode != 0:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        message = stderr.decode('utf-8', 'replace').strip() or f"ffmpeg exited with code {process.returncode}"
+        raise RuntimeError(message)
+    os.remove(video_path)
+    os.remove(audio_path)
+    return output_path
+
+
+def download_accelerated(ydl, info, progress_hook, segments=DEFAULT_SEGMENTS, chunk_size=DEFAULT_CHUNK_SIZE,
+                         on_merge=None):
+    """Download the formats selected in info in parallel and merge them
+
+    ydl is the YoutubeDL that extracted info (with download=False).
+    progress_hook gets one combined progress dict for all formats; an
+    exception raised from it aborts the download. on_merge(process) is
+    called with the running ffmpeg process. Returns the output path.
+    """
+    import yt_dlp
+
+    output_path = ydl.prepare_filename(info)
+    if os.path.exists(output_path):
+        return output_path
+
+    formats = info.get('requested_formats') or [info]
+    base = os.path.splitext(output_path)[0]
+    paths = [output_path] if len(formats) == 1 else [f"{base}.f{fmt['format_id']}.{fmt['ext']}" for fmt in formats]
+
+    stop_event = threading.Event()
+    lock = threading.Lock()
+    progress = [[0, fmt.get('filesize')] for fmt in formats]
+    errors = []
+    # Data already on disk is reported up front, before any new bytes
+    for index, path in enumerate(paths):
+        if os.path.exists(path):
+            progress[index][0] = os.path.getsize(path)
+        else:
+            size, starts = read_finished_ranges(path + '.part', chunk_size, progress[index][1])
+            progress[index][0] = finished_bytes(size, starts, chunk_size)
+    progress_hook({'status': 'downloading', 'downloaded_bytes': sum(entry[0] for entry in progress),
+                   'total_bytes': None, 'info_dict': info})
+
+    def on_format_progress(index, downloaded, total):
+        if stop_event.is_set():
+            raise yt_dlp.utils.DownloadCancelled()
+        with lock:
+            progress[index] = [downloaded, total or progress[index][1]]
+            done = sum(entry[0] for entry in progress)
+            totals = [entry[1] for entry in progress]
+        progress_hook({
+            'status': 'downloading',
+            'downloaded_bytes': done,
+            'total_bytes': sum(totals) if all(totals) else None,
+            'info_dict': info,
+        })
+
+    def fetch(index):
+        fmt, path = formats[index], paths[index]
+        if os.path.exists(path):
+            size = os.path.getsize(path)
+            on_format_progress(index, size, size)
+            return
+        try:
+            if fmt.get('protocol') in ('http', 'https') and segments > 1:
+                done = fetch_segmented(
+                    fmt['url'], path, size=fmt.get('filesize'), headers=fmt.get('http_headers'),
+                    segments=segments, chunk_size=chunk_size, stop_event=stop_event,
+                    on_progress=lambda downloaded, total: on_format_progress(index, downloaded, total),
+                )
+                if done:
+                    return
+
+            def hook(d):
+                if d.get('status') == 'downloading':
+                    on_format_progress(index, d.get('downloaded_bytes') or 0,
+                                       d.get('total_bytes') or d.get('total_bytes_estimate'))
+
+            # Fragmented formats, and servers without range support
+            with yt_dlp.YoutubeDL({**ydl.params, 'progress_hooks': [hook]}) as format_ydl:
+                if not format_ydl.dl(path, dict(fmt)):
+                    raise SegmentedDownloadError(f"could not download format {fmt.get('format_id')}")
+        except BaseException as e:
+            # Only the first failure matters; the other format is stopped because of it
+            with lock:
+                if not stop_event.is_set():
+                    errors.append(e)
+                stop_event.set()
+            raise
+
+    with ThreadPoolExecutor(max_workers=len(formats)) as pool:
+        wait([pool.submit(fetch, index) for index in range(len(formats))])
+    if errors:
+        raise errors[0]
+
+    progress_hook({'status': 'finished', 'downloaded_bytes': sum(entry[0] for entry in progress),
+                   'info_dict': info})
+    if len(formats) > 1:
+        merge_av(paths[0], paths[1], output_path, on_merge)
+    return output_path
@@ -0,0 +1,245 @@
+"""Adaptive worker counts
+
+A fixed number of workers either leaves bandwidth unused or is high
+enough to get throttled. AimdController moves the limit of a pool at
+runtime, additive-increase / multiplicative-decrease style. Every
+interval it looks at the work done (bytes, URLs or videos per second),
+the speed of the jobs that finished and the errors seen, and then:
+
+- halves the limit when throttling shows up (HTTP 429/403, rate limits,
+  bot checks, API retries) or too many jobs fail,
+- adds one worker when every worker is busy and the last increase
+  raised throughput,
+- takes the last increase back when it did not,
+- and leaves the limit alone while the pool has spare workers.
+
+Each decision goes to the `ytdl.adaptive` logger (changes at INFO,
+holds at DEBUG) and to on_decision, which the CLI and GUI use to write
+it to metrics.jsonl.
+"""
+import collections
+import contextlib
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 5.0
+DEFAULT_MAXIMUM = 16
+# Throughput gain an increase has to bring to be kept
+MIN_GAIN = 0.05
+# Share of finished jobs that may fail before the limit is cut
+MAX_FAILURE_RATE = 0.2
+# Intervals to wait after a cut or a reverted increase before probing again
+SETTLE_INTERVALS = 3
+
+THROTTLE_PATTERN = re.compile(
+    r"HTTP Error (?:429|403)|Too Many Requests|rate.?limit|not a bot|HTTP (?:429|503)", re.IGNORECASE)
+
+
+def is_throttling(message):
+    """Return True if an error or warning message means the server is pushing back"""
+    return bool(message) and THROTTLE_PATTERN.search(message) is not None
+
+
+class AimdController:
+    """Concurrency limit for one pool, adjusted from throughput and errors
+
+    A pool with its own workers (DownloadScheduler) is driven through
+    attach(); any other pool holds slot() around each job. error_count
+    is an optional callable returning a running total of throttling
+    errors seen elsewhere, such as ApiClient retries.
+    """
+    def __init__(self, name, initial=3, minimum=1, maximum=DEFAULT_MAXIMUM, interval=DEFAULT_INTERVAL,
+                 on_decision=None, error_count=None):
+        self.name = name
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = min(self.maximum, max(self.minimum, int(initial)))
+        self.interval = interval
+        self.on_decision = on_decision
+        self.error_count = error_count
+        self.decisions = collections.deque(maxlen=200)
+        self._apply = None
+        self._demand = None
+        self._lock = threading.Lock()
+        self._slots = threading.Condition(self._lock)
+        self._active = 0
+        self._waiting = 0
+        self._thread = None
+        self._stop = threading.Event()
+        # Throughput before the last increase, while it is being judged
+        self._baseline = None
+        self._settle = 0
+        self._last_errors = None
+        self._reset_window()
+
+    def attach(self, apply, demand):
+        """Drive a pool that runs its own workers
+
+        apply(limit) resizes the pool and demand() returns the number of
+        jobs running or waiting in it.
+        """
+        self._apply = apply
+        self._demand = demand
+        apply(self.limit)
+
+    def set_bounds(self, minimum=None, maximum=None):
+        """Change the range the limit moves in, clamping the current limit"""
+        with self._lock:
+            if minimum is not None:
+                self.minimum = max(1, int(minimum))
+            if maximum is not None:
+                self.maximum = max(self.minimum, int(maximum))
+            limit = min(self.maximum, max(self.minimum, self.limit))
+        self._set_limit(limit)
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold one of `limit` slots while a job runs"""
+        with self._slots:
+            self._waiting += 1
+            while self._active >= self.limit:
+                self._slots.wait()
+            self._waiting -= 1
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._slots:
+                self._active -= 1
+                self._slots.notify()
+
+    def record(self, units):
+        """Count work done: bytes received, URLs written, videos found"""
+        with self._lock:
+            self._units += units
+
+    def record_job(self, ok, units=0, seconds=None, error=None):
+        """Count a finished job, with its size and duration when it succeeded"""
+        with self._lock:
+            self._finished += 1
+            if not ok:
+                self._failed += 1
+                if is_throttling(error):
+                    self._throttled += 1
+            elif units and seconds:
+                self._job_speeds.append(units / seconds)
+
+    def record_warning(self, message):
+        """Count a retry or warning (e.g. from yt-dlp) if it is a sign of throttling"""
+        if is_throttling(message):
+            with self._lock:
+                self._throttled += 1
+
+    def start(self):
+        """Start adjusting every interval; does nothing if already running"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._reset_window()
+            self._thread = threading.Thread(target=self._run, name=f"aimd-{self.name}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def tick(self):
+        """Take one decision from the interval that just ended and return it"""
+        now = time.monotonic()
+        with self._lock:
+            elapsed = max(now - self._window_start, 1e-9)
+            throughput = self._units / elapsed
+            throttled = self._throttled
+            finished = self._finished
+            failed = self._failed
+            speeds = sorted(self._job_speeds)
+            self._reset_window(now)
+            busy = self._demand() if self._demand is not None else self._active + self._waiting
+        if self.error_count is not None:
+            total = self.error_count()
+            if self._last_errors is not None:
+                throttled += max(0, total - self._last_errors)
+            self._last_errors = total
+
+        limit = self.limit
+        if throttled or (finished >= 4 and failed > finished * MAX_FAILURE_RATE):
+            action, new_limit = 'decrease', max(self.minimum, limit // 2)
+            reason = f"{throttled} throttling errors, {failed}/{finished} jobs failed"
+            self._baseline = None
+            self._settle = SETTLE_INTERVALS
+        elif self._settle:
+            self._settle -= 1
+            action, new_limit, reason = 'hold', limit, "settling after the last change"
+        elif self._baseline is not None and throughput < self._baseline * (1 + MIN_GAIN):
+            action, new_limit = 'revert', max(self.minimum, limit - 1)
+            reason = f"last increase did not pay off ({self._baseline:.0f} -> {throughput:.0f}/s)"
+            self._baseline = None
+            self._settle = SETTLE_INTERVALS
+        elif busy < limit:
+            action, new_limit, reason = 'hold', limit, f"{busy} of {limit} workers needed"
+            self._baseline = None
+        elif limit < self.maximum:
+            action, new_limit, reason = 'increase', limit + 1, "all workers busy"
+            self._baseline = throughput
+        else:
+            action, new_limit, reason = 'hold', limit, "at the maximum"
+            self._baseline = None
+
+        decision = {
+            'pool': self.name,
+            'action': action,
+            'limit': new_limit,
+            'previous': limit,
+            'reason': reason,
+            'throughput': round(throughput, 1),
+            'job_speed': round(speeds[len(speeds) // 2], 1) if speeds else None,
+            'busy': busy,
+            'errors': throttled,
+            'failed': failed,
+            'finished': finished,
+        }
+        self.decisions.append(decision)
+        if new_limit != limit:
+            self._set_limit(new_limit)
+            logger.info("%s: %d -> %d workers (%s; %.0f/s)", self.name, limit, new_limit, reason, throughput)
+        else:
+            logger.debug("%s: %d workers (%s; %.0f/s)", self.name, limit, reason, throughput)
+        if self.on_decision:
+            self.on_decision(decision)
+        return decision
+
+    def _set_limit(self, limit):
+        with self._slots:
+            changed = limit != self.limit
+            self.limit = limit
+            self._slots.notify_all()
+        if changed and self._apply is not None:
+            self._apply(limit)
+
+    def _reset_window(self, now=None):
+        # Called with the lock held (or from __init__)
+        self._window_start = now if now is not None else time.monotonic()
+        self._units = 0
+        self._throttled = 0
+        self._finished = 0
+        self._failed = 0
+        self._job_speeds = []
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("%s: adjusting the worker count failed", self.name)
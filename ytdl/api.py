@@ -0,0 +1,218 @@
+"""Shared HTTP client for the YouTube Data API
+
+One pooled requests.Session is reused for every call so repeated requests
+skip the TCP/TLS handshake. Transient failures (connection errors,
+timeouts, 429, 5xx and 403 rate limits) are retried with jittered
+exponential backoff, and token buckets keep the process inside its
+daily quota budget and a requests-per-second limit shared by every
+thread using the client.
+"""
+import collections
+import logging
+import os
+import random
+import threading
+import time
+
+from ytdl import telemetry
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://www.googleapis.com/youtube/v3"
+
+# Quota units charged per call, see
+# https://developers.google.com/youtube/v3/determine_quota_cost
+ENDPOINT_COSTS = {
+    'search': 100,
+    'videos': 1,
+    'playlistItems': 1,
+}
+
+# Span names for the endpoints with a stage of their own
+SPAN_NAMES = {'search': 'search_request', 'videos': 'details_request'}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+QUOTA_REASONS = ('quotaExceeded', 'dailyLimitExceeded')
+
+
+class ApiError(Exception):
+    """Raised when the API keeps failing or refuses the request"""
+
+
+class QuotaExceededError(ApiError):
+    """Raised when the daily quota is used up, locally or on Google's side"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket
+
+    Holds at most capacity tokens and refills at rate tokens per second.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1, max_wait=None):
+        """Take tokens, sleeping until they are available
+
+        Returns False without taking anything if that would mean waiting
+        longer than max_wait seconds.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate if self.rate > 0 else float('inf')
+            if max_wait is not None and wait > max_wait:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def available(self):
+        with self._lock:
+            now = time.monotonic()
+            return min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+
+
+class ApiClient:
+    """Pooled, retrying, quota-limited client for the YouTube Data API"""
+    def __init__(self, api_key, base_url=None, timeout=(5, 20), max_retries=4, backoff=0.5,
+                 quota_per_day=None, max_quota_wait=30, pool_size=16, max_qps=None):
+        self.api_key = api_key
+        self.base_url = (base_url or os.getenv('YOUTUBE_API_BASE_URL') or BASE_URL).rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_quota_wait = max_quota_wait
+        self.pool_size = pool_size
+        quota_per_day = int(quota_per_day or os.getenv('YTDL_QUOTA_PER_DAY', '10000'))
+        self.quota = TokenBucket(quota_per_day / 86400.0, quota_per_day)
+        # 0 turns the request rate limit off
+        max_qps = float(os.getenv('YTDL_API_QPS', '10') if max_qps is None else max_qps)
+        self.rate_limit = TokenBucket(max_qps, max(1.0, max_qps)) if max_qps > 0 else None
+        self.request_count = 0
+        self.retry_count = 0
+        self.error_count = 0
+        self.quota_used = 0
+        self.recent = collections.deque(maxlen=1000)
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def get(self, endpoint, params):
+        """GET an API endpoint (e.g. 'search') and return the decoded JSON"""
+        with telemetry.span(SPAN_NAMES.get(endpoint, 'api_request'), endpoint=endpoint):
+            return self._get(endpoint, params)
+
+    def _get(self, endpoint, params):
+        import requests
+
+        cost = ENDPOINT_COSTS.get(endpoint, 1)
+        if not self.quota.acquire(cost, max_wait=self.max_quota_wait):
+            raise QuotaExceededError(f"Local quota budget exhausted ({self.quota.available():.0f} units left)")
+
+        url = f"{self.base_url}/{endpoint}"
+        params = dict(params, key=self.api_key)
+        start = time.monotonic()
+        retries = 0
+        while True:
+            status = None
+            retry_after = None
+            if self.rate_limit is not None:
+                self.rate_limit.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                status = response.status_code
+                if status == 200:
+                    data = response.json()
+                    self._record(endpoint, start, retries, status, cost)
+                    return data
+                reason = self._error_reason(response)
+                if status == 403 and reason in QUOTA_REASONS:
+                    self._record(endpoint, start, retries, status, cost, failed=True)
+                    raise QuotaExceededError(f"YouTube API quota exceeded ({reason})")
+                transient = status in RETRY_STATUSES or (status == 403 and reason in RATE_LIMIT_REASONS)
+                if not transient:
+                    self._record(endpoint, start, retries, status, cost, failed=True)
+                    response.raise_for_status()
+                error = f"HTTP {status}" + (f" ({reason})" if reason else "")
+                retry_after = response.headers.get('Retry-After')
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = str(e)
+
+            if retries >= self.max_retries:
+                self._record(endpoint, start, retries, status, cost, failed=True)
+                raise ApiError(f"{endpoint} request failed after {retries + 1} attempts: {error}")
+            delay = random.uniform(0, self.backoff * 2 ** retries)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            retries += 1
+            telemetry.inc('ytdl_retries_total', source='api')
+            logger.info("Retrying %s in %.2fs (attempt %d): %s", endpoint, delay, retries + 1, error)
+            time.sleep(delay)
+
+    def stats(self):
+        """Return request/retry counters and latency percentiles in milliseconds"""
+        with self._lock:
+            latencies = sorted(entry['latency'] for entry in self.recent)
+            stats = {
+                'requests': self.request_count,
+                'retries': self.retry_count,
+                'errors': self.error_count,
+                'quota_used': self.quota_used,
+                'quota_available': int(self.quota.available()),
+            }
+        for name, fraction in (('p50_ms', 0.5), ('p95_ms', 0.95), ('max_ms', 1.0)):
+            stats[name] = round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000) if latencies else 0
+        return stats
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _record(self, endpoint, start, retries, status, cost, failed=False):
+        latency = time.monotonic() - start
+        with self._lock:
+            self.request_count += 1
+            self.retry_count += retries
+            self.quota_used += cost
+            if failed:
+                self.error_count += 1
+            self.recent.append({'endpoint': endpoint, 'latency': latency, 'retries': retries, 'status': status})
+        telemetry.inc('ytdl_api_requests_total', endpoint=endpoint, status=status or 'error')
+        logger.debug("%s -> %s in %.0f ms (%d retries)", endpoint, status, latency * 1000, retries)
+
+    @staticmethod
+    def _error_reason(response):
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        # Proxies and gateways may answer with other JSON than the API's error object
+        error = body.get('error') if isinstance(body, dict) else None
+        errors = error.get('errors') if isinstance(error, dict) else None
+        if not isinstance(errors, list) or not errors or not isinstance(errors[0], dict):
+            return None
+        return errors[0].get('reason')
@@ -0,0 +1,107 @@
+"""Index of already downloaded videos
+
+Maps (video ID, format) to the output file with its size and a quick
+content digest, so a video that was downloaded before can be skipped
+without contacting YouTube. Entries whose file was deleted or changed
+are dropped when they are looked up, or all at once by reconcile().
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from ytdl.utils import data_dir
+
+# Bytes hashed from each end of the file by quick_digest()
+DIGEST_CHUNK = 64 * 1024
+
+
+def quick_digest(path):
+    """Hash the size plus the first and last 64 KiB of a file
+
+    Cheap enough to run on multi-GB videos while still telling apart two
+    different files that happen to share a name.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode('ascii'))
+    with open(path, 'rb') as f:
+        digest.update(f.read(DIGEST_CHUNK))
+        if size > DIGEST_CHUNK:
+            f.seek(max(DIGEST_CHUNK, size - DIGEST_CHUNK))
+            digest.update(f.read(DIGEST_CHUNK))
+    return digest.hexdigest()
+
+
+class DownloadArchive:
+    """Persistent (video_id, format) -> output file index"""
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), 'archive.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS downloads ("
+            "video_id TEXT NOT NULL, format TEXT NOT NULL, path TEXT NOT NULL, "
+            "size INTEGER NOT NULL, digest TEXT NOT NULL, title TEXT, downloaded_at REAL NOT NULL, "
+            "PRIMARY KEY (video_id, format))"
+        )
+
+    def lookup(self, video_id, output_format):
+        """Return the archived entry as a dict if its file is still intact, else None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, size, digest, title FROM downloads WHERE video_id = ? AND format = ?",
+                (video_id, output_format),
+            ).fetchone()
+        if row is None:
+            return None
+        path, size, digest, title = row
+        try:
+            intact = os.path.getsize(path) == size
+        except OSError:
+            intact = False
+        if not intact:
+            self.forget(video_id, output_format)
+            return None
+        return {'video_id': video_id, 'format': output_format, 'path': path, 'size': size,
+                'digest': digest, 'title': title}
+
+    def record(self, video_id, output_format, path, title=None):
+        """Add or replace the entry for a finished download"""
+        size = os.path.getsize(path)
+        digest = quick_digest(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO downloads (video_id, format, path, size, digest, title, downloaded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (video_id, output_format, path, size, digest, title, time.time()),
+            )
+
+    def forget(self, video_id, output_format):
+        with self._lock:
+            self._conn.execute("DELETE FROM downloads WHERE video_id = ? AND format = ?", (video_id, output_format))
+
+    def reconcile(self, verify_digest=False):
+        """Drop entries whose file is missing or changed; return how many were removed"""
+        with self._lock:
+            rows = self._conn.execute("SELECT video_id, format, path, size, digest FROM downloads").fetchall()
+        stale = []
+        for video_id, output_format, path, size, digest in rows:
+            try:
+                intact = os.path.getsize(path) == size and (not verify_digest or quick_digest(path) == digest)
+            except OSError:
+                intact = False
+            if not intact:
+                stale.append((video_id, output_format))
+        with self._lock:
+            self._conn.executemany("DELETE FROM downloads WHERE video_id = ? AND format = ?", stale)
+        return len(stale)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,86 @@
+"""Global download bandwidth limit
+
+A BandwidthGovernor is shared by every job of a DownloadScheduler. The
+jobs' progress hooks report the bytes they received, and a job that is
+ahead of its allowance is put to sleep inside the hook, which holds up
+the download loop the same way yt-dlp's own --limit-rate does. The
+rate is split evenly between the jobs that are currently transferring,
+so a large batch cannot crowd out a single download, and the total
+never goes above the cap.
+"""
+import threading
+import time
+
+# A job stops counting towards the split once it has been quiet this long
+ACTIVE_WINDOW = 2.0
+# How far ahead of its allowance a job may get before it is slowed down
+BURST_SECONDS = 0.5
+# Longest single sleep, so cancellation is noticed quickly
+SLEEP_SLICE = 0.25
+
+
+class BandwidthGovernor:
+    """Thread-safe bytes/sec cap with an equal share per active job
+
+    rate is in bytes per second; None or 0 means unlimited.
+    """
+    def __init__(self, rate=None):
+        self.rate = rate or None
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+        # Time at which all bytes granted so far are paid for, overall and per job
+        self._paid_until = 0.0
+        # key -> [paid_until, last_seen]
+        self._jobs = {}
+
+    def set_rate(self, rate):
+        """Change the cap; jobs in progress pick it up with their next block"""
+        with self._lock:
+            self.rate = rate or None
+            self._paid_until = 0.0
+            for entry in self._jobs.values():
+                entry[0] = 0.0
+
+    def consume(self, key, nbytes, cancel_event=None):
+        """Account nbytes received by job key, sleeping while it is over its share
+
+        Returns the number of seconds slept. Returns early once
+        cancel_event is set.
+        """
+        if not self.rate or nbytes <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            for other in [other for other, entry in self._jobs.items() if now - entry[1] > ACTIVE_WINDOW]:
+                del self._jobs[other]
+            entry = self._jobs.setdefault(key, [0.0, now])
+            share = self.rate / len(self._jobs)
+            entry[0] = max(entry[0], now - BURST_SECONDS) + nbytes / share
+            self._paid_until = max(self._paid_until, now - BURST_SECONDS) + nbytes / self.rate
+            wait = max(entry[0], self._paid_until) - now
+            # A sleeping job is still transferring
+            entry[1] = now + max(wait, 0.0)
+        if wait <= 0:
+            return 0.0
+
+        deadline = now + wait
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (cancel_event is not None and cancel_event.is_set()):
+                break
+            time.sleep(min(remaining, SLEEP_SLICE))
+        slept = time.monotonic() - now
+        with self._lock:
+            self.throttled_seconds += slept
+        return slept
+
+    def release(self, key):
+        """Forget a finished job so its share goes to the others right away"""
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def active(self):
+        """Return the number of jobs the rate is currently split between"""
+        with self._lock:
+            now = time.monotonic()
+            return sum(1 for entry in self._jobs.values() if now - entry[1] <= ACTIVE_WINDOW)
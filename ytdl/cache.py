@@ -0,0 +1,131 @@
+"""Persistent cache for YouTube Data API responses
+
+Entries live in a single SQLite file under the data folder. Every entry
+has its own expiry so that volatile fields (view counts) can be refreshed
+often while immutable ones (duration, title) are kept for weeks. The
+least recently used entries are evicted once the cache grows past
+max_entries.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from ytdl import telemetry
+from ytdl.utils import data_dir
+
+# Per-entry lifetimes in seconds
+SEARCH_TTL = 6 * 3600
+CONTENT_DETAILS_TTL = 30 * 86400
+STATISTICS_TTL = 3600
+
+EVICT_EVERY = 100
+
+
+def make_key(kind, params):
+    """Build a cache key from request parameters
+
+    The API key is dropped and the query text is case- and
+    whitespace-normalized so equivalent searches share one entry.
+    """
+    normalized = {}
+    for name, value in params.items():
+        if name == 'key' or value is None:
+            continue
+        if name == 'q':
+            value = ' '.join(str(value).lower().split())
+        normalized[name] = str(value)
+    digest = hashlib.sha1(json.dumps(normalized, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+    return f"{kind}:{digest}"
+
+
+class ApiCache:
+    """SQLite-backed key/value cache with TTLs, LRU eviction and hit counters"""
+    def __init__(self, path=None, max_entries=50000):
+        self.path = path or os.path.join(data_dir(), 'api_cache.sqlite3')
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def get(self, key):
+        """Return the cached value, or None if it is missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.misses += 1
+                self._bump('misses')
+                telemetry.inc('ytdl_cache_requests_total', cache='api', result='miss')
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            self._bump('hits')
+        telemetry.inc('ytdl_cache_requests_total', cache='api', result='hit')
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        """Store a JSON-serializable value for ttl seconds"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + ttl, now),
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM counters")
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Return session and lifetime hit/miss counters and the entry count"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            totals = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'total_hits': totals.get('hits', 0),
+            'total_misses': totals.get('misses', 0),
+            'entries': entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _bump(self, name):
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def _evict(self):
+        now = time.time()
+        self._conn.execute("DELETE FROM entries WHERE expires_at < ?", (now,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
@@ -0,0 +1,738 @@
+"""Command line interface
+
+    python yt.py search KEYWORD [--language ja] [--level beginner]
+    python yt.py search KEYWORD [KEYWORD ...] --language ja zh ko en --level beginner advanced
+    python yt.py library [QUERY] [--min-duration 5:00] [--min-views 1000]
+    python yt.py details URL [URL ...] [--file urls.txt ...]
+    python yt.py cache [stats|clear]
+    python yt.py archive [stats|reconcile]
+    python yt.py extract PLAYLIST_URL [PLAYLIST_URL ...]
+    python yt.py download URL
+    python yt.py batch URL [URL ...] [--file urls.txt ...]
+    python yt.py batch --resume
+    python yt.py trace trace.jsonl
+    python yt.py daemon [--port 8765] [--workers 4]
+    python yt.py --daemon batch URL [URL ...]
+
+Global options --trace, --prometheus and --metrics-port record spans and
+metrics for any subcommand (see ytdl.telemetry); --log-level sets how
+much of the engine's logging is shown. With --daemon, search, extract,
+download and batch hand their work to a running `yt daemon` (see
+ytdl.daemon) instead of doing it in-process.
+
+Everything except argparse is imported inside the subcommand handlers so
+that --help and argument errors never load yt_dlp or requests.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+
+def make_controller(args, name, initial, metrics=None, error_count=None):
+    """Return a started AimdController for --adaptive, otherwise None
+
+    Decisions go to the metrics file, and changes are printed unless
+    --quiet.
+    """
+    from ytdl.adaptive import AimdController
+    from ytdl.progress import MetricsLog
+
+    if not args.adaptive:
+        return None
+    metrics = metrics or MetricsLog(getattr(args, 'metrics', None))
+    quiet = getattr(args, 'quiet', False)
+
+    def on_decision(decision):
+        metrics.record_decision(decision)
+        if decision['limit'] != decision['previous'] and not quiet:
+            print(f"{name}: {decision['previous']} -> {decision['limit']} workers ({decision['reason']})",
+                  file=sys.stderr, flush=True)
+
+    controller = AimdController(name, initial=initial, on_decision=on_decision, error_count=error_count)
+    controller.start()
+    return controller
+
+
+def cmd_search(args):
+    from dotenv import load_dotenv
+    from ytdl.api import ApiClient, ApiError
+    from ytdl.cache import ApiCache
+    from ytdl.library import LibraryIndex
+    from ytdl.search import SearchClient
+
+    keywords = list(args.keyword)
+    if args.keywords_file:
+        with open(args.keywords_file, encoding='utf-8') as f:
+            keywords += [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    if not keywords:
+        print("Error: no keywords given", file=sys.stderr)
+        return 2
+    languages = list(dict.fromkeys(args.language or ['ja']))
+    levels = list(dict.fromkeys(args.level or ['beginner']))
+    if args.daemon is not None:
+        return search_remote(args, keywords, languages, levels)
+
+    load_dotenv()
+    api_key = args.api_key or os.getenv('YOUTUBE_API_KEY', '')
+    if not api_key:
+        print("Error: set YOUTUBE_API_KEY or pass --api-key", file=sys.stderr)
+        return 2
+
+    cache = None if args.no_cache else ApiCache()
+    api_client = ApiClient(api_key, timeout=(5, args.timeout), max_retries=args.retries)
+    client = SearchClient(api_key, cache=cache, client=api_client)
+    library = LibraryIndex()
+    filters = dict(duration=args.duration, order=args.order, published_after=args.after, published_before=args.before)
+    output = open(args.output_file, 'a', encoding='utf-8') if args.output_file else None
+    controller = None
+    try:
+        if len(keywords) * len(languages) * len(levels) == 1:
+            pages = client.iter_pages(keywords[0], languages[0], levels[0], args.max_results, **filters)
+        else:
+            controller = make_controller(args, 'searches', args.workers, error_count=lambda: api_client.retry_count)
+            pages = client.iter_matrix(keywords, languages, levels, args.max_results, workers=args.workers,
+                                       controller=controller, **filters)
+        for page in pages:
+            library.add_results(page, languages[0], levels[0])
+            if output is not None:
+                output.writelines(json.dumps(video_info, ensure_ascii=False) + '\n' for video_info in page)
+                output.flush()
+            print_videos(page, args.urls_only)
+    except ApiError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if output is not None:
+            output.close()
+        if controller is not None:
+            controller.stop()
+        if args.stats:
+            print(f"API: {api_client.stats()}", file=sys.stderr)
+            print(f"Details: {client.details.stats()}", file=sys.stderr)
+            if cache is not None:
+                print(f"Cache: {cache.stats()}", file=sys.stderr)
+    return 0
+
+
+def search_remote(args, keywords, languages, levels):
+    """Run a search on the daemon and print the results as cmd_search does"""
+    from ytdl.daemon import DaemonError
+    from ytdl.remote import DaemonClient
+
+    client = DaemonClient(args.daemon or None)
+    try:
+        task = client.search(keywords, languages=languages, levels=levels, max_results=args.max_results,
+                             duration=args.duration, order=args.order, after=args.after, before=args.before)
+        task = client.wait_task(task)
+    except DaemonError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if task['state'] != 'done':
+        print(f"Error: {task['error']}", file=sys.stderr)
+        return 1
+    videos = task['result']['videos']
+    if args.output_file:
+        with open(args.output_file, 'a', encoding='utf-8') as output:
+            output.writelines(json.dumps(video_info, ensure_ascii=False) + '\n' for video_info in videos)
+    print_videos(videos, args.urls_only)
+    return 0
+
+
+def print_videos(videos, urls_only=False):
+    for video_info in videos:
+        if urls_only:
+            print(video_info['url'])
+        else:
+            print(f"{video_info['url']}\t{video_info['duration']}\t{video_info['views']}\t"
+                  f"{video_info['published']}\t{video_info['channel']}\t{video_info['title']}")
+    sys.stdout.flush()
+
+
+def cmd_details(args):
+    import collections
+
+    from dotenv import load_dotenv
+    from ytdl.api import ApiClient, ApiError
+    from ytdl.cache import ApiCache
+    from ytdl.details import DetailsFetcher
+    from ytdl.search import duration_seconds, format_clock
+    from ytdl.urlfile import iter_url_lines
+    from ytdl.utils import extract_video_id
+
+    load_dotenv()
+    api_key = args.api_key or os.getenv('YOUTUBE_API_KEY', '')
+    if not api_key:
+        print("Error: set YOUTUBE_API_KEY or pass --api-key", file=sys.stderr)
+        return 2
+
+    def iter_urls():
+        yield from args.urls
+        for path in args.file:
+            for url, _, is_url in iter_url_lines(path):
+                if is_url:
+                    yield url
+
+    api_client = ApiClient(api_key)
+    fetcher = DetailsFetcher(api_client, ApiCache())
+    # Keep a window of lookups in flight and print them in input order
+    window = collections.deque()
+
+    def print_first():
+        url, future = window.popleft()
+        details = future.result() if future is not None else {}
+        if not details:
+            print(f"{url}\t\t\tnot found")
+            return
+        seconds = duration_seconds(details.get('contentDetails', {}).get('duration', 'PT0S'))
+        print(f"{url}\t{format_clock(seconds)}\t{details.get('statistics', {}).get('viewCount', 0)}")
+
+    try:
+        for url in iter_urls():
+            video_id = extract_video_id(url)
+            window.append((url, fetcher.submit(video_id) if video_id else None))
+            if len(window) > args.window:
+                print_first()
+        fetcher.flush()
+        while window:
+            print_first()
+    except ApiError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        fetcher.close()
+        if args.stats:
+            print(f"Details: {fetcher.stats()}", file=sys.stderr)
+    return 0
+
+
+def cmd_library(args):
+    from ytdl.library import LibraryIndex
+
+    library = LibraryIndex()
+    if args.stats:
+        videos, downloaded = library.count()
+        print(f"{library.path}: {videos} videos, {downloaded} downloaded (tokenizer: {library.tokenizer})")
+        return 0
+    started = time.perf_counter()
+    videos = library.search(
+        ' '.join(args.query),
+        min_duration=args.min_duration,
+        max_duration=args.max_duration,
+        min_views=args.min_views,
+        published_after=args.after,
+        published_before=args.before,
+        language=args.language,
+        level=args.level,
+        downloaded=True if args.downloaded else None,
+        limit=args.limit,
+    )
+    print_videos(videos, args.urls_only)
+    if not args.urls_only:
+        print(f"{len(videos)} videos in {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+def cmd_cache(args):
+    from ytdl.cache import ApiCache
+    from ytdl.probe import ProbeCache
+
+    cache = ApiCache()
+    probe_cache = ProbeCache()
+    if args.action == 'clear':
+        cache.clear()
+        probe_cache.clear()
+        print(f"Cleared {cache.path}")
+        print(f"Cleared {probe_cache.path}")
+        return 0
+    stats = cache.stats()
+    print(f"{cache.path}: {stats['entries']} entries, "
+          f"{stats['total_hits']} hits / {stats['total_misses']} misses")
+    print(f"{probe_cache.path}: {probe_cache.count()} videos")
+    return 0
+
+
+def cmd_archive(args):
+    from ytdl.archive import DownloadArchive
+
+    archive = DownloadArchive()
+    if args.action == 'reconcile':
+        removed = archive.reconcile(verify_digest=args.verify)
+        print(f"Removed {removed} stale entries")
+    print(f"{archive.path}: {archive.count()} downloads")
+    return 0
+
+
+def cmd_extract(args):
+    from ytdl.playlist import extract_many
+
+    if args.daemon is not None:
+        return extract_remote(args)
+
+    def on_progress(url, title, count):
+        if not args.quiet:
+            print(f"  {title}: {count} URLs", file=sys.stderr, flush=True)
+
+    controller = make_controller(args, 'extraction', args.workers)
+    try:
+        results = extract_many(args.urls, args.output_dir, max_workers=args.workers, on_progress=on_progress,
+                               controller=controller)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        return 130
+    finally:
+        if controller is not None:
+            controller.stop()
+    status = 0
+    for url, output_filename, count, error in results:
+        if error is None:
+            print(f"✓ Extracted {count} URLs to {output_filename}")
+        else:
+            print(f"Error: {error} ({url})", file=sys.stderr)
+            status = 1
+    return status
+
+
+def extract_remote(args):
+    """Extract playlists on the daemon and print the results as cmd_extract does"""
+    from ytdl.daemon import DaemonError
+    from ytdl.remote import DaemonClient
+
+    def on_event(event):
+        if event['type'] == 'message' and not args.quiet:
+            print(f"  {event['text']}", file=sys.stderr, flush=True)
+
+    client = DaemonClient(args.daemon or None)
+    try:
+        task = client.extract(args.urls, output_dir=os.path.abspath(args.output_dir))
+        task = client.wait_task(task, on_event)
+    except DaemonError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("Interrupted; the daemon keeps extracting", file=sys.stderr)
+        return 130
+    if task['state'] != 'done':
+        print(f"Error: {task['error']}", file=sys.stderr)
+        return 1
+    status = 0
+    for playlist in task['result']['playlists']:
+        if playlist['error'] is None:
+            print(f"✓ Extracted {playlist['count']} URLs to {playlist['file']}")
+        else:
+            print(f"Error: {playlist['error']} ({playlist['url']})", file=sys.stderr)
+            status = 1
+    return status
+
+
+def report_progress(bus, scheduler, metrics, stop, quiet=False):
+    """Sample aggregate throughput into the metrics file until stop is set
+
+    Unless quiet, also prints the aggregate rate and any stalled jobs.
+    """
+    from ytdl.progress import SAMPLE_SECONDS, format_eta, format_rate
+
+    while not stop.wait(SAMPLE_SECONDS):
+        snapshot = bus.snapshot()
+        metrics.record_sample(snapshot, queued=scheduler.pending())
+        if quiet or not snapshot['active']:
+            continue
+        line = (f"{snapshot['active']} downloading, {scheduler.pending()} queued - "
+                f"{format_rate(snapshot['bytes_per_sec'])}, ETA {format_eta(snapshot['eta'])}")
+        stalled = [str(job['job_id']) for job in snapshot['jobs'] if job['stalled']]
+        if stalled:
+            line += f" - stalled: #{', #'.join(stalled)}"
+        print(line, file=sys.stderr, flush=True)
+
+
+def run_downloads(jobs, args, max_workers, output_dir=None, output_format=None, journal=None, batch_id=None,
+                  imports=None):
+    """Download (url, journal_id, fetched_path) jobs through the scheduler
+
+    imports is a list of {'path', 'offset', 'lines'} URL list files that
+    are streamed into the scheduler after the jobs. Prints one line per
+    state change. A batch recorded in the journal is closed once every job
+    has finished, and left open on Ctrl+C so that `batch --resume` can
+    pick it up.
+    """
+    from ytdl.archive import DownloadArchive
+    from ytdl.downloader import DownloadJob, DownloadScheduler
+    from ytdl.library import LibraryIndex
+    from ytdl.probe import ProbeCache
+    from ytdl.progress import MetricsLog, ProgressBus
+    from ytdl.urlfile import UrlFileImporter
+
+    bus = ProgressBus()
+    metrics = MetricsLog(args.metrics)
+
+    def on_update(job):
+        if job.state == DownloadJob.RUNNING:
+            bus.publish(job.id, label=job.url, state='running')
+        elif job.state in (DownloadJob.FETCHED, DownloadJob.POSTPROCESSING):
+            bus.publish(job.id, label=job.title, state='converting', speed=0.0)
+        elif job.finished:
+            summary = bus.finish(job.id)
+            if summary is not None:
+                metrics.record_job(summary, url=job.url, format=job.format, state=job.state,
+                                   extract_seconds=job.extract_seconds, fetch_seconds=job.fetch_seconds,
+                                   postprocess=job.postprocess, postprocess_seconds=job.postprocess_seconds)
+
+        if job.state == DownloadJob.DONE and job.skipped:
+            print(f"✓ Already downloaded: {job.filepath}", flush=True)
+        elif job.state == DownloadJob.DONE:
+            method = f" ({job.postprocess})" if job.postprocess else ""
+            print(f"✓ Downloaded: {job.filepath or job.title}{method}", flush=True)
+        elif job.state == DownloadJob.FAILED:
+            print(f"Error downloading {job.url}: {job.error}", file=sys.stderr, flush=True)
+        elif not args.quiet:
+            print(f"[{job.id}] {job.state}: {job.url}", flush=True)
+
+    def on_import_progress(path, lines):
+        counts = scheduler.counts()
+        finished = sum(counts.get(state, 0) for state in DownloadJob.FINISHED_STATES)
+        print(f"{os.path.basename(path)}: {lines} lines read, {importer.submitted} queued, "
+              f"{importer.duplicates} duplicates, {finished} finished", file=sys.stderr, flush=True)
+
+    output_format = output_format or args.format
+    if args.daemon is not None:
+        from ytdl.daemon import DaemonError
+        from ytdl.remote import DaemonClient, RemoteScheduler
+
+        # Workers, rate limit and tuning are the daemon's own
+        controller = None
+        try:
+            scheduler = RemoteScheduler(DaemonClient(args.daemon or None), on_update=on_update,
+                                        on_progress=lambda job, d: bus.publish_hook(job.id, d), journal=journal,
+                                        output_dir=os.path.abspath(output_dir or args.output_dir),
+                                        accelerate=args.accelerate)
+        except DaemonError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    else:
+        archive = None if args.force else DownloadArchive()
+        controller = make_controller(args, 'downloads', max_workers, metrics=metrics)
+        scheduler = DownloadScheduler(output_dir or args.output_dir, max_workers=max_workers,
+                                      on_update=on_update, on_progress=lambda job, d: bus.publish_hook(job.id, d),
+                                      journal=journal, archive=archive, probe_cache=ProbeCache(),
+                                      library=LibraryIndex(), retain_finished=False,
+                                      accelerate=args.accelerate, segments=args.segments, chunk_size=args.chunk_size,
+                                      bandwidth=args.limit_rate, controller=controller,
+                                      profile_job=args.profile, profiler=args.profiler)
+    importer = UrlFileImporter(scheduler, output_format, journal=journal, batch_id=batch_id)
+    stop_reporting = threading.Event()
+    threading.Thread(target=report_progress, args=(bus, scheduler, metrics, stop_reporting, args.quiet),
+                     daemon=True).start()
+    try:
+        for url, journal_id, fetched_path in jobs:
+            scheduler.submit(url, output_format, batch_id=batch_id, journal_id=journal_id,
+                             fetched_path=fetched_path)
+        if imports:
+            importer.seed(journal.iter_batch_urls(batch_id) if journal is not None and batch_id is not None
+                          else (url for url, _, _ in jobs))
+            importer.run(imports, on_progress=on_import_progress)
+        scheduler.wait()
+    except KeyboardInterrupt:
+        scheduler.cancel_all()
+        scheduler.wait()
+        if batch_id is not None:
+            print("Interrupted; resume with: yt batch --resume", file=sys.stderr)
+        return 130
+    finally:
+        stop_reporting.set()
+        scheduler.shutdown()
+        if controller is not None:
+            controller.stop()
+    if journal is not None and batch_id is not None:
+        journal.close_batch(batch_id)
+    counts = scheduler.counts()
+    return 1 if counts.get(DownloadJob.FAILED) or counts.get(DownloadJob.CANCELED) else 0
+
+
+def cmd_download(args):
+    return run_downloads([(args.url, None, None)], args, max_workers=1)
+
+
+def cmd_batch(args):
+    from ytdl.journal import JobJournal
+
+    journal = JobJournal()
+    if args.resume:
+        status = 0
+        for batch in journal.unfinished_batches():
+            print(f"Resuming batch #{batch['id']}: {len(batch['pending'])}/{batch['total']} videos left"
+                  + (f", {len(batch['imports'])} URL files to finish" if batch['imports'] else ""))
+            jobs = [(job['url'], job['id'], job['output_path']) for job in batch['pending']]
+            status = run_downloads(jobs, args, args.workers, batch['output_dir'], batch['format'],
+                                   journal, batch['id'], batch['imports']) or status
+            if status == 130:
+                break
+        return status
+
+    files = [os.path.abspath(path) for path in args.file or []]
+    for path in files:
+        if not os.path.isfile(path):
+            print(f"Error: {path} does not exist", file=sys.stderr)
+            return 2
+    if not args.urls and not files:
+        print("Error: no URLs given", file=sys.stderr)
+        return 2
+    # Absolute, so that --resume from another directory writes to the same folder
+    output_dir = os.path.abspath(args.output_dir)
+    batch_id = journal.start_batch(output_dir, args.format)
+    return run_downloads([(url, None, None) for url in args.urls], args, args.workers, output_dir,
+                         journal=journal, batch_id=batch_id, imports=[{'path': path} for path in files])
+
+
+def cmd_trace(args):
+    from ytdl.telemetry import summarize_trace
+
+    jobs, stages = summarize_trace(args.path)
+    if not jobs and not stages:
+        print("No spans in the trace")
+        return 1
+    columns = ['queued', 'format_selection', 'fetch', 'postprocess', 'total']
+    if jobs:
+        print(f"{'job':>6}  {'video':<12}" + ''.join(f"{column:>17}" for column in columns))
+        for job in jobs:
+            cells = ''.join(f"{job['stages'][column]:>17.2f}" if column in job['stages'] else f"{'-':>17}"
+                            for column in columns)
+            print(f"{job['job']:>6}  {job['video_id'] or '-':<12}{cells}")
+        print()
+    print(f"{'stage':<20}{'spans':>8}{'seconds':>12}{'mean':>10}")
+    for name, (count, seconds) in sorted(stages.items(), key=lambda item: -item[1][1]):
+        print(f"{name:<20}{count:>8}{seconds:>12.2f}{seconds / count:>10.3f}")
+    return 0
+
+
+def cmd_daemon(args):
+    from dotenv import load_dotenv
+    from ytdl.daemon import Daemon, DaemonError, DaemonServer
+    from ytdl.remote import DaemonClient
+
+    if args.status or args.stop:
+        client = DaemonClient(f"http://{args.host}:{args.port}")
+        try:
+            print(json.dumps(client.shutdown() if args.stop else client.status(), indent=2, ensure_ascii=False))
+        except DaemonError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    load_dotenv()
+    token = os.getenv('YTDL_DAEMON_TOKEN')
+    if args.host not in ('127.0.0.1', 'localhost', '::1') and not token:
+        print("Warning: listening beyond localhost without YTDL_DAEMON_TOKEN lets anyone on the network "
+              "queue downloads", file=sys.stderr)
+    app = Daemon(args.output_dir, max_workers=args.workers, bandwidth=args.limit_rate, adaptive=args.adaptive,
+                 accelerate=args.accelerate, segments=args.segments, chunk_size=args.chunk_size,
+                 api_key=os.getenv('YOUTUBE_API_KEY', ''), idle_timeout=args.idle_timeout, metrics=args.metrics)
+    try:
+        server = DaemonServer(app, args.host, args.port, token=token)
+    except OSError as e:
+        app.close()
+        print(f"Error: cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 1
+    print(f"Listening on http://{args.host}:{server.server_port} (Ctrl+C to stop)", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        app.close()
+    return 0
+
+
+def add_engine_arguments(parser):
+    """Options of the download engine shared by download, batch and daemon"""
+    from ytdl.accelerate import DEFAULT_SEGMENTS, parse_size
+
+    parser.add_argument('--accelerate', action='store_true',
+                        help="mp4: fetch video and audio at the same time, each split into parallel requests")
+    parser.add_argument('--segments', type=int, default=int(os.getenv('YTDL_SEGMENTS', DEFAULT_SEGMENTS)),
+                        help="parallel range/fragment requests per format with --accelerate "
+                             f"(default: {DEFAULT_SEGMENTS})")
+    parser.add_argument('--chunk-size', type=parse_size, default=os.getenv('YTDL_CHUNK_SIZE', '10M'),
+                        help="size of each range request with --accelerate, e.g. 10M (default: 10M)")
+    parser.add_argument('--limit-rate', type=parse_size, default=os.getenv('YTDL_BANDWIDTH') or None,
+                        help="combined download rate for all jobs in bytes/sec, e.g. 5M; split evenly between "
+                             "the running downloads (default: unlimited)")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="JSON lines file for per-job and throughput metrics "
+                             "(default: metrics.jsonl in the data folder)")
+
+
+def add_download_arguments(parser):
+    parser.add_argument('--format', choices=('mp3', 'audio', 'mp4'), default='mp3',
+                        help="output format; 'audio' keeps the original m4a/opus stream without re-encoding "
+                             "(default: mp3)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print finished and failed downloads")
+    parser.add_argument('--force', action='store_true',
+                        help="download even if the video is already in the download archive (not with --daemon)")
+    add_engine_arguments(parser)
+    parser.add_argument('--profile', metavar='JOB',
+                        help="profile one job (job number, video ID or URL); profiles are written to the "
+                             "profiles folder in the data folder")
+    parser.add_argument('--profiler', choices=('cprofile', 'pyinstrument'), default='cprofile',
+                        help="profiler for --profile; pyinstrument must be installed (default: cprofile)")
+
+
+def build_parser():
+    from ytdl.library import clock_to_seconds
+    from ytdl.search import LANGUAGES, LEVELS, SEARCH_ORDERS, VIDEO_DURATIONS
+    from ytdl.utils import default_output_dir_path
+
+    parser = argparse.ArgumentParser(prog='yt', description="YouTube downloader with search")
+    parser.add_argument('-o', '--output-dir', default=default_output_dir_path(),
+                        help="download folder (default: ~/Downloads/YouTube_Audio)")
+    parser.add_argument('--log-level', default=os.getenv('YTDL_LOG_LEVEL', 'WARNING').upper(),
+                        choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'),
+                        help="logging level for the engine's messages (default: YTDL_LOG_LEVEL or WARNING)")
+    parser.add_argument('--trace', metavar='PATH', default=os.getenv('YTDL_TRACE') or None,
+                        help="append a JSON line per stage span (search, details, extraction, format "
+                             "selection, fetch, postprocess) to PATH (default: YTDL_TRACE)")
+    parser.add_argument('--prometheus', metavar='PATH', default=os.getenv('YTDL_PROMETHEUS_FILE') or None,
+                        help="keep the metrics in Prometheus text format in PATH, e.g. for node_exporter's "
+                             "textfile collector (default: YTDL_PROMETHEUS_FILE)")
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('YTDL_METRICS_PORT') or 0) or None,
+                        help="serve the metrics at http://127.0.0.1:PORT/metrics while running "
+                             "(default: YTDL_METRICS_PORT)")
+    parser.add_argument('--daemon', metavar='URL', nargs='?', const='', default=os.getenv('YTDL_DAEMON_URL'),
+                        help="run search, extract, download and batch on a `yt daemon` (default URL: "
+                             "YTDL_DAEMON_URL or http://127.0.0.1:8765)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    search = subparsers.add_parser('search', help="search videos with the YouTube Data API")
+    search.add_argument('keyword', nargs='*', help="one or more keywords")
+    search.add_argument('--keywords-file', metavar='FILE', help="read more keywords from FILE, one per line")
+    search.add_argument('--language', nargs='+', choices=LANGUAGES,
+                        help="one or more languages (default: ja)")
+    search.add_argument('--level', nargs='+', choices=LEVELS,
+                        help="one or more levels (default: beginner)")
+    search.add_argument('--max-results', type=int, default=25,
+                        help="results per search; more than 50 are fetched page by page (100 quota units each)")
+    search.add_argument('--workers', type=int, default=4,
+                        help="searches run at the same time when several keywords, languages or levels are given")
+    search.add_argument('--adaptive', action='store_true',
+                        help="adjust the number of concurrent searches from throughput and API retries, "
+                             "starting at --workers")
+    search.add_argument('--output-file', metavar='PATH', help="also append the results to PATH as JSON lines")
+    search.add_argument('--duration', choices=VIDEO_DURATIONS, default='any',
+                        help="short: under 4 minutes, medium: 4-20 minutes, long: over 20 minutes")
+    search.add_argument('--order', choices=SEARCH_ORDERS, default='relevance')
+    search.add_argument('--after', metavar='YYYY-MM-DD', help="only videos published on or after this date")
+    search.add_argument('--before', metavar='YYYY-MM-DD', help="only videos published before this date")
+    search.add_argument('--api-key', help="defaults to YOUTUBE_API_KEY")
+    search.add_argument('--urls-only', action='store_true', help="print only the video URLs")
+    search.add_argument('--no-cache', action='store_true', help="always query the API")
+    search.add_argument('--timeout', type=float, default=20, help="per-request read timeout in seconds")
+    search.add_argument('--retries', type=int, default=4, help="retries on transient API errors")
+    search.add_argument('--stats', action='store_true', help="print API latency, retry and cache counters")
+    search.set_defaults(func=cmd_search)
+
+    details = subparsers.add_parser('details', help="print the duration and view count of video URLs")
+    details.add_argument('urls', nargs='*', metavar='URL')
+    details.add_argument('--file', action='append', default=[], metavar='PATH',
+                         help="URL list file such as <playlist>_urls.txt (repeatable)")
+    details.add_argument('--window', type=int, default=500, help="lookups kept in flight")
+    details.add_argument('--api-key', help="defaults to YOUTUBE_API_KEY")
+    details.add_argument('--stats', action='store_true', help="print batching and cache counters")
+    details.set_defaults(func=cmd_details)
+
+    library = subparsers.add_parser('library', help="search past search results and downloads offline")
+    library.add_argument('query', nargs='*', help="words that must appear in the title or channel")
+    library.add_argument('--min-duration', type=clock_to_seconds, metavar='[H:]M:SS')
+    library.add_argument('--max-duration', type=clock_to_seconds, metavar='[H:]M:SS')
+    library.add_argument('--min-views', type=int)
+    library.add_argument('--after', metavar='YYYY-MM-DD', help="published on or after this date")
+    library.add_argument('--before', metavar='YYYY-MM-DD', help="published on or before this date")
+    library.add_argument('--language', choices=LANGUAGES)
+    library.add_argument('--level', choices=LEVELS)
+    library.add_argument('--downloaded', action='store_true', help="only videos that were downloaded")
+    library.add_argument('--limit', type=int, default=50)
+    library.add_argument('--urls-only', action='store_true', help="print only the video URLs")
+    library.add_argument('--stats', action='store_true', help="print the number of indexed videos")
+    library.set_defaults(func=cmd_library)
+
+    cache = subparsers.add_parser('cache', help="show or clear the API response cache")
+    cache.add_argument('action', choices=('stats', 'clear'), nargs='?', default='stats')
+    cache.set_defaults(func=cmd_cache)
+
+    archive = subparsers.add_parser('archive', help="show or reconcile the index of downloaded videos")
+    archive.add_argument('action', choices=('stats', 'reconcile'), nargs='?', default='stats')
+    archive.add_argument('--verify', action='store_true', help="also re-hash files while reconciling")
+    archive.set_defaults(func=cmd_archive)
+
+    extract = subparsers.add_parser('extract', help="write the video URLs of a playlist to <playlist>_urls.txt")
+    extract.add_argument('urls', nargs='+', metavar='url', help="playlist or channel URLs")
+    extract.add_argument('-w', '--workers', type=int, default=4, help="playlists extracted at the same time")
+    extract.add_argument('--adaptive', action='store_true',
+                         help="adjust the number of playlists extracted at once from throughput and errors, "
+                              "starting at --workers")
+    extract.add_argument('-q', '--quiet', action='store_true', help="do not print live URL counts")
+    extract.set_defaults(func=cmd_extract)
+
+    download = subparsers.add_parser('download', help="download a single video")
+    download.add_argument('url')
+    add_download_arguments(download)
+    download.set_defaults(func=cmd_download, adaptive=False)
+
+    batch = subparsers.add_parser('batch', help="download several videos concurrently")
+    batch.add_argument('urls', nargs='*')
+    batch.add_argument('-f', '--file', action='append',
+                       help="stream URLs from a text file, one per line (repeatable, e.g. <playlist>_urls.txt)")
+    batch.add_argument('--resume', action='store_true',
+                       help="resume batches interrupted by a crash or Ctrl+C, skipping finished videos")
+    batch.add_argument('-w', '--workers', type=int, default=int(os.getenv('YTDL_MAX_WORKERS', '3')),
+                       help="number of parallel downloads (default: YTDL_MAX_WORKERS or 3)")
+    batch.add_argument('--adaptive', action='store_true',
+                       help="adjust the number of parallel downloads at runtime from throughput, job speed and "
+                            "throttling errors (HTTP 429/403), starting at --workers")
+    add_download_arguments(batch)
+    batch.set_defaults(func=cmd_batch)
+
+    daemon = subparsers.add_parser('daemon', help="keep the download queue, workers and caches running and accept "
+                                                  "jobs over a local HTTP/JSON API")
+    daemon.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1)")
+    daemon.add_argument('--port', type=int, default=int(os.getenv('YTDL_DAEMON_PORT', '8765')),
+                        help="port to listen on (default: YTDL_DAEMON_PORT or 8765)")
+    daemon.add_argument('-w', '--workers', type=int, default=int(os.getenv('YTDL_MAX_WORKERS', '3')),
+                        help="number of parallel downloads (default: YTDL_MAX_WORKERS or 3)")
+    daemon.add_argument('--adaptive', action='store_true',
+                        help="adjust the number of parallel downloads at runtime, up to --workers")
+    daemon.add_argument('--idle-timeout', type=float, default=600,
+                        help="seconds an idle download worker keeps its extractors before exiting (default: 600)")
+    daemon.add_argument('--status', action='store_true', help="print the status of a running daemon and exit")
+    daemon.add_argument('--stop', action='store_true', help="stop a running daemon")
+    add_engine_arguments(daemon)
+    daemon.set_defaults(func=cmd_daemon)
+
+    trace = subparsers.add_parser('trace', help="show where the time went per video in a --trace file")
+    trace.add_argument('path')
+    trace.set_defaults(func=cmd_trace)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command in ('extract', 'download', 'batch', 'daemon'):
+        os.makedirs(args.output_dir, exist_ok=True)
+    logging.basicConfig(level=args.log_level, format='%(levelname)s %(name)s: %(message)s')
+    if args.command == 'trace':
+        return args.func(args)
+
+    from ytdl import telemetry
+
+    if args.trace:
+        telemetry.configure(args.trace)
+    if args.prometheus:
+        telemetry.export_to(args.prometheus)
+    if args.metrics_port:
+        telemetry.serve_prometheus(args.metrics_port)
+    try:
+        return args.func(args)
+    finally:
+        telemetry.close()
@@ -0,0 +1,671 @@
+"""Long-running download daemon with a local HTTP/JSON API
+
+`yt daemon` keeps one DownloadScheduler alive, together with its fetch
+workers and their YoutubeDL instances, the transcode pool, the API
+client and the caches. Start-up costs are paid once instead of on every
+run. Clients (the CLI with --daemon, the GUI with YTDL_DAEMON_URL, see
+ytdl.remote) submit work over HTTP on 127.0.0.1:
+
+    GET    /status                      workers, counts, rate limit, API usage
+    POST   /jobs                        {"urls": [...], "format": "mp3", "priority": "bulk",
+                                         "group": ..., "output_dir": ..., "accelerate": false}
+    GET    /jobs[?group=NAME]           jobs in progress and recently finished
+    GET    /jobs/ID
+    DELETE /jobs/ID                     cancel a job
+    DELETE /jobs[?group=NAME]           cancel a group, or every job
+    POST   /search                      {"keywords": [...], "languages": [...], "levels": [...], ...}
+    POST   /extract                     {"urls": [...], "output_dir": ..., "download": "mp3"}
+    GET    /tasks/ID                    a search or extraction, with its result once done
+    GET    /events?after=N&timeout=S    events after N, waiting up to S seconds for one
+    GET    /events/stream               the same as server-sent events
+    POST   /settings                    {"max_workers": 4, "adaptive": true, "bandwidth": "5M"}
+    GET    /metrics                     Prometheus text (see ytdl.telemetry)
+    POST   /shutdown
+
+Events are {'id', 'type', 'time', ...}. A 'job' event carries the job
+dict on every state change. A 'progress' event holds a sample of the
+running jobs (at most every PROGRESS_SECONDS). A 'task' event reports a
+search or extraction. A 'message' event carries a log line. With
+YTDL_DAEMON_TOKEN set, requests need an "Authorization: Bearer <token>"
+header. POST bodies must be sent as application/json. An output_dir
+must be an absolute path to an existing directory; the daemon only
+creates missing ones inside its own output directory.
+"""
+import collections
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from ytdl import telemetry
+from ytdl.accelerate import parse_size
+from ytdl.adaptive import AimdController
+from ytdl.archive import DownloadArchive
+from ytdl.downloader import PRIORITIES, DownloadJob, DownloadScheduler
+from ytdl.library import LibraryIndex
+from ytdl.probe import ProbeCache
+from ytdl.progress import SAMPLE_SECONDS, MetricsLog, ProgressBus
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+FORMATS = ('mp3', 'audio', 'mp4')
+# Fetch workers wait this long for a new job before exiting
+IDLE_TIMEOUT = 600
+# Events kept for clients that poll; older ones are dropped
+MAX_EVENTS = 10000
+# Finished jobs and tasks kept for status queries
+MAX_FINISHED = 1000
+MAX_TASKS = 200
+# Searches and extractions run at the same time
+TASK_WORKERS = 4
+PROGRESS_SECONDS = 0.5
+# Longest long-poll, and the keep-alive interval of the event stream
+MAX_POLL_SECONDS = 60
+KEEPALIVE_SECONDS = 15
+
+
+class DaemonError(Exception):
+    """A request the daemon cannot carry out; status is the HTTP status"""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class EventLog:
+    """Numbered, bounded log of events that clients read from a position"""
+    def __init__(self, maxlen=MAX_EVENTS):
+        self._events = collections.deque(maxlen=maxlen)
+        self._next_id = 1
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def last_id(self):
+        with self._cond:
+            return self._next_id - 1
+
+    def publish(self, kind, **fields):
+        with self._cond:
+            event = {'id': self._next_id, 'type': kind, 'time': round(time.time(), 3), **fields}
+            self._next_id += 1
+            self._events.append(event)
+            self._cond.notify_all()
+        return event
+
+    def read(self, after, timeout=0, limit=500):
+        """Return (events, missed) for the events after id `after`
+
+        Waits up to timeout seconds for the first one. missed is True when
+        events the caller has not seen were dropped, or `after` comes from
+        an earlier run of the daemon; the caller should then re-read the
+        state it mirrors.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if after > self._next_id - 1:
+                return [], True
+            while self._next_id - 1 <= after and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return [], False
+                self._cond.wait(remaining)
+            if not self._events or self._next_id - 1 <= after:
+                return [], False
+            first = self._events[0]['id']
+            start = max(0, after + 1 - first)
+            return list(itertools.islice(self._events, start, start + limit)), after < first - 1
+
+    def close(self):
+        """Wake every waiting reader"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class Task:
+    """A search or playlist extraction run by the daemon"""
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, task_id, kind, params):
+        self.id = task_id
+        self.kind = kind
+        self.params = params
+        self.state = self.RUNNING
+        self.progress = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.state != self.RUNNING
+
+    def as_dict(self, result=False):
+        data = {'id': self.id, 'kind': self.kind, 'params': self.params, 'state': self.state,
+                'progress': self.progress, 'error': self.error, 'created': round(self.created, 3),
+                'finished_at': self.finished_at and round(self.finished_at, 3)}
+        if result:
+            data['result'] = self.result
+        return data
+
+
+class Daemon:
+    """The state kept between requests: scheduler, caches, tasks and events
+
+    max_workers is the number of parallel downloads, or their maximum with
+    adaptive=True (see ytdl.adaptive). bandwidth caps the combined rate in
+    bytes per second. The YouTube Data API client used by searches is
+    created on the first search.
+    """
+    def __init__(self, output_dir, max_workers=3, bandwidth=None, adaptive=False, accelerate=False,
+                 segments=None, chunk_size=None, api_key=None, idle_timeout=IDLE_TIMEOUT, metrics=None):
+        self.output_dir = output_dir
+        self.api_key = api_key
+        self.started_at = time.time()
+        self.events = EventLog()
+        self.progress = ProgressBus()
+        self.metrics = MetricsLog(metrics)
+        self.library = LibraryIndex()
+        self.controller = AimdController('downloads', initial=max_workers, on_decision=self._on_decision)
+        self.scheduler = DownloadScheduler(
+            output_dir,
+            max_workers=max_workers,
+            on_update=self._on_update,
+            on_progress=lambda job, d: self.progress.publish_hook(job.id, d),
+            archive=DownloadArchive(),
+            probe_cache=ProbeCache(),
+            library=self.library,
+            retain_finished=False,
+            accelerate=accelerate,
+            segments=segments,
+            chunk_size=chunk_size,
+            bandwidth=bandwidth,
+            controller=self.controller,
+            idle_timeout=idle_timeout,
+        )
+        self._lock = threading.Lock()
+        # Unfinished jobs by id, then the dicts of the last MAX_FINISHED finished ones
+        self._jobs = {}
+        self._finished = collections.OrderedDict()
+        self._tasks = collections.OrderedDict()
+        self._task_ids = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=TASK_WORKERS, thread_name_prefix='daemon-task')
+        self._search = None
+        self._stop = threading.Event()
+        self.configure(max_workers=max_workers, adaptive=adaptive)
+        threading.Thread(target=self._sample_progress, name='daemon-progress', daemon=True).start()
+
+    def status(self):
+        snapshot = self.progress.snapshot()
+        with self._lock:
+            running_tasks = sum(1 for task in self._tasks.values() if not task.finished)
+        status = {
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started_at, 1),
+            'output_dir': self.output_dir,
+            'max_workers': self.scheduler.max_workers,
+            'adaptive': self.controller.running,
+            'bandwidth': self.scheduler.governor.rate,
+            'counts': self.scheduler.counts(),
+            'queued': self.scheduler.pending(),
+            'active': snapshot['active'],
+            'bytes_per_sec': round(snapshot['bytes_per_sec']),
+            'tasks': running_tasks,
+            'last_event': self.events.last_id,
+        }
+        if self._search is not None:
+            status['api'] = self._search.client.stats()
+        return status
+
+    def configure(self, max_workers=None, adaptive=None, bandwidth=None):
+        """Change the worker count, adaptive tuning or rate limit of the running queue
+
+        bandwidth is bytes/sec or a size such as '5M'; 0 or '' removes the limit.
+        """
+        if max_workers is not None:
+            max_workers = self._integer(max_workers, 'max_workers')
+        if adaptive or (adaptive is None and self.controller.running):
+            if max_workers:
+                self.controller.set_bounds(maximum=max_workers)
+            self.controller.start()
+        else:
+            self.controller.stop()
+            if max_workers:
+                self.scheduler.set_max_workers(max_workers)
+        if bandwidth is not None:
+            try:
+                rate = parse_size(bandwidth) if isinstance(bandwidth, str) and bandwidth.strip() else bandwidth
+            except ValueError as e:
+                raise DaemonError(str(e))
+            self.scheduler.governor.set_rate(rate or None)
+        return self.status()
+
+    def submit(self, urls, output_format='mp3', priority='bulk', group=None, output_dir=None, accelerate=None):
+        """Queue URLs and return their job dicts"""
+        if isinstance(urls, str):
+            urls = [urls]
+        if not urls or not isinstance(urls, list) or not all(isinstance(url, str) and url.strip() for url in urls):
+            raise DaemonError("'urls' must be a non-empty list of URLs")
+        if output_format not in FORMATS:
+            raise DaemonError(f"'format' must be one of {', '.join(FORMATS)}")
+        if priority not in PRIORITIES:
+            raise DaemonError(f"'priority' must be one of {', '.join(PRIORITIES)}")
+        if group is not None and not isinstance(group, str):
+            raise DaemonError("'group' must be a string")
+        if accelerate is not None and not isinstance(accelerate, bool):
+            raise DaemonError("'accelerate' must be true or false")
+        output_dir = self._output_dir(output_dir)
+        jobs = [self.scheduler.submit(url.strip(), output_format, priority=PRIORITIES[priority], group=group,
+                                      output_dir=output_dir, accelerate=accelerate)
+                for url in urls]
+        return [job.as_dict() for job in jobs]
+
+    def job(self, job_id):
+        job_id = self._integer(job_id, 'job id')
+        with self._lock:
+            job = self._jobs.get(job_id)
+            data = job.as_dict() if job is not None else self._finished.get(job_id)
+        if data is None:
+            raise DaemonError(f"No job {job_id}", 404)
+        return data
+
+    def jobs(self, group=None):
+        with self._lock:
+            jobs = [job.as_dict() for job in self._jobs.values()] + list(self._finished.values())
+        if group is not None:
+            jobs = [job for job in jobs if job['group'] == group]
+        return sorted(jobs, key=lambda job: job['id'])
+
+    def cancel(self, job_id=None, group=None):
+        """Cancel one job, a group, or every job; returns the number canceled"""
+        with self._lock:
+            if job_id is not None:
+                job_id = self._integer(job_id, 'job id')
+                if job_id not in self._jobs and job_id not in self._finished:
+                    raise DaemonError(f"No job {job_id}", 404)
+                jobs = [self._jobs[job_id]] if job_id in self._jobs else []
+            else:
+                jobs = [job for job in self._jobs.values() if group is None or job.group == group]
+        for job in jobs:
+            self.scheduler.cancel(job)
+        return len(jobs)
+
+    def search(self, keywords, languages=None, levels=None, max_results=25, duration='any', order='relevance',
+               after=None, before=None):
+        """Start a search over every keyword x language x level combination"""
+        from ytdl.search import LANGUAGES, LEVELS, SEARCH_ORDERS, VIDEO_DURATIONS, published_timestamp
+
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        if not keywords or not isinstance(keywords, list) or not all(
+                isinstance(keyword, str) and keyword.strip() for keyword in keywords):
+            raise DaemonError("'keywords' must be a non-empty list of strings")
+        languages = self._choices(languages or ['ja'], LANGUAGES, 'languages')
+        levels = self._choices(levels or ['beginner'], LEVELS, 'levels')
+        max_results = self._integer(max_results, 'max_results')
+        if max_results < 1:
+            raise DaemonError("'max_results' must be 1 or more")
+        if duration not in VIDEO_DURATIONS:
+            raise DaemonError(f"'duration' must be one of {', '.join(VIDEO_DURATIONS)}")
+        if order not in SEARCH_ORDERS:
+            raise DaemonError(f"'order' must be one of {', '.join(SEARCH_ORDERS)}")
+        for name, date in (('after', after), ('before', before)):
+            try:
+                if date is not None:
+                    published_timestamp(date)
+            except (TypeError, ValueError):
+                raise DaemonError(f"'{name}' must be a date such as 2024-01-31")
+        if not self.api_key:
+            raise DaemonError("The daemon has no YOUTUBE_API_KEY", 503)
+        params = {'keywords': keywords, 'languages': languages, 'levels': levels, 'max_results': max_results,
+                  'duration': duration, 'order': order, 'after': after, 'before': before}
+        return self._start_task('search', params, self._run_search)
+
+    def extract(self, urls, output_dir=None, download=None, priority='bulk'):
+        """Start writing the video URLs of playlists to files, optionally downloading them"""
+        if isinstance(urls, str):
+            urls = [urls]
+        if not urls or not isinstance(urls, list) or not all(isinstance(url, str) and url.strip() for url in urls):
+            raise DaemonError("'urls' must be a non-empty list of URLs")
+        if download is not None and download not in FORMATS:
+            raise DaemonError(f"'download' must be one of {', '.join(FORMATS)}")
+        if priority not in PRIORITIES:
+            raise DaemonError(f"'priority' must be one of {', '.join(PRIORITIES)}")
+        params = {'urls': urls, 'output_dir': self._output_dir(output_dir) or self.output_dir, 'download': download,
+                  'priority': priority}
+        return self._start_task('extract', params, self._run_extract)
+
+    def task(self, task_id):
+        task_id = self._integer(task_id, 'task id')
+        with self._lock:
+            task = self._tasks.get(task_id)
+        if task is None:
+            raise DaemonError(f"No task {task_id}", 404)
+        return task.as_dict(result=True)
+
+    def close(self):
+        """Cancel the remaining work and stop the background threads"""
+        self._stop.set()
+        self.controller.stop()
+        self.scheduler.cancel_all()
+        self.scheduler.shutdown()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._search is not None:
+            self._search.details.close()
+            self._search.client.close()
+        self.events.close()
+
+    def _start_task(self, kind, params, run):
+        with self._lock:
+            task = Task(next(self._task_ids), kind, params)
+            self._tasks[task.id] = task
+            while len(self._tasks) > MAX_TASKS and next(iter(self._tasks.values())).finished:
+                self._tasks.popitem(last=False)
+        self.events.publish('task', task=task.as_dict())
+        self._executor.submit(self._run_task, task, run)
+        return task.as_dict()
+
+    def _run_task(self, task, run):
+        try:
+            task.result = run(task)
+            task.state = Task.DONE
+        except Exception as e:
+            logger.warning("%s task %d failed: %s", task.kind, task.id, e)
+            task.error = str(e)
+            task.state = Task.FAILED
+        task.finished_at = time.time()
+        self.events.publish('task', task=task.as_dict())
+
+    def _search_client(self):
+        if self._search is None:
+            from ytdl.api import ApiClient
+            from ytdl.cache import ApiCache
+            from ytdl.search import SearchClient
+
+            self._search = SearchClient(self.api_key, cache=ApiCache(), client=ApiClient(self.api_key))
+        return self._search
+
+    def _run_search(self, task):
+        params = task.params
+        client = self._search_client()
+        filters = dict(duration=params['duration'], order=params['order'], published_after=params['after'],
+                       published_before=params['before'])
+        keywords, languages, levels = params['keywords'], params['languages'], params['levels']
+        if len(keywords) * len(languages) * len(levels) == 1:
+            pages = client.iter_pages(keywords[0], languages[0], levels[0], params['max_results'], **filters)
+        else:
+            pages = client.iter_matrix(keywords, languages, levels, params['max_results'], **filters)
+        videos = []
+        for page in pages:
+            self.library.add_results(page, languages[0], levels[0])
+            videos.extend(page)
+            task.progress = len(videos)
+            self.events.publish('task', task=task.as_dict())
+        return {'videos': videos}
+
+    def _run_extract(self, task):
+        from ytdl.playlist import extract_many
+        from ytdl.urlfile import UrlFileImporter
+
+        params = task.params
+        os.makedirs(params['output_dir'], exist_ok=True)
+
+        def on_progress(url, title, count):
+            task.progress = count
+            self.events.publish('message', text=f"{title}: {count} URLs", task=task.id)
+
+        results = extract_many(params['urls'], params['output_dir'], on_progress=on_progress)
+        playlists = [{'url': url, 'file': output_filename, 'count': count, 'error': error and str(error)}
+                     for url, output_filename, count, error in results]
+        result = {'playlists': playlists}
+        if params['download']:
+            group = f"extract-{task.id}"
+            importer = UrlFileImporter(self.scheduler, params['download'], priority=PRIORITIES[params['priority']],
+                                       group=group, output_dir=params['output_dir'])
+            importer.run([{'path': playlist['file']} for playlist in playlists if playlist['error'] is None],
+                         should_stop=self._stop.is_set)
+            result.update(group=group, submitted=importer.submitted, duplicates=importer.duplicates)
+        return result
+
+    def _on_update(self, job):
+        # Worker thread (or the submitting thread for the initial 'queued')
+        if job.state == DownloadJob.RUNNING:
+            self.progress.publish(job.id, label=job.url, state='running')
+        elif job.state in (DownloadJob.FETCHED, DownloadJob.POSTPROCESSING):
+            self.progress.publish(job.id, label=job.title, state='converting', speed=0.0)
+        elif job.finished:
+            summary = self.progress.finish(job.id)
+            if summary is not None:
+                self.metrics.record_job(summary, url=job.url, format=job.format, state=job.state,
+                                        extract_seconds=job.extract_seconds, fetch_seconds=job.fetch_seconds,
+                                        postprocess=job.postprocess, postprocess_seconds=job.postprocess_seconds)
+        data = job.as_dict()
+        with self._lock:
+            if job.finished:
+                self._jobs.pop(job.id, None)
+                self._finished[job.id] = data
+                while len(self._finished) > MAX_FINISHED:
+                    self._finished.popitem(last=False)
+            else:
+                self._jobs[job.id] = job
+        self.events.publish('job', job=data)
+
+    def _on_decision(self, decision):
+        self.metrics.record_decision(decision)
+        if decision['limit'] != decision['previous']:
+            self.events.publish('message', text=f"Parallel downloads: {decision['previous']} -> "
+                                                f"{decision['limit']} ({decision['reason']})")
+
+    def _sample_progress(self):
+        version = None
+        last_sample = 0
+        while not self._stop.wait(PROGRESS_SECONDS):
+            snapshot = self.progress.snapshot()
+            if snapshot['version'] != version and snapshot['jobs']:
+                self.events.publish('progress', jobs=snapshot['jobs'], active=snapshot['active'],
+                                    bytes_per_sec=round(snapshot['bytes_per_sec']), eta=snapshot['eta'],
+                                    queued=self.scheduler.pending())
+            version = snapshot['version']
+            if snapshot['active'] and time.monotonic() - last_sample >= SAMPLE_SECONDS:
+                last_sample = time.monotonic()
+                self.metrics.record_sample(snapshot, queued=self.scheduler.pending())
+
+    @staticmethod
+    def _integer(value, name):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise DaemonError(f"'{name}' must be a number")
+
+    @staticmethod
+    def _choices(values, choices, name):
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not all(value in choices for value in values):
+            raise DaemonError(f"'{name}' must be a list of {', '.join(choices)}")
+        return values
+
+    @staticmethod
+    def _seconds(value, name):
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            seconds = -1
+        if not 0 <= seconds < float('inf'):
+            raise DaemonError(f"'{name}' must be a number of seconds, 0 or more")
+        return seconds
+
+    def _output_dir(self, output_dir):
+        """Check an output_dir sent by a client; None stands for the daemon's own
+
+        It must be an absolute path to an existing directory. Missing
+        directories are created only inside the daemon's output directory.
+        """
+        if output_dir is None or output_dir == '':
+            return None
+        if not isinstance(output_dir, str) or not os.path.isabs(output_dir):
+            raise DaemonError("'output_dir' must be an absolute path")
+        output_dir = os.path.normpath(output_dir)
+        if not os.path.isdir(output_dir):
+            root = os.path.realpath(self.output_dir)
+            if os.path.commonpath([root, os.path.realpath(output_dir)]) != root:
+                raise DaemonError(f"Output directory {output_dir} does not exist")
+            os.makedirs(output_dir, exist_ok=True)
+        return output_dir
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """Routes the JSON API to the server's Daemon"""
+    server_version = 'ytdl-daemon'
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def _dispatch(self, method):
+        app = self.server.app
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = [part for part in url.path.split('/') if part]
+        token = self.server.token
+        if token and self.headers.get('Authorization') != f"Bearer {token}":
+            self._send_json({'error': "Missing or wrong token"}, 401)
+            return
+        try:
+            body = self._read_json() if method == 'POST' else {}
+            if method == 'GET' and route == ['events', 'stream']:
+                self._stream_events(query)
+                return
+            if method == 'GET' and route == ['metrics']:
+                self._send(telemetry.render_prometheus().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+                return
+            result = self._route(app, method, route, query, body)
+        except DaemonError as e:
+            self._send_json({'error': str(e)}, e.status)
+            return
+        except Exception as e:
+            logger.exception("%s %s failed", method, self.path)
+            self._send_json({'error': str(e)}, 500)
+            return
+        self._send_json(result)
+        if route == ['shutdown']:
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def _route(self, app, method, route, query, body):
+        if method == 'GET' and route == ['status']:
+            return app.status()
+        if route == ['jobs']:
+            if method == 'GET':
+                return {'jobs': app.jobs(query.get('group'))}
+            if method == 'POST':
+                return {'jobs': app.submit(body.get('urls'), body.get('format', 'mp3'), body.get('priority', 'bulk'),
+                                           body.get('group'), body.get('output_dir'), body.get('accelerate'))}
+            if method == 'DELETE':
+                return {'canceled': app.cancel(group=query.get('group'))}
+        if len(route) == 2 and route[0] == 'jobs':
+            if method == 'GET':
+                return app.job(route[1])
+            if method == 'DELETE':
+                return {'canceled': app.cancel(route[1])}
+        if method == 'POST' and route == ['search']:
+            return app.search(body.get('keywords'), body.get('languages'), body.get('levels'),
+                              body.get('max_results', 25), body.get('duration', 'any'), body.get('order', 'relevance'),
+                              body.get('after'), body.get('before'))
+        if method == 'POST' and route == ['extract']:
+            return app.extract(body.get('urls'), body.get('output_dir'), body.get('download'),
+                               body.get('priority', 'bulk'))
+        if method == 'GET' and len(route) == 2 and route[0] == 'tasks':
+            return app.task(route[1])
+        if method == 'GET' and route == ['events']:
+            timeout = min(app._seconds(query.get('timeout', 0), 'timeout'), MAX_POLL_SECONDS)
+            events, missed = app.events.read(app._integer(query.get('after', 0), 'after'), timeout)
+            return {'events': events, 'missed': missed, 'last': app.events.last_id}
+        if method == 'POST' and route == ['settings']:
+            return app.configure(body.get('max_workers'), body.get('adaptive'), body.get('bandwidth'))
+        if method == 'POST' and route == ['shutdown']:
+            return {'ok': True}
+        raise DaemonError(f"No route for {method} {urlsplit(self.path).path}", 404)
+
+    def _read_json(self):
+        # Requiring a JSON content type keeps web pages from posting to the daemon
+        if self.headers.get_content_type() != 'application/json':
+            raise DaemonError("POST bodies must be application/json", 415)
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as e:
+            raise DaemonError(f"Invalid JSON: {e}")
+        if not isinstance(body, dict):
+            raise DaemonError("The body must be a JSON object")
+        return body
+
+    def _stream_events(self, query):
+        events = self.server.app.events
+        after = self.headers.get('Last-Event-ID') or query.get('after')
+        after = self.server.app._integer(after, 'after') if after is not None else events.last_id
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        try:
+            while not self.server.stopping.is_set():
+                batch, _ = events.read(after, KEEPALIVE_SECONDS)
+                if not batch:
+                    self.wfile.write(b': keep-alive\n\n')
+                for event in batch:
+                    data = json.dumps(event, ensure_ascii=False, default=str)
+                    self.wfile.write(f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n".encode('utf-8'))
+                    after = event['id']
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_json(self, data, status=200):
+        self._send(json.dumps(data, ensure_ascii=False, default=str).encode('utf-8'), 'application/json', status)
+
+    def _send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class DaemonServer(ThreadingHTTPServer):
+    """HTTP server for a Daemon; serve_forever() runs until POST /shutdown or shutdown()"""
+    daemon_threads = True
+
+    def __init__(self, app, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+        super().__init__((host, port), DaemonHandler)
+        self.app = app
+        self.token = token
+        self.stopping = threading.Event()
+
+    def shutdown(self):
+        self.stopping.set()
+        self.app.events.close()
+        super().shutdown()
+
+    def handle_error(self, request, client_address):
+        # Clients dropping the connection (e.g. an event stream) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
@@ -0,0 +1,185 @@
+"""Batched video detail lookups
+
+Durations and view counts come from the API's videos endpoint, which
+takes up to 50 IDs per call for the same single quota unit. DetailsFetcher
+collects IDs from every caller (search pages, batch searches, URL and
+playlist files) and sends them in full batches, waiting at most `linger`
+seconds for a batch to fill. Fresh details are served from the ApiCache,
+and an ID that is already on its way is never requested twice.
+"""
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from ytdl import cache as api_cache
+
+logger = logging.getLogger(__name__)
+
+# The API takes at most this many IDs per videos call
+BATCH_SIZE = 50
+# Longest time an ID waits for its batch to fill
+DEFAULT_LINGER = 0.05
+# Batches sent at the same time
+MAX_CALLS = 4
+
+
+class DetailsFetcher:
+    """Shared queue of video IDs flushed to the videos endpoint in batches
+
+    Thread-safe; one instance is meant to be shared by everything in the
+    process that needs video details.
+    """
+    def __init__(self, client, cache=None, linger=DEFAULT_LINGER, batch_size=BATCH_SIZE):
+        self.client = client
+        self.cache = cache
+        self.linger = linger
+        self.batch_size = batch_size
+        self.requested = 0
+        self.cache_hits = 0
+        self.calls = 0
+        self.fetched = 0
+        # video_id -> (Future, time added), oldest first
+        self._pending = {}
+        self._inflight = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._pool = None
+        self._closed = False
+
+    def submit(self, video_id):
+        """Return a Future for the video's {'contentDetails': ..., 'statistics': ...}
+
+        The result is {} for videos the API does not return (deleted or
+        private).
+        """
+        with self._condition:
+            self.requested += 1
+            if video_id in self._pending:
+                return self._pending[video_id][0]
+            if video_id in self._inflight:
+                return self._inflight[video_id]
+
+        details = self._cached(video_id)
+        future = Future()
+        if details is not None:
+            with self._condition:
+                self.cache_hits += 1
+            future.set_result(details)
+            return future
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("DetailsFetcher is closed")
+            # Another thread may have queued it while the cache was checked
+            if video_id in self._pending:
+                return self._pending[video_id][0]
+            if video_id in self._inflight:
+                return self._inflight[video_id]
+            self._pending[video_id] = (future, time.monotonic())
+            if self._thread is None:
+                self._pool = ThreadPoolExecutor(max_workers=MAX_CALLS)
+                self._thread = threading.Thread(target=self._run, name="details-fetcher", daemon=True)
+                self._thread.start()
+            # Wakes the flusher to start the linger timer or send a full batch
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._condition.notify()
+        return future
+
+    def get_many(self, video_ids, timeout=None):
+        """Return {video_id: details} for the IDs the API knows, waiting for all of them"""
+        futures = {video_id: self.submit(video_id) for video_id in dict.fromkeys(video_ids)}
+        details = {}
+        for video_id, future in futures.items():
+            result = future.result(timeout)
+            if result:
+                details[video_id] = result
+        return details
+
+    def flush(self):
+        """Send the queued IDs now instead of waiting for the linger time"""
+        with self._condition:
+            for video_id in self._pending:
+                self._pending[video_id] = (self._pending[video_id][0], 0)
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'requested': self.requested,
+                'cache_hits': self.cache_hits,
+                'calls': self.calls,
+                'fetched': self.fetched,
+                'ids_per_call': round(self.fetched / self.calls, 1) if self.calls else 0,
+            }
+
+    def close(self):
+        """Send what is still queued and stop the background thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+            self._pool.shutdown(wait=True)
+
+    def _cached(self, video_id):
+        if self.cache is None:
+            return None
+        content = self.cache.get(f"content:{video_id}")
+        statistics = self.cache.get(f"statistics:{video_id}") if content is not None else None
+        if content is None or statistics is None:
+            return None
+        return {'contentDetails': content, 'statistics': statistics}
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._pending:
+                        waited = time.monotonic() - next(iter(self._pending.values()))[1]
+                        if len(self._pending) >= self.batch_size or self._closed or waited >= self.linger:
+                            break
+                        self._condition.wait(self.linger - waited)
+                    elif self._closed:
+                        return
+                    else:
+                        self._condition.wait()
+                batch = {}
+                for video_id in list(itertools.islice(self._pending, self.batch_size)):
+                    batch[video_id] = self._pending.pop(video_id)[0]
+                self._inflight.update(batch)
+                self.calls += 1
+                self.fetched += len(batch)
+            self._pool.submit(self._fetch, batch)
+
+    def _fetch(self, batch):
+        try:
+            data = self.client.get('videos', {
+                'part': 'contentDetails,statistics',
+                'id': ','.join(batch),
+            })
+        except Exception as e:
+            with self._condition:
+                for video_id in batch:
+                    self._inflight.pop(video_id, None)
+            for future in batch.values():
+                future.set_exception(e)
+            return
+
+        items = {item['id']: item for item in data.get('items', [])}
+        if self.cache:
+            # A cache that cannot be written (locked, disk full) must not leave the futures unresolved
+            try:
+                for video_id, item in items.items():
+                    self.cache.set(f"content:{video_id}", item.get('contentDetails', {}),
+                                   api_cache.CONTENT_DETAILS_TTL)
+                    self.cache.set(f"statistics:{video_id}", item.get('statistics', {}), api_cache.STATISTICS_TTL)
+            except Exception as e:
+                logger.warning("Caching video details failed: %s", e)
+        with self._condition:
+            for video_id in batch:
+                self._inflight.pop(video_id, None)
+        for video_id, future in batch.items():
+            future.set_result(items.get(video_id, {}))
@@ -0,0 +1,798 @@
+"""Download scheduler and transcode pipeline
+
+yt_dlp is imported lazily so that importing this module stays cheap.
+"""
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+
+from ytdl import telemetry
+from ytdl.accelerate import DEFAULT_CHUNK_SIZE, DEFAULT_SEGMENTS, download_accelerated
+from ytdl.bandwidth import BandwidthGovernor
+from ytdl.probe import url_expiry
+from ytdl.utils import data_dir, extract_video_id
+
+logger = logging.getLogger(__name__)
+
+
+class MyLogger:
+    """Send yt-dlp's output to the ytdl.downloader logger"""
+    def __init__(self, on_warning=None):
+        # Receives yt-dlp's warnings and errors, which include its retries
+        self.on_warning = on_warning
+    def debug(self, msg):
+        logger.debug(msg)
+    def info(self, msg):
+        logger.info(msg)
+    def warning(self, msg):
+        logger.warning(msg)
+        if 'Retrying' in msg:
+            telemetry.inc('ytdl_retries_total', source='yt-dlp')
+        if self.on_warning:
+            self.on_warning(msg)
+    def error(self, msg):
+        logger.error(msg)
+        if self.on_warning:
+            self.on_warning(msg)
+
+
+# Container used for each audio codec when the stream is copied as is
+AUDIO_CONTAINERS = {
+    'aac': 'm4a',
+    'mp4a': 'm4a',
+    'opus': 'opus',
+    'vorbis': 'ogg',
+    'mp3': 'mp3',
+    'flac': 'flac',
+}
+# Output formats that go through the audio post-processing stage
+AUDIO_FORMATS = ('mp3', 'audio')
+
+# Job priorities, lowest runs first: a download started by hand, a batch,
+# and work nobody is waiting for (such as resuming an old batch)
+INTERACTIVE = 0
+BULK = 1
+BACKGROUND = 2
+PRIORITIES = {'interactive': INTERACTIVE, 'bulk': BULK, 'background': BACKGROUND}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+
+
+def build_ydl_opts(output_dir, output_format, progress_hook, transcode=True, fragments=None, chunk_size=None):
+    """Build yt-dlp options for the given output format
+
+    With transcode=False the MP3 conversion is left to the caller so the
+    fetch can be handed off to a separate transcode stage. fragments sets
+    how many DASH/HLS fragments are fetched at once and chunk_size splits
+    plain HTTP downloads into ranged requests of that many bytes.
+    """
+    ydl_opts = {
+        'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
+        'progress_hooks': [progress_hook],
+        'logger': MyLogger(),
+        'noplaylist': True,
+        # Resume from .part files left by an interrupted run
+        'continuedl': True,
+    }
+    if fragments:
+        ydl_opts['concurrent_fragment_downloads'] = fragments
+    if chunk_size:
+        ydl_opts['http_chunk_size'] = chunk_size
+
+    if output_format == 'mp3':
+        ydl_opts['format'] = 'bestaudio/best'
+        if transcode:
+            ydl_opts['postprocessors'] = [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '192',
+            }]
+    elif output_format == 'audio':
+        # Keep the best native stream; extract_audio() only remuxes it
+        ydl_opts['format'] = 'bestaudio/best'
+    elif output_format == 'mp4':
+        ydl_opts['format'] = 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4]/best'
+    return ydl_opts
+
+
+def run_ffmpeg(args, target_path, on_start=None):
+    """Run ffmpeg with args writing target_path, removing it on failure"""
+    process = subprocess.Popen(
+        ['ffmpeg', '-y', '-loglevel', 'error'] + args + [target_path],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    if on_start:
+        on_start(process)
+    _, stderr = process.communicate()
+    if process.returncode != 0:
+        if os.path.exists(target_path):
+            os.remove(target_path)
+        message = stderr.decode('utf-8', 'replace').strip() or f"ffmpeg exited with code {process.returncode}"
+        raise RuntimeError(message)
+
+
+def transcode_to_mp3(source_path, on_start=None):
+    """Convert a downloaded audio file to 192 kbps MP3 with ffmpeg
+
+    on_start(process) is called with the running ffmpeg process so it can be
+    terminated on cancel. Returns the path of the MP3 file.
+    """
+    target_path = os.path.splitext(source_path)[0] + '.mp3'
+    if os.path.abspath(source_path) == os.path.abspath(target_path):
+        return target_path
+
+    run_ffmpeg(['-i', source_path, '-vn', '-codec:a', 'libmp3lame', '-b:a', '192k'], target_path, on_start)
+    os.remove(source_path)
+    return target_path
+
+
+def normalize_codec(acodec):
+    """Reduce a yt-dlp or ffprobe codec name (e.g. mp4a.40.2) to its family"""
+    codec = (acodec or '').split('.')[0].lower()
+    return codec if codec and codec != 'none' else None
+
+
+def probe_audio_codec(path):
+    """Return the codec of the first audio stream using ffprobe, or None"""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'a:0', '-show_entries', 'stream=codec_name',
+             '-of', 'default=noprint_wrappers=1:nokey=1', path],
+            capture_output=True, text=True, timeout=30,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return normalize_codec(result.stdout.strip()) if result.returncode == 0 else None
+
+
+def extract_audio(source_path, output_format, acodec=None, on_start=None):
+    """Turn a downloaded file into the audio file for an mp3 or audio job
+
+    The audio stream is kept as is whenever the target allows it: 'audio'
+    jobs only get their container changed to match the codec (or nothing
+    at all for m4a), and mp3 jobs whose source is already MP3 are copied.
+    Re-encoding is the fallback. Returns (path, method) where method is
+    'none', 'copy' or 'transcode'.
+    """
+    codec = normalize_codec(acodec) or probe_audio_codec(source_path)
+    base, ext = os.path.splitext(source_path)
+    if output_format == 'mp3' and codec != 'mp3':
+        return transcode_to_mp3(source_path, on_start), 'transcode'
+
+    container = 'mp3' if output_format == 'mp3' else AUDIO_CONTAINERS.get(codec)
+    if container is not None:
+        if ext.lower() == '.' + container:
+            return source_path, 'none'
+        target_path = f"{base}.{container}"
+        try:
+            run_ffmpeg(['-i', source_path, '-vn', '-codec:a', 'copy'], target_path, on_start)
+            os.remove(source_path)
+            return target_path, 'copy'
+        except RuntimeError:
+            pass
+
+    # Unknown codec, or one the container refused: re-encode to AAC
+    target_path = base + ('.aac.m4a' if ext.lower() == '.m4a' else '.m4a')
+    run_ffmpeg(['-i', source_path, '-vn', '-codec:a', 'aac', '-b:a', '192k'], target_path, on_start)
+    os.remove(source_path)
+    return target_path, 'transcode'
+
+
+class WorkerExtractors:
+    """Long-lived YoutubeDL instances owned by one fetch worker
+
+    Creating a YoutubeDL (and compiling its format selector) happens once
+    per worker and option set instead of once per job. Progress hooks of
+    every instance go through dispatch() to the hook of the job the worker
+    is currently running.
+    """
+    def __init__(self):
+        self.hook = None
+        self._instances = {}
+
+    def dispatch(self, d):
+        if self.hook is not None:
+            self.hook(d)
+
+    def get(self, key, ydl_opts):
+        import yt_dlp
+
+        ydl = self._instances.get(key)
+        if ydl is None:
+            ydl = self._instances[key] = yt_dlp.YoutubeDL(ydl_opts)
+        return ydl
+
+    def close(self):
+        for ydl in self._instances.values():
+            ydl.close()
+        self._instances.clear()
+
+
+class DownloadJob:
+    """A single URL tracked by the download scheduler"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FETCHED = 'fetched'
+    POSTPROCESSING = 'postprocessing'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELED = 'canceled'
+
+    FINISHED_STATES = (DONE, FAILED, CANCELED)
+
+    def __init__(self, job_id, url, output_format, priority=BULK, group=None, output_dir=None, accelerate=False):
+        self.id = job_id
+        self.url = url
+        self.format = output_format
+        self.priority = priority
+        # Jobs submitted together (e.g. one batch) that can be waited for and counted as a unit
+        self.group = group
+        self.output_dir = output_dir
+        self.accelerate = accelerate
+        self.state = self.QUEUED
+        self.title = None
+        self.filepath = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.process = None
+        self.journal_id = None
+        self.video_id = extract_video_id(url)
+        self.skipped = False
+        self.acodec = None
+        # How the audio file was produced: 'none', 'copy' or 'transcode'
+        self.postprocess = None
+        self.received_bytes = 0
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        # Seconds spent in each stage: extraction (or probe cache lookup),
+        # fetching the media, and postprocess (transcode or copy)
+        self.extract_seconds = None
+        self.fetch_seconds = None
+        self.postprocess_seconds = None
+
+    @property
+    def finished(self):
+        return self.state in self.FINISHED_STATES
+
+    def as_dict(self):
+        """Return the job's public fields as a JSON-serialisable dict"""
+        group = self.group if self.group is None or isinstance(self.group, str) else repr(self.group)
+        return {
+            'id': self.id,
+            'url': self.url,
+            'format': self.format,
+            'priority': PRIORITY_NAMES.get(self.priority, self.priority),
+            'group': group,
+            'output_dir': self.output_dir,
+            'accelerate': self.accelerate,
+            'state': self.state,
+            'title': self.title,
+            'video_id': self.video_id,
+            'filepath': self.filepath,
+            'error': self.error,
+            'skipped': self.skipped,
+            'postprocess': self.postprocess,
+            'received_bytes': self.received_bytes,
+            'extract_seconds': self.extract_seconds,
+            'fetch_seconds': self.fetch_seconds,
+            'postprocess_seconds': self.postprocess_seconds,
+        }
+
+
+class DownloadScheduler:
+    """Run download jobs on a two-stage fetch / transcode pipeline
+
+    Fetch workers are started on demand up to max_workers and exit once the
+    queue is drained, or after idle_timeout seconds without a new job so
+    that a long-running process keeps them and their extractors warm.
+    Audio (mp3 and native 'audio') jobs are handed to a separate pool of
+    transcode workers (one per CPU core by default) through a bounded
+    queue, so a full transcode stage makes the fetch workers wait instead
+    of piling up files. That stage re-encodes only when it has to;
+    job.postprocess records whether the stream was copied or transcoded.
+    on_update(job) is called from the worker thread every time a job changes
+    state, and on_progress(job, d) with every yt-dlp progress dict.
+
+    With a JobJournal, every state change is also written to the journal
+    so the batch can be resumed after a crash. With a DownloadArchive,
+    videos already downloaded in the same format are marked done (with
+    job.skipped set) before any network call, and finished downloads are
+    added to it.
+
+    Per-state counts are kept incrementally. With retain_finished=False,
+    finished jobs are dropped from memory, which keeps very large imports
+    bounded.
+
+    With accelerate=True, MP4 jobs fetch their video and audio formats in
+    parallel, each split into `segments` concurrent range or fragment
+    requests of chunk_size bytes (see ytdl.accelerate).
+
+    One scheduler can serve a whole session: jobs may be submitted while
+    others run and are started in priority order (INTERACTIVE, BULK,
+    BACKGROUND), each with its own output folder. An interactive job does
+    not wait for a worker to free up: it gets one worker beyond
+    max_workers. Jobs submitted with a group are counted and waited for
+    per group. bandwidth caps the combined download rate in bytes per
+    second, shared evenly by the running jobs (see ytdl.bandwidth).
+
+    With an AimdController the number of fetch workers follows its limit;
+    the scheduler reports bytes received, finished fetches and yt-dlp
+    warnings to it. Starting and stopping the controller is up to the
+    caller.
+
+    Each stage runs in a ytdl.telemetry span tagged with the job, and a
+    'job' record with the queue wait and stage times is traced when the
+    job finishes. profile_job (a job number, video ID or URL) runs that
+    one job under telemetry.profile(), writing its fetch and postprocess
+    profiles to the profiles folder in the data folder.
+
+    Each fetch worker keeps its YoutubeDL instances for all of its jobs.
+    With a ProbeCache, extracted info dicts are stored per video and
+    reused until their media URLs expire, so a repeated or retried job
+    skips extraction. With a LibraryIndex, finished downloads are added
+    to the local library.
+    """
+    def __init__(self, output_dir, max_workers=3, on_update=None, transcode_workers=None, on_progress=None,
+                 journal=None, archive=None, retain_finished=True, accelerate=False, segments=None,
+                 chunk_size=None, probe_cache=None, library=None, bandwidth=None, controller=None,
+                 profile_job=None, profiler='cprofile', idle_timeout=0):
+        self.output_dir = output_dir
+        self.max_workers = max(1, int(max_workers))
+        self.transcode_workers = max(1, int(transcode_workers or os.cpu_count() or 1))
+        self.on_update = on_update
+        self.on_progress = on_progress
+        self.journal = journal
+        self.archive = archive
+        self.retain_finished = retain_finished
+        self.accelerate = accelerate
+        self.segments = segments or DEFAULT_SEGMENTS
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        self.probe_cache = probe_cache
+        self.library = library
+        self.governor = BandwidthGovernor(bandwidth)
+        self._jobs = {}
+        self._counts = {}
+        self._groups = {}
+        self._queue = queue.PriorityQueue()
+        self._transcode_queue = queue.Queue(maxsize=self.transcode_workers * 2)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._active_workers = 0
+        self.idle_timeout = idle_timeout
+        self._idle_workers = 0
+        self._transcode_started = False
+        self._next_id = 1
+        self.profile_job = None if profile_job is None else str(profile_job)
+        self.profiler = profiler
+        self._profiled_job = None
+        self.controller = controller
+        if controller is not None:
+            controller.attach(self.set_max_workers, self._demand)
+
+    def submit(self, url, output_format, batch_id=None, journal_id=None, fetched_path=None, priority=BULK,
+               group=None, output_dir=None, accelerate=None):
+        """Queue a URL and return its DownloadJob
+
+        batch_id records a new job in the journal; journal_id resumes an
+        existing one. fetched_path is the already downloaded source of an
+        MP3 job that was interrupted before conversion, which then goes
+        straight to the transcode stage. output_dir and accelerate default
+        to the scheduler's.
+        """
+        if self.journal is not None and journal_id is None and batch_id is not None:
+            journal_id = self.journal.add_job(batch_id, url)
+        with self._lock:
+            job = DownloadJob(self._next_id, url, output_format, priority, group, output_dir or self.output_dir,
+                              self.accelerate if accelerate is None else accelerate)
+            job.journal_id = journal_id
+            if fetched_path and output_format in AUDIO_FORMATS and os.path.exists(fetched_path):
+                job.filepath = fetched_path
+            self._next_id += 1
+            self._jobs[job.id] = job
+            self._counts[job.state] = self._counts.get(job.state, 0) + 1
+            if group is not None:
+                counts = self._groups.setdefault(group, {})
+                counts[job.state] = counts.get(job.state, 0) + 1
+            # Equal priorities run in submission order
+            self._queue.put((priority, job.id, job))
+            limit = self.max_workers + (1 if priority == INTERACTIVE else 0)
+            if self._idle_workers:
+                self._changed.notify_all()
+            if self._active_workers < limit and self._queue.qsize() > self._idle_workers:
+                self._start_worker()
+        self._notify(job)
+        return job
+
+    def set_max_workers(self, max_workers):
+        """Change the number of fetch workers; extra workers exit after their current job"""
+        with self._lock:
+            self.max_workers = max(1, int(max_workers))
+            if self._idle_workers:
+                self._changed.notify_all()
+            # Like submit(): idle workers take queued jobs first, each new worker takes one more
+            started = 0
+            while self._active_workers < self.max_workers and self._queue.qsize() > self._idle_workers + started:
+                self._start_worker()
+                started += 1
+
+    def cancel(self, job):
+        """Cancel a queued or in-flight job"""
+        job.cancel_event.set()
+        # Only if no worker has taken the job meanwhile; it then sees cancel_event
+        self._set_state(job, DownloadJob.CANCELED, expected=DownloadJob.QUEUED)
+        process = job.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+    def cancel_all(self):
+        for job in self.jobs:
+            if not job.finished:
+                self.cancel(job)
+
+    @property
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def pending(self):
+        """Return the number of jobs waiting for a fetch worker"""
+        return self._queue.qsize()
+
+    def wait(self, group=None):
+        """Block until every submitted job (or every job of group) has finished"""
+        if group is not None:
+            with self._changed:
+                while self._unfinished(self._groups.get(group, {})):
+                    self._changed.wait()
+            return
+        self._queue.join()
+        self._transcode_queue.join()
+
+    def shutdown(self):
+        """Stop the transcode workers once the pipeline is idle"""
+        with self._lock:
+            if not self._transcode_started:
+                return
+            self._transcode_started = False
+        for _ in range(self.transcode_workers):
+            self._transcode_queue.put(None)
+
+    def counts(self, group=None):
+        """Return the number of jobs in each state, overall or in group"""
+        with self._lock:
+            counts = self._counts if group is None else self._groups.get(group, {})
+            return {state: count for state, count in counts.items() if count}
+
+    def forget_group(self, group):
+        """Drop the counts of a group that has finished"""
+        with self._lock:
+            self._groups.pop(group, None)
+
+    def forget_finished(self):
+        """Reset the overall counts to the jobs still in progress, e.g. once a session goes idle"""
+        with self._lock:
+            for state in DownloadJob.FINISHED_STATES:
+                self._counts.pop(state, None)
+            for job_id in [job.id for job in self._jobs.values() if job.finished]:
+                del self._jobs[job_id]
+
+    @staticmethod
+    def _unfinished(counts):
+        return sum(count for state, count in counts.items() if state not in DownloadJob.FINISHED_STATES)
+
+    def _demand(self):
+        return self._active_workers - self._idle_workers + self._queue.qsize()
+
+    def _start_worker(self):
+        # Called with the lock held
+        self._active_workers += 1
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def _notify(self, job):
+        if self.on_update:
+            self.on_update(job)
+
+    def _set_state(self, job, state, error=None, expected=None):
+        """Move job to state; returns False, changing nothing, if it has finished or is not in state `expected`"""
+        with self._lock:
+            if job.finished or (expected is not None and job.state != expected):
+                return False
+            # forget_finished() may have dropped the finished counts
+            if job.state in self._counts:
+                self._counts[job.state] -= 1
+            self._counts[state] = self._counts.get(state, 0) + 1
+            counts = self._groups.get(job.group) if job.group is not None else None
+            if counts is not None:
+                counts[job.state] -= 1
+                counts[state] = counts.get(state, 0) + 1
+            job.state = state
+            if state in DownloadJob.FINISHED_STATES:
+                if not self.retain_finished:
+                    self._jobs.pop(job.id, None)
+                self._changed.notify_all()
+        if error is not None:
+            job.error = error
+        if state == DownloadJob.RUNNING:
+            job.started_at = time.monotonic()
+        elif state in DownloadJob.FINISHED_STATES:
+            self._trace_finished(job)
+        if self.journal is not None and job.journal_id is not None:
+            self.journal.update_job(job.journal_id, state, job.filepath, job.error)
+        self._notify(job)
+        return True
+
+    def _trace_finished(self, job):
+        telemetry.inc('ytdl_jobs_total', state=job.state)
+        if job.state == DownloadJob.DONE and job.received_bytes:
+            telemetry.observe('ytdl_job_bytes', job.received_bytes, telemetry.BYTES_BUCKETS)
+        if telemetry.registry.tracing:
+            now = time.monotonic()
+            telemetry.event({
+                'type': 'job', 'pid': os.getpid(), 'job': job.id, 'video_id': job.video_id, 'url': job.url,
+                'format': job.format, 'state': job.state, 'priority': job.priority, 'bytes': job.received_bytes,
+                'queued': round((job.started_at or now) - job.submitted_at, 6),
+                'total': round(now - job.submitted_at, 6),
+                'extract': job.extract_seconds, 'fetch': job.fetch_seconds, 'postprocess': job.postprocess_seconds,
+                'postprocess_method': job.postprocess, 'error': job.error,
+            })
+
+    def _call_profiled(self, job, stage, func, *args):
+        """Run func(*args), under the profiler if job is the one to profile"""
+        with self._lock:
+            spec = self.profile_job
+            if spec is not None and self._profiled_job is None and spec in (str(job.id), job.video_id, job.url):
+                self._profiled_job = job.id
+            profiled = self._profiled_job == job.id
+        if not profiled:
+            return func(*args)
+        directory = os.path.join(data_dir(), 'profiles')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"job-{job.id}-{job.video_id or 'unknown'}-{stage}.prof")
+        with telemetry.profile(path, self.profiler):
+            return func(*args)
+
+    def _worker(self):
+        extractors = WorkerExtractors()
+        try:
+            while True:
+                with self._lock:
+                    priority, job = self._next_job()
+                    if job is None:
+                        self._active_workers -= 1
+                        return
+                    if self._active_workers > self.max_workers and priority != INTERACTIVE:
+                        # Started for an interactive job, or max_workers was lowered
+                        self._queue.put((priority, job.id, job))
+                        self._queue.task_done()
+                        self._active_workers -= 1
+                        return
+                try:
+                    if not job.cancel_event.is_set():
+                        with telemetry.context(job=job.id, video_id=job.video_id, format=job.format):
+                            self._call_profiled(job, 'fetch', self._run_job, job, extractors)
+                    elif not job.finished:
+                        self._set_state(job, DownloadJob.CANCELED)
+                finally:
+                    self._queue.task_done()
+        finally:
+            extractors.close()
+
+    def _next_job(self):
+        """Return the next (priority, job), waiting up to idle_timeout for one; (None, None) to exit"""
+        # Called with the lock held
+        deadline = time.monotonic() + self.idle_timeout
+        while True:
+            try:
+                priority, _, job = self._queue.get_nowait()
+                return priority, job
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._active_workers > self.max_workers:
+                return None, None
+            self._idle_workers += 1
+            self._changed.wait(remaining)
+            self._idle_workers -= 1
+
+    def _probe(self, ydl, job, selector):
+        """Return (info, cached) for a job without downloading anything
+
+        A fresh extraction is stored in the probe cache before the download
+        starts, so a failed or interrupted job does not extract again.
+        """
+        if self.probe_cache is not None and job.video_id:
+            info = self.probe_cache.get(job.video_id, selector)
+            if info is not None:
+                return info, True
+        info = ydl.extract_info(job.url, download=False)
+        if self.probe_cache is None or not info.get('id'):
+            return info, False
+        # Same form as a --load-info-json file, which process_ie_result accepts
+        clean = ydl.sanitize_info(info, remove_private_keys=True)
+        self.probe_cache.set(info['id'], selector, clean, url_expiry(info))
+        return clean, False
+
+    def _run_job(self, job, extractors):
+        import yt_dlp
+
+        if self.archive is not None and job.video_id:
+            entry = self.archive.lookup(job.video_id, job.format)
+            if entry is not None:
+                job.filepath = entry['path']
+                job.title = entry['title']
+                job.skipped = True
+                self._set_state(job, DownloadJob.DONE)
+                return
+
+        if job.filepath:
+            if self._set_state(job, DownloadJob.FETCHED):
+                self._enqueue_transcode(job)
+            return
+
+        received = {}
+        received_lock = threading.Lock()
+
+        def my_hook(d):
+            # Raising from the progress hook is how yt-dlp aborts an
+            # in-flight download
+            if job.cancel_event.is_set():
+                raise yt_dlp.utils.DownloadCancelled()
+            if self.on_progress:
+                self.on_progress(job, d)
+            if d.get('status') == 'downloading':
+                # downloaded_bytes is a running total per file; the first report
+                # only sets the baseline so resumed .part data is not counted.
+                # Accelerated downloads report from several threads, possibly
+                # out of order, so only growth past the highest total counts.
+                name = d.get('tmpfilename') or d.get('filename')
+                downloaded = d.get('downloaded_bytes') or 0
+                with received_lock:
+                    previous = received.get(name)
+                    delta = downloaded - previous if previous is not None else 0
+                    if previous is None or delta > 0:
+                        received[name] = downloaded
+                    if delta > 0:
+                        job.received_bytes += delta
+                if delta > 0:
+                    telemetry.inc('ytdl_bytes_total', delta)
+                    if self.controller is not None:
+                        self.controller.record(delta)
+                    # Sleeping here is what slows the download down
+                    self.governor.consume(job.id, delta, job.cancel_event)
+
+        def on_merge(process):
+            self._set_state(job, DownloadJob.POSTPROCESSING)
+            job.process = process
+            if job.cancel_event.is_set():
+                process.terminate()
+
+        if not self._set_state(job, DownloadJob.RUNNING):
+            # Canceled since the worker took it
+            return
+        accelerate = job.accelerate and job.format == 'mp4'
+        if accelerate:
+            ydl_opts = build_ydl_opts(job.output_dir, job.format, extractors.dispatch, fragments=self.segments,
+                                      chunk_size=self.chunk_size)
+        else:
+            ydl_opts = build_ydl_opts(job.output_dir, job.format, extractors.dispatch, transcode=False)
+        if self.controller is not None:
+            ydl_opts['logger'] = MyLogger(self.controller.record_warning)
+        ydl = extractors.get((job.format, accelerate, job.output_dir), ydl_opts)
+        extractors.hook = my_hook
+        selector = ydl_opts['format']
+        try:
+            started = time.monotonic()
+            with telemetry.span('format_selection') as attrs:
+                info, cached = self._probe(ydl, job, selector)
+                attrs['cached'] = cached
+            job.extract_seconds = time.monotonic() - started
+            started = time.monotonic()
+            with telemetry.span('fetch', accelerate=accelerate) as attrs:
+                if accelerate:
+                    if cached or self.probe_cache is not None:
+                        # Re-run format selection on the stored info; no network involved
+                        info = ydl.process_ie_result(info, download=False)
+                    job.filepath = download_accelerated(ydl, info, my_hook, self.segments, self.chunk_size, on_merge)
+                else:
+                    try:
+                        info = ydl.process_ie_result(info, download=True)
+                    except yt_dlp.utils.DownloadError:
+                        if not cached or job.cancel_event.is_set():
+                            raise
+                        # The stored URLs were rejected; extract again
+                        self.probe_cache.forget(job.video_id, selector)
+                        info = ydl.extract_info(job.url, download=True)
+                    downloads = info.get('requested_downloads') or [info]
+                    job.acodec = downloads[0].get('acodec') or info.get('acodec')
+                    job.filepath = downloads[0].get('filepath') or ydl.prepare_filename(info)
+                attrs['bytes'] = job.received_bytes
+            job.fetch_seconds = time.monotonic() - started
+            if self.controller is not None:
+                self.controller.record_job(True, job.received_bytes, job.fetch_seconds)
+            job.title = info.get('title', 'Unknown Title')
+            job.video_id = info.get('id') or job.video_id
+        except yt_dlp.utils.DownloadCancelled:
+            self._set_state(job, DownloadJob.CANCELED)
+            return
+        except Exception as e:
+            if job.cancel_event.is_set():
+                self._set_state(job, DownloadJob.CANCELED)
+            else:
+                if self.controller is not None:
+                    self.controller.record_job(False, error=str(e))
+                self._set_state(job, DownloadJob.FAILED, str(e))
+            return
+        finally:
+            extractors.hook = None
+            job.process = None
+            self.governor.release(job.id)
+
+        if job.cancel_event.is_set():
+            self._set_state(job, DownloadJob.CANCELED)
+        elif job.format in AUDIO_FORMATS:
+            self._set_state(job, DownloadJob.FETCHED)
+            self._enqueue_transcode(job)
+        else:
+            self._finish(job)
+
+    def _enqueue_transcode(self, job):
+        with self._lock:
+            if not self._transcode_started:
+                self._transcode_started = True
+                for _ in range(self.transcode_workers):
+                    threading.Thread(target=self._transcode_worker, daemon=True).start()
+        # Blocks while the transcode stage is saturated
+        while True:
+            try:
+                self._transcode_queue.put(job, timeout=0.5)
+                return
+            except queue.Full:
+                if job.cancel_event.is_set():
+                    self._set_state(job, DownloadJob.CANCELED)
+                    return
+
+    def _transcode_worker(self):
+        while True:
+            job = self._transcode_queue.get()
+            if job is None:
+                self._transcode_queue.task_done()
+                return
+            try:
+                if job.cancel_event.is_set():
+                    self._set_state(job, DownloadJob.CANCELED)
+                else:
+                    with telemetry.context(job=job.id, video_id=job.video_id, format=job.format):
+                        self._call_profiled(job, 'postprocess', self._run_transcode, job)
+            finally:
+                job.process = None
+                self._transcode_queue.task_done()
+
+    def _run_transcode(self, job):
+        def on_start(process):
+            job.process = process
+            if job.cancel_event.is_set():
+                process.terminate()
+
+        self._set_state(job, DownloadJob.POSTPROCESSING)
+        started = time.monotonic()
+        try:
+            with telemetry.span('postprocess') as attrs:
+                job.filepath, job.postprocess = extract_audio(job.filepath, job.format, job.acodec, on_start)
+                attrs['method'] = job.postprocess
+            job.postprocess_seconds = round(time.monotonic() - started, 3)
+        except Exception as e:
+            if job.cancel_event.is_set():
+                self._set_state(job, DownloadJob.CANCELED)
+            else:
+                self._set_state(job, DownloadJob.FAILED, str(e))
+            return
+        self._finish(job)
+
+    def _finish(self, job):
+        if self.archive is not None and job.video_id and job.filepath and os.path.exists(job.filepath):
+            self.archive.record(job.video_id, job.format, job.filepath, job.title)
+        if self.library is not None and job.video_id and job.filepath:
+            self.library.record_download(job.video_id, job.filepath, job.format, job.title, job.url)
+        self._set_state(job, DownloadJob.DONE)
@@ -0,0 +1,1227 @@
+import itertools
+import logging
+import os
+import threading
+import time
+import tkinter as tk
+import webbrowser
+from datetime import datetime
+from pathlib import Path
+from tkinter import filedialog, messagebox, ttk
+
+from dotenv import load_dotenv
+
+from ytdl import playlist, telemetry
+from ytdl.accelerate import DEFAULT_SEGMENTS, parse_size
+from ytdl.adaptive import AimdController
+from ytdl.api import ApiClient, ApiError
+from ytdl.archive import DownloadArchive
+from ytdl.cache import ApiCache
+from ytdl.daemon import DaemonError
+from ytdl.details import DetailsFetcher
+from ytdl.downloader import BACKGROUND, BULK, INTERACTIVE, DownloadJob, DownloadScheduler
+from ytdl.journal import JobJournal
+from ytdl.library import LibraryIndex
+from ytdl.probe import ProbeCache
+from ytdl.progress import SAMPLE_SECONDS, MetricsLog, ProgressBus, format_eta, format_rate
+from ytdl.remote import DaemonClient, RemoteScheduler
+from ytdl.results import ResultOrder, ResultStore, SelectionBits
+from ytdl.search import SEARCH_ORDERS, VIDEO_DURATIONS, SearchClient, published_timestamp
+from ytdl.urlfile import UrlFileImporter
+from ytdl.utils import default_output_dir
+
+# Download progress is applied to the widgets at most this often (10 Hz)
+PROGRESS_INTERVAL_MS = 100
+# Oldest lines are dropped from the download list beyond this
+MAX_LOG_LINES = 1000
+
+
+class BusLogHandler(logging.Handler):
+    """Show the engine's log records in the download log"""
+    def __init__(self, bus):
+        super().__init__()
+        self.bus = bus
+        self.setFormatter(logging.Formatter('%(levelname)s %(name)s: %(message)s'))
+
+    def emit(self, record):
+        try:
+            self.bus.message(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+class VirtualResultsView:
+    """Treeview that only holds the rows currently on screen
+
+    Rows come from a ResultStore in the order given by a ResultOrder, and
+    selection state from SelectionBits. Scrolling refills a fixed set of
+    Tk items (iids "0", "1", ...) instead of creating an item for every
+    result, so memory and redraw cost do not grow with the number of
+    results.
+    """
+    def __init__(self, parent, store, order, selection, columns, height=10):
+        self.store = store
+        self.order = order
+        self.selection = selection
+        self.offset = 0
+        self.visible_rows = height
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings", height=height)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.on_scroll)
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_by(3))
+
+    def index_at(self, y):
+        """Return the store index of the row at pixel y, or None"""
+        iid = self.tree.identify_row(y)
+        if not iid:
+            return None
+        position = self.offset + int(iid)
+        return self.order.row(position) if position < len(self.order) else None
+
+    def row_values(self, index):
+        store = self.store
+        title = store.titles[index]
+        channel = store.channels[index]
+        views = store.views[index]
+        return (
+            "☑" if index in self.selection else "☐",
+            title[:50] + "..." if len(title) > 50 else title,
+            channel[:20] + "..." if len(channel) > 20 else channel,
+            store.duration(index),
+            f"{views:,}" if views > 0 else "N/A",
+            store.published(index),
+        )
+
+    def refresh(self):
+        """Redraw the visible window and the scrollbar"""
+        total = len(self.order)
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        count = max(0, min(self.visible_rows, total - self.offset))
+        children = self.tree.get_children()
+        for slot in range(count):
+            values = self.row_values(self.order.row(self.offset + slot))
+            if slot < len(children):
+                self.tree.item(str(slot), values=values)
+            else:
+                self.tree.insert("", "end", iid=str(slot), values=values)
+        if len(children) > count:
+            self.tree.delete(*children[count:])
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + count) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.order) - self.visible_rows))
+        if offset != self.offset:
+            self.offset = offset
+            # Tk's own selection belongs to a slot, not to a result
+            self.tree.selection_remove(self.tree.selection())
+            self.refresh()
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.offset + rows)
+
+    def on_scroll(self, *args):
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * len(self.order)))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            self.scroll_by(amount * self.visible_rows if args[2] == 'pages' else amount)
+
+    def on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_by(-steps * 3)
+
+    def on_resize(self, event):
+        rowheight = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        # One row's worth of height goes to the headings
+        rows = max(1, event.height // rowheight - 1)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.refresh()
+
+
+class YouTubeDownloaderWithSearch:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("YouTube Downloader with Search")
+        self.root.geometry("800x600")
+        
+        # Load environment variables
+        load_dotenv()
+        
+        # Download control
+        self.current_process = None
+        self.download_thread = None
+        self.extract_thread = None
+        self.search_thread = None
+        self.scheduler = None
+        self.journal = JobJournal()
+        self.archive = DownloadArchive()
+        self.probe_cache = ProbeCache()
+        self.library = LibraryIndex()
+        self.current_batch_ids = set()
+        # Downloads and batches started from the GUI that are still running
+        self.active_downloads = 0
+        self.download_groups = itertools.count(1)
+        self.progress_bus = ProgressBus()
+        self.metrics = MetricsLog()
+        self.last_metrics_sample = 0
+        # Warnings from the engine (yt-dlp, API retries, ...) go to the download log
+        engine_logger = logging.getLogger('ytdl')
+        engine_logger.setLevel(os.getenv('YTDL_LOG_LEVEL', 'WARNING').upper())
+        engine_logger.addHandler(BusLogHandler(self.progress_bus))
+        # Spans and Prometheus metrics, when YTDL_TRACE etc. are set
+        telemetry.configure_from_env()
+        self.is_extracting = False
+        self.is_downloading = False
+        self.is_searching = False
+        
+        # API settings
+        self.api_key = os.getenv('YOUTUBE_API_KEY', '')
+        self.api_cache = ApiCache()
+        self.api_client = ApiClient(self.api_key)
+        # One fetcher so concurrent searches share 50-ID detail batches
+        self.details_fetcher = DetailsFetcher(self.api_client, self.api_cache)
+        
+        # Check if .env file exists, if not create guidance
+        self.check_env_file()
+        
+        # Search results storage
+        self.search_results = ResultStore()
+        self.result_order = ResultOrder(self.search_results)
+        self.selected_videos = SelectionBits()
+        # Bumped by every new search; pages from an earlier search are dropped
+        self.search_generation = 0
+        
+        # Create notebook for tabs
+        self.notebook = ttk.Notebook(self.root)
+        self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Create tabs
+        self.create_download_tab()
+        self.create_search_tab()
+        
+        # Tunes the number of parallel downloads while "Auto" is checked
+        self.download_controller = AimdController('downloads', initial=self.workers_var.get(),
+                                                  on_decision=self.on_concurrency_decision)
+        
+        # Downloads run on a `yt daemon` when YTDL_DAEMON_URL is set
+        if os.getenv('YTDL_DAEMON_URL'):
+            self.scheduler = self.connect_daemon()
+        # Otherwise one scheduler for the session: new downloads join the running queue
+        if self.scheduler is None:
+            self.scheduler = DownloadScheduler(
+                self.output_dir,
+                max_workers=self.workers_var.get(),
+                on_update=self.on_job_update,
+                on_progress=lambda job, d: self.progress_bus.publish_hook(job.id, d),
+                journal=self.journal,
+                archive=self.archive,
+                probe_cache=self.probe_cache,
+                library=self.library,
+                retain_finished=False,
+                segments=int(os.getenv('YTDL_SEGMENTS', DEFAULT_SEGMENTS)),
+                chunk_size=parse_size(os.getenv('YTDL_CHUNK_SIZE', '10M')),
+                bandwidth=self.bandwidth_limit(),
+                controller=self.download_controller,
+            )
+            if self.auto_workers_var.get():
+                self.download_controller.start()
+        
+        # Bind window close event
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        # Apply coalesced download progress at a fixed rate
+        self.root.after(PROGRESS_INTERVAL_MS, self.flush_progress)
+        
+        # Offer to pick up batches interrupted by a crash or an early exit
+        self.root.after(500, self.offer_resume)
+        
+        # Drop archive entries for files deleted since the last run
+        threading.Thread(target=self.archive.reconcile, daemon=True).start()
+    
+    def check_env_file(self):
+        """Check if .env file exists and guide user to create one"""
+        env_path = Path('.env')
+        env_example_path = Path('.env.example')
+        
+        if not env_path.exists() and env_example_path.exists():
+            message = (
+                "No .env file found!\n\n"
+                "To use the search functionality, you need to set up your YouTube API key:\n\n"
+                "1. Copy .env.example to .env\n"
+                "2. Get your API key from:\n"
+                "   https://console.cloud.google.com/apis/credentials\n"
+                "3. Replace 'your_youtube_api_key_here' with your actual API key\n\n"
+                "You can also enter the API key directly in the Search tab."
+            )
+            messagebox.showinfo("Setup Required", message)
+
+    def create_download_tab(self):
+        """Create the original download functionality tab"""
+        self.download_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.download_frame, text="Download")
+        
+        # Main frame with padding
+        main_frame = ttk.Frame(self.download_frame, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # URL input
+        ttk.Label(main_frame, text="Enter YouTube URL:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.url_var = tk.StringVar()
+        self.url_entry = ttk.Entry(main_frame, textvariable=self.url_var, width=60)
+        self.url_entry.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+        
+        # Output directory
+        self.output_dir = default_output_dir()
+        ttk.Label(main_frame, text="Output Directory:").grid(row=2, column=0, sticky=tk.W, pady=5)
+        
+        # Button frame for output directory
+        dir_frame = ttk.Frame(main_frame)
+        dir_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+        
+        # Output directory path and open button
+        self.dir_label = ttk.Label(dir_frame, text=self.output_dir, wraplength=500)
+        self.dir_label.pack(side=tk.LEFT, padx=(0, 10))
+        self.browse_btn = ttk.Button(dir_frame, text="Browse...", command=self.select_output_dir)
+        self.browse_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.open_dir_btn = ttk.Button(dir_frame, text="Open Folder", command=self.open_output_dir)
+        self.open_dir_btn.pack(side=tk.RIGHT)
+        
+        # Download format selection
+        ttk.Label(main_frame, text="Download Format:").grid(row=4, column=0, sticky=tk.W, pady=5)
+        self.format_var = tk.StringVar(value="mp3")
+        format_frame = ttk.Frame(main_frame)
+        format_frame.grid(row=5, column=0, columnspan=2, sticky=tk.W, padx=10)
+        self.mp3_radio = ttk.Radiobutton(format_frame, text="MP3 (Audio)", variable=self.format_var, value="mp3")
+        self.mp3_radio.pack(side=tk.LEFT, padx=(0, 20))
+        # Keeps the original AAC/Opus stream, no re-encoding
+        self.audio_radio = ttk.Radiobutton(format_frame, text="M4A/Opus (Audio, no re-encode)",
+                                           variable=self.format_var, value="audio")
+        self.audio_radio.pack(side=tk.LEFT, padx=(0, 20))
+        self.mp4_radio = ttk.Radiobutton(format_frame, text="MP4 (Video)", variable=self.format_var, value="mp4")
+        self.mp4_radio.pack(side=tk.LEFT)
+        
+        # Opt-in segmented fetching for long MP4 downloads
+        self.accelerate_var = tk.BooleanVar(value=False)
+        self.accelerate_check = ttk.Checkbutton(main_frame, text="Accelerate MP4 (parallel segments)",
+                                                variable=self.accelerate_var)
+        self.accelerate_check.grid(row=4, column=1, sticky=tk.W)
+        
+        # Button frame for download controls
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=6, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=10)
+        
+        # Download and Cancel buttons
+        self.download_btn = ttk.Button(button_frame, text="Download", command=self.start_download)
+        self.download_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.extract_list_btn = ttk.Button(button_frame, text="Extract List URLs", command=self.start_extract_playlist_urls)
+        self.extract_list_btn.pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.import_list_btn = ttk.Button(button_frame, text="Import URL List...", command=self.import_url_lists)
+        self.import_list_btn.pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.cancel_btn = ttk.Button(button_frame, text="Cancel", command=self.cancel_download, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT)
+        
+        # With Auto the number of parallel downloads follows throughput and
+        # throttling errors, and the spinbox is its upper limit
+        self.auto_workers_var = tk.BooleanVar(value=os.getenv('YTDL_ADAPTIVE', '') == '1')
+        self.auto_workers_check = ttk.Checkbutton(button_frame, text="Auto", variable=self.auto_workers_var,
+                                                  command=self.apply_download_settings)
+        self.auto_workers_check.pack(side=tk.RIGHT, padx=(5, 0))
+        
+        # Number of concurrent downloads, shared by everything in the queue
+        self.workers_var = tk.IntVar(value=int(os.getenv('YTDL_MAX_WORKERS', '3')))
+        self.workers_spinbox = ttk.Spinbox(button_frame, from_=1, to=16, width=3, textvariable=self.workers_var,
+                                           command=self.apply_download_settings)
+        self.workers_spinbox.pack(side=tk.RIGHT)
+        ttk.Label(button_frame, text="Parallel downloads:").pack(side=tk.RIGHT, padx=(10, 5))
+        
+        # Combined download rate limit such as 5M (bytes/sec); empty for unlimited
+        self.bandwidth_var = tk.StringVar(value=os.getenv('YTDL_BANDWIDTH', ''))
+        self.bandwidth_entry = ttk.Entry(button_frame, textvariable=self.bandwidth_var, width=6)
+        self.bandwidth_entry.pack(side=tk.RIGHT)
+        self.bandwidth_entry.bind('<Return>', lambda event: self.apply_download_settings())
+        self.bandwidth_entry.bind('<FocusOut>', lambda event: self.apply_download_settings())
+        ttk.Label(button_frame, text="Max speed/s:").pack(side=tk.RIGHT, padx=(10, 5))
+        
+        # Progress bar
+        self.progress_var = tk.DoubleVar()
+        self.progress_bar = ttk.Progressbar(main_frame, length=650, mode='determinate', variable=self.progress_var)
+        self.progress_bar.grid(row=7, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+        
+        # Status text
+        self.status_var = tk.StringVar(value="Ready")
+        self.status_label = ttk.Label(main_frame, textvariable=self.status_var)
+        self.status_label.grid(row=8, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        # Active downloads dashboard
+        columns = ('id', 'title', 'progress', 'speed', 'eta', 'state')
+        self.jobs_tree = ttk.Treeview(main_frame, columns=columns, show='headings', height=5)
+        self.jobs_tree.heading('id', text='#')
+        self.jobs_tree.heading('title', text='Video')
+        self.jobs_tree.heading('progress', text='Progress')
+        self.jobs_tree.heading('speed', text='Speed')
+        self.jobs_tree.heading('eta', text='ETA')
+        self.jobs_tree.heading('state', text='State')
+        self.jobs_tree.column('id', width=40)
+        self.jobs_tree.column('title', width=330)
+        self.jobs_tree.column('progress', width=70)
+        self.jobs_tree.column('speed', width=80)
+        self.jobs_tree.column('eta', width=60)
+        self.jobs_tree.column('state', width=80)
+        self.jobs_tree.tag_configure('stalled', foreground='red')
+        self.jobs_tree.grid(row=9, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+        
+        # Download list
+        self.download_list = tk.Text(main_frame, height=8, width=70)
+        self.download_list.grid(row=10, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+        
+        # Add scrollbar
+        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.download_list.yview)
+        scrollbar.grid(row=10, column=2, sticky=(tk.N, tk.S))
+        self.download_list.configure(yscrollcommand=scrollbar.set)
+        
+        # Configure grid weights for resizing
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(10, weight=1)
+
+    def create_search_tab(self):
+        """Create the new search functionality tab"""
+        self.search_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.search_frame, text="Search")
+        
+        # Main frame with padding
+        main_frame = ttk.Frame(self.search_frame, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # API Key section
+        api_frame = ttk.LabelFrame(main_frame, text="YouTube Data API Settings", padding="5")
+        api_frame.grid(row=0, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        
+        ttk.Label(api_frame, text="API Key:").grid(row=0, column=0, sticky=tk.W, padx=5)
+        self.api_key_var = tk.StringVar(value=self.api_key)
+        self.api_key_entry = ttk.Entry(api_frame, textvariable=self.api_key_var, width=50, show="*")
+        self.api_key_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=5)
+        
+        ttk.Button(api_frame, text="Set API Key", command=self.set_api_key).grid(row=0, column=2, padx=5)
+        
+        # Search section
+        search_frame = ttk.LabelFrame(main_frame, text="Search Parameters", padding="5")
+        search_frame.grid(row=1, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        
+        # Search keyword; several comma-separated keywords run as one batch search
+        ttk.Label(search_frame, text="Search Keyword:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=2)
+        self.search_keyword_var = tk.StringVar()
+        self.search_keyword_entry = ttk.Entry(search_frame, textvariable=self.search_keyword_var, width=40)
+        self.search_keyword_entry.grid(row=0, column=1, columnspan=2, sticky=(tk.W, tk.E), padx=5, pady=2)
+        
+        # Language selection
+        ttk.Label(search_frame, text="Language:").grid(row=1, column=0, sticky=tk.W, padx=5, pady=2)
+        self.language_var = tk.StringVar(value="ja")
+        language_frame = ttk.Frame(search_frame)
+        language_frame.grid(row=1, column=1, sticky=tk.W, padx=5, pady=2)
+        
+        ttk.Radiobutton(language_frame, text="Japanese", variable=self.language_var, value="ja").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(language_frame, text="Chinese", variable=self.language_var, value="zh").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(language_frame, text="Korean", variable=self.language_var, value="ko").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(language_frame, text="English", variable=self.language_var, value="en").pack(side=tk.LEFT, padx=5)
+        self.all_languages_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(language_frame, text="All", variable=self.all_languages_var).pack(side=tk.LEFT, padx=5)
+        
+        # Learning level
+        ttk.Label(search_frame, text="Learning Level:").grid(row=2, column=0, sticky=tk.W, padx=5, pady=2)
+        self.level_var = tk.StringVar(value="beginner")
+        level_frame = ttk.Frame(search_frame)
+        level_frame.grid(row=2, column=1, sticky=tk.W, padx=5, pady=2)
+        
+        ttk.Radiobutton(level_frame, text="Beginner", variable=self.level_var, value="beginner").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(level_frame, text="Intermediate", variable=self.level_var, value="intermediate").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(level_frame, text="Advanced", variable=self.level_var, value="advanced").pack(side=tk.LEFT, padx=5)
+        self.all_levels_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(level_frame, text="All", variable=self.all_levels_var).pack(side=tk.LEFT, padx=5)
+        
+        # Number of results to fetch, streamed page by page
+        ttk.Label(search_frame, text="Max Results:").grid(row=3, column=0, sticky=tk.W, padx=5, pady=2)
+        self.max_results_var = tk.IntVar(value=25)
+        ttk.Spinbox(search_frame, from_=1, to=5000, increment=25, width=6,
+                    textvariable=self.max_results_var).grid(row=3, column=1, sticky=tk.W, padx=5, pady=2)
+        
+        # Filters applied by the API, so unwanted videos are never fetched
+        ttk.Label(search_frame, text="API Filters:").grid(row=4, column=0, sticky=tk.W, padx=5, pady=2)
+        api_filter_frame = ttk.Frame(search_frame)
+        api_filter_frame.grid(row=4, column=1, columnspan=2, sticky=tk.W, padx=5, pady=2)
+        
+        ttk.Label(api_filter_frame, text="Length:").pack(side=tk.LEFT)
+        self.api_duration_var = tk.StringVar(value="any")
+        ttk.Combobox(api_filter_frame, textvariable=self.api_duration_var, values=VIDEO_DURATIONS,
+                     state="readonly", width=7).pack(side=tk.LEFT, padx=5)
+        ttk.Label(api_filter_frame, text="Order:").pack(side=tk.LEFT)
+        self.api_order_var = tk.StringVar(value="relevance")
+        ttk.Combobox(api_filter_frame, textvariable=self.api_order_var, values=SEARCH_ORDERS,
+                     state="readonly", width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Label(api_filter_frame, text="Published after (YYYY-MM-DD):").pack(side=tk.LEFT)
+        self.api_published_after_var = tk.StringVar()
+        ttk.Entry(api_filter_frame, textvariable=self.api_published_after_var, width=11).pack(side=tk.LEFT, padx=5)
+        
+        # Search button
+        search_btn_frame = ttk.Frame(search_frame)
+        search_btn_frame.grid(row=5, column=0, columnspan=3, pady=10)
+        
+        self.search_btn = ttk.Button(search_btn_frame, text="Search Videos", command=self.start_search)
+        self.search_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.search_cancel_btn = ttk.Button(search_btn_frame, text="Cancel Search", command=self.cancel_search, state=tk.DISABLED)
+        self.search_cancel_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Offline search over past results and downloads
+        self.library_btn = ttk.Button(search_btn_frame, text="Search Library", command=self.start_library_search)
+        self.library_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Search results section
+        results_frame = ttk.LabelFrame(main_frame, text="Search Results", padding="5")
+        results_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        
+        # Results treeview; only the visible rows exist as Tk items
+        columns = ("Select", "Title", "Channel", "Duration", "Views", "Published")
+        self.results_view = VirtualResultsView(results_frame, self.search_results, self.result_order,
+                                               self.selected_videos, columns)
+        self.results_tree = self.results_view.tree
+        
+        # Configure columns; numeric columns sort on click
+        self.results_tree.heading("Select", text="Select")
+        self.results_tree.heading("Title", text="Title")
+        self.results_tree.heading("Channel", text="Channel")
+        self.results_tree.heading("Duration", text="Duration", command=lambda: self.sort_results("duration"))
+        self.results_tree.heading("Views", text="Views", command=lambda: self.sort_results("views"))
+        self.results_tree.heading("Published", text="Published", command=lambda: self.sort_results("published"))
+        
+        self.results_tree.column("Select", width=50, anchor=tk.CENTER)
+        self.results_tree.column("Title", width=300)
+        self.results_tree.column("Channel", width=150)
+        self.results_tree.column("Duration", width=80, anchor=tk.CENTER)
+        self.results_tree.column("Views", width=100, anchor=tk.CENTER)
+        self.results_tree.column("Published", width=100, anchor=tk.CENTER)
+        
+        self.results_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # Results scrollbar
+        self.results_view.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        
+        # Local filters over the results already fetched
+        result_filter_frame = ttk.Frame(results_frame)
+        result_filter_frame.grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        ttk.Label(result_filter_frame, text="Minutes:").pack(side=tk.LEFT)
+        self.filter_min_minutes_var = tk.StringVar()
+        ttk.Entry(result_filter_frame, textvariable=self.filter_min_minutes_var, width=5).pack(side=tk.LEFT, padx=2)
+        ttk.Label(result_filter_frame, text="to").pack(side=tk.LEFT)
+        self.filter_max_minutes_var = tk.StringVar()
+        ttk.Entry(result_filter_frame, textvariable=self.filter_max_minutes_var, width=5).pack(side=tk.LEFT, padx=2)
+        ttk.Label(result_filter_frame, text="Min views:").pack(side=tk.LEFT, padx=(10, 0))
+        self.filter_min_views_var = tk.StringVar()
+        ttk.Entry(result_filter_frame, textvariable=self.filter_min_views_var, width=10).pack(side=tk.LEFT, padx=2)
+        ttk.Label(result_filter_frame, text="Since:").pack(side=tk.LEFT, padx=(10, 0))
+        self.filter_since_var = tk.StringVar()
+        ttk.Entry(result_filter_frame, textvariable=self.filter_since_var, width=11).pack(side=tk.LEFT, padx=2)
+        ttk.Button(result_filter_frame, text="Filter", command=self.apply_result_filters).pack(side=tk.LEFT, padx=5)
+        ttk.Button(result_filter_frame, text="Show All", command=self.clear_result_filters).pack(side=tk.LEFT)
+        
+        # Bind double-click to toggle selection
+        self.results_tree.bind("<Double-1>", self.toggle_video_selection)
+        self.results_tree.bind("<Button-1>", self.on_treeview_click)
+        
+        # Download selected section
+        download_selected_frame = ttk.Frame(main_frame)
+        download_selected_frame.grid(row=3, column=0, columnspan=3, pady=10)
+        
+        ttk.Button(download_selected_frame, text="Select All", command=self.select_all_videos).pack(side=tk.LEFT, padx=5)
+        ttk.Button(download_selected_frame, text="Deselect All", command=self.deselect_all_videos).pack(side=tk.LEFT, padx=5)
+        ttk.Button(download_selected_frame, text="Download Selected", command=self.download_selected_videos).pack(side=tk.LEFT, padx=5)
+        
+        # Status for search
+        self.search_status_var = tk.StringVar(value="Ready to search")
+        self.search_status_label = ttk.Label(main_frame, textvariable=self.search_status_var)
+        self.search_status_label.grid(row=4, column=0, columnspan=3, sticky=tk.W, pady=5)
+        
+        # Configure grid weights for resizing
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(2, weight=1)
+        results_frame.columnconfigure(0, weight=1)
+        results_frame.rowconfigure(0, weight=1)
+
+    def set_api_key(self):
+        """Set the YouTube Data API key"""
+        api_key = self.api_key_var.get().strip()
+        if api_key:
+            self.api_key = api_key
+            self.api_client.api_key = api_key
+            messagebox.showinfo("Success", "API Key set successfully!")
+        else:
+            messagebox.showerror("Error", "Please enter a valid API key")
+
+    def start_search(self):
+        """Start searching for videos"""
+        if not self.api_key:
+            messagebox.showerror("Error", "Please set your YouTube Data API key first")
+            return
+        
+        keyword = self.search_keyword_var.get().strip()
+        if not keyword:
+            messagebox.showerror("Error", "Please enter a search keyword")
+            return
+        
+        self.is_searching = True
+        self.search_btn.config(state=tk.DISABLED)
+        self.search_cancel_btn.config(state=tk.NORMAL)
+        self.search_status_var.set("Searching...")
+        
+        generation = self.clear_results()
+        self.search_thread = threading.Thread(target=self.search_videos, args=(keyword, generation), daemon=True)
+        self.search_thread.start()
+
+    def clear_results(self):
+        """Empty the result list for a new search and return the search's generation"""
+        self.search_generation += 1
+        self.search_results.clear()
+        self.result_order.rebuild()
+        self.selected_videos.reset()
+        self.results_view.offset = 0
+        self.results_view.refresh()
+        return self.search_generation
+
+    def search_videos(self, keyword, generation):
+        """Search for videos using YouTube Data API"""
+        import requests
+
+        try:
+            language = self.language_var.get()
+            level = self.level_var.get()
+            try:
+                max_results = max(1, self.max_results_var.get())
+            except (tk.TclError, ValueError):
+                max_results = 25
+            
+            keywords = [word.strip() for word in keyword.split(',') if word.strip()]
+            languages = ['ja', 'zh', 'ko', 'en'] if self.all_languages_var.get() else [language]
+            levels = ['beginner', 'intermediate', 'advanced'] if self.all_levels_var.get() else [level]
+            filters = dict(duration=self.api_duration_var.get(),
+                           order=self.api_order_var.get(),
+                           published_after=self.api_published_after_var.get().strip() or None)
+            
+            client = SearchClient(self.api_key, cache=self.api_cache, client=self.api_client,
+                                  details=self.details_fetcher)
+            searches = len(keywords) * len(languages) * len(levels)
+            if searches == 1:
+                pages = client.iter_pages(keywords[0], language, level, max_results, **filters)
+            else:
+                # max_results applies to each search; duplicates across searches are dropped
+                pages = client.iter_matrix(keywords, languages, levels, max_results, **filters)
+                max_results *= searches
+            found = 0
+            try:
+                for page in pages:
+                    if not self.is_searching or generation != self.search_generation:
+                        return
+                    
+                    found += len(page)
+                    self.library.add_results(page, language, level)
+                    
+                    # The result store is only touched from the UI thread
+                    self.root.after(0, self.add_results_to_tree, page, generation)
+                    self.root.after(0, self.search_status_var.set,
+                                    f"Searching... {found}/{max_results} videos")
+            finally:
+                pages.close()
+            
+            stats = self.api_cache.stats()
+            api_stats = self.api_client.stats()
+            self.root.after(0, self.search_status_var.set,
+                            f"Found {found} videos "
+                            f"(cache: {stats['hits']} hits, {stats['misses']} misses; "
+                            f"API: {api_stats['requests']} requests, {api_stats['retries']} retries, "
+                            f"p50 {api_stats['p50_ms']} ms)")
+            
+        except ApiError as e:
+            error_msg = f"API error: {str(e)}"
+            self.root.after(0, self.search_status_var.set, error_msg)
+            self.root.after(0, messagebox.showerror, "API Error", error_msg)
+        except requests.exceptions.RequestException as e:
+            error_msg = f"Network error: {str(e)}"
+            self.root.after(0, self.search_status_var.set, error_msg)
+            self.root.after(0, messagebox.showerror, "Network Error", error_msg)
+        except Exception as e:
+            error_msg = f"Search error: {str(e)}"
+            self.root.after(0, self.search_status_var.set, error_msg)
+            self.root.after(0, messagebox.showerror, "Search Error", error_msg)
+        finally:
+            if self.is_searching and generation == self.search_generation:
+                self.is_searching = False
+                self.root.after(0, self.search_btn.config, {'state': tk.NORMAL})
+                self.root.after(0, self.search_cancel_btn.config, {'state': tk.DISABLED})
+
+    def start_library_search(self):
+        """Search the local library for the keyword, without using the API"""
+        if self.is_searching:
+            return
+        keyword = self.search_keyword_var.get().strip()
+        self.search_status_var.set("Searching library...")
+        generation = self.clear_results()
+        threading.Thread(target=self.search_library, args=(keyword, generation), daemon=True).start()
+
+    def search_library(self, keyword, generation):
+        """Query the library on a background thread"""
+        try:
+            max_results = max(1, self.max_results_var.get())
+        except (tk.TclError, ValueError):
+            max_results = 25
+        try:
+            started = time.perf_counter()
+            results = self.library.search(keyword, language=self.language_var.get(), limit=max_results)
+            elapsed = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            self.root.after(0, self.search_status_var.set, f"Library error: {str(e)}")
+            return
+        self.root.after(0, self.add_results_to_tree, results, generation)
+        self.root.after(0, self.search_status_var.set,
+                        f"{len(results)} videos from the library in {elapsed:.0f} ms")
+
+    def add_results_to_tree(self, results, generation):
+        """Add a page of search results to the result store and redraw"""
+        if generation != self.search_generation:
+            return
+        start = len(self.search_results)
+        self.search_results.extend(results)
+        self.result_order.extend(start)
+        self.selected_videos.grow(len(self.search_results))
+        self.results_view.refresh()
+
+    def sort_results(self, key):
+        """Sort the results by a column; clicking the same column again reverses the order"""
+        descending = self.result_order.key == key and not self.result_order.descending
+        self.result_order.set(key, descending, self.result_order.filters)
+        self.results_view.offset = 0
+        self.results_view.refresh()
+
+    def apply_result_filters(self):
+        """Show only results within the duration, view count and date limits"""
+        try:
+            min_minutes = self.filter_min_minutes_var.get().strip()
+            max_minutes = self.filter_max_minutes_var.get().strip()
+            min_views = self.filter_min_views_var.get().strip()
+            since = self.filter_since_var.get().strip()
+            filters = {
+                'duration': (int(float(min_minutes) * 60) if min_minutes else None,
+                             int(float(max_minutes) * 60) if max_minutes else None),
+                'views': (int(min_views) if min_views else None, None),
+                'published': (published_timestamp(since) if since else None, None),
+            }
+        except ValueError:
+            messagebox.showerror("Error", "Minutes and views must be numbers and dates YYYY-MM-DD")
+            return
+        self.result_order.set(self.result_order.key, self.result_order.descending, filters)
+        self.results_view.offset = 0
+        self.results_view.refresh()
+        self.search_status_var.set(f"Showing {len(self.result_order)} of {len(self.search_results)} videos")
+
+    def clear_result_filters(self):
+        for var in (self.filter_min_minutes_var, self.filter_max_minutes_var,
+                    self.filter_min_views_var, self.filter_since_var):
+            var.set("")
+        self.result_order.set(self.result_order.key, self.result_order.descending)
+        self.results_view.refresh()
+        self.search_status_var.set(f"Showing {len(self.search_results)} videos")
+
+    def on_treeview_click(self, event):
+        """Handle treeview click events"""
+        region = self.results_tree.identify_region(event.x, event.y)
+        if region == "cell":
+            column = self.results_tree.identify_column(event.x)
+            if column == "#1":  # Select column
+                self.toggle_video_selection(event)
+
+    def toggle_video_selection(self, event):
+        """Toggle video selection"""
+        index = self.results_view.index_at(event.y)
+        if index is not None:
+            self.selected_videos.toggle(index)
+            self.results_view.refresh()
+
+    def select_all_videos(self):
+        """Select all videos in search results, or only the ones a filter shows"""
+        if self.result_order.filters:
+            self.selected_videos.select(self.result_order)
+        else:
+            self.selected_videos.select_all()
+        self.results_view.refresh()
+
+    def deselect_all_videos(self):
+        """Deselect all videos in search results"""
+        self.selected_videos.clear()
+        self.results_view.refresh()
+
+    def download_selected_videos(self):
+        """Download all selected videos"""
+        selected_urls = [self.search_results.url(index) for index in self.selected_videos]
+        
+        if not selected_urls:
+            messagebox.showwarning("Warning", "Please select at least one video to download")
+            return
+        
+        # Switch to download tab
+        self.notebook.select(0)
+        
+        # Start batch download
+        self.start_batch_download(selected_urls)
+
+    def offer_resume(self):
+        """Ask whether to resume batches left unfinished by a previous run"""
+        batches = self.journal.unfinished_batches()
+        if not batches or self.is_downloading:
+            return
+        
+        pending = sum(len(batch['pending']) for batch in batches)
+        files = sum(len(batch['imports']) for batch in batches)
+        started = datetime.fromtimestamp(batches[0]['created_at']).strftime('%Y-%m-%d %H:%M')
+        message = (
+            f"{pending} video(s) from {len(batches)} unfinished batch download(s) "
+            f"(oldest started {started}) were not completed."
+            + (f" {files} URL list file(s) were not read to the end." if files else "")
+            + "\n\n"
+            "Resume them now? Completed videos are skipped and partial downloads are continued."
+        )
+        if messagebox.askyesno("Resume Downloads", message):
+            self.start_batch_download([], resume_batches=batches)
+        else:
+            for batch in batches:
+                self.journal.close_batch(batch['id'])
+
+    def import_url_lists(self):
+        """Batch-download the URLs in one or more URL list files"""
+        paths = filedialog.askopenfilenames(
+            initialdir=self.output_dir,
+            title="Select URL list files",
+            filetypes=[("URL lists", "*.txt"), ("All files", "*.*")],
+        )
+        if paths:
+            self.start_batch_download([], url_files=[os.path.abspath(path) for path in paths])
+
+    def start_batch_download(self, urls, resume_batches=None, url_files=None):
+        """Start downloading multiple videos; they join any downloads already running"""
+        self.begin_download()
+        self.download_thread = threading.Thread(
+            target=self.batch_download_videos,
+            args=(urls, resume_batches, url_files, self.format_var.get(), self.accelerate_var.get()),
+            daemon=True,
+        )
+        self.download_thread.start()
+
+    def batch_download_videos(self, urls, resume_batches=None, url_files=None, selected_format='mp3',
+                              accelerate=False):
+        """Download multiple videos concurrently"""
+        try:
+            if resume_batches:
+                for batch in resume_batches:
+                    if not self.is_downloading:
+                        break
+                    self.progress_bus.message(
+                        f"Resuming batch #{batch['id']}: {len(batch['pending'])}/{batch['total']} videos left")
+                    jobs = [(job['url'], job['id'], job['output_path']) for job in batch['pending']]
+                    # Nobody is waiting for these; new downloads go first
+                    self.run_batch(batch['id'], batch['output_dir'], batch['format'], jobs, batch['imports'],
+                                   priority=BACKGROUND, accelerate=accelerate)
+            else:
+                batch_id = self.journal.start_batch(self.output_dir, selected_format)
+                imports = [{'path': path} for path in url_files or []]
+                self.run_batch(batch_id, self.output_dir, selected_format, [(url, None, None) for url in urls],
+                               imports, accelerate=accelerate)
+        finally:
+            self.root.after(0, self.end_download)
+
+    def run_batch(self, batch_id, output_dir, selected_format, jobs, imports=None, priority=BULK, accelerate=False):
+        """Run one journaled batch to completion
+
+        jobs are (url, journal_id, fetched_path) tuples; imports are URL
+        list files ({'path', 'offset', 'lines'}) streamed in afterwards.
+        """
+        group = ('batch', batch_id)
+        options = {'priority': priority, 'group': group, 'output_dir': output_dir, 'accelerate': accelerate}
+        self.current_batch_ids.add(batch_id)
+        for url, journal_id, fetched_path in jobs:
+            self.scheduler.submit(url, selected_format, batch_id=batch_id, journal_id=journal_id,
+                                  fetched_path=fetched_path, **options)
+        
+        self.root.after(0, self.update_status, f"Downloading ({self.scheduler.max_workers} at a time)")
+        if imports:
+            importer = UrlFileImporter(self.scheduler, selected_format, journal=self.journal, batch_id=batch_id,
+                                       **options)
+            importer.seed(self.journal.iter_batch_urls(batch_id))
+            importer.run(
+                imports,
+                should_stop=lambda: not self.is_downloading,
+                on_progress=lambda path, lines: self.root.after(
+                    0, self.update_status,
+                    f"{os.path.basename(path)}: {lines} lines read, {importer.submitted} queued, "
+                    f"{importer.duplicates} duplicates skipped"),
+            )
+        self.scheduler.wait(group)
+        
+        if self.is_downloading:
+            self.journal.close_batch(batch_id)
+            counts = self.scheduler.counts(group)
+            failed = counts.get(DownloadJob.FAILED, 0)
+            summary = f"✓ Batch download completed: {counts.get(DownloadJob.DONE, 0)}/{sum(counts.values())} videos"
+            if failed:
+                summary += f" ({failed} failed)"
+            self.root.after(0, self.update_status, "Batch download completed")
+            self.progress_bus.message(summary)
+        self.scheduler.forget_group(group)
+        self.current_batch_ids.discard(batch_id)
+
+    def bandwidth_limit(self):
+        """Return the Max speed field in bytes/sec, or None for unlimited"""
+        try:
+            return parse_size(self.bandwidth_var.get()) if self.bandwidth_var.get().strip() else None
+        except ValueError:
+            return None
+
+    def connect_daemon(self):
+        """Return a RemoteScheduler for YTDL_DAEMON_URL, or None if the daemon cannot be reached"""
+        try:
+            scheduler = RemoteScheduler(DaemonClient(), on_update=self.on_job_update,
+                                        on_progress=lambda job, d: self.progress_bus.publish_hook(job.id, d),
+                                        journal=self.journal)
+            # The daemon keeps its own settings until a field is changed here
+            self.daemon_settings = self.download_settings()
+            return scheduler
+        except DaemonError as e:
+            messagebox.showwarning("Daemon", f"{e}\n\nDownloads will run in this window instead.")
+            return None
+
+    def download_settings(self):
+        """Return the Parallel downloads, Auto and Max speed fields as daemon settings"""
+        try:
+            workers = self.workers_var.get()
+        except (tk.TclError, ValueError):
+            workers = None
+        return {'max_workers': workers, 'adaptive': self.auto_workers_var.get(),
+                'bandwidth': self.bandwidth_limit() or 0}
+
+    def apply_download_settings(self):
+        """Apply the Parallel downloads, Auto and Max speed fields to the running queue"""
+        try:
+            workers = self.workers_var.get()
+        except (tk.TclError, ValueError):
+            workers = None
+        if isinstance(self.scheduler, RemoteScheduler):
+            # Only fields changed since the last call; the others are shared with other clients
+            settings = self.download_settings()
+            changed = {key: value for key, value in settings.items()
+                       if value is not None and value != self.daemon_settings.get(key)}
+            if not changed:
+                return
+            try:
+                self.scheduler.configure(**changed)
+                self.daemon_settings.update(changed)
+            except DaemonError as e:
+                self.progress_bus.message(f"Error: {e}")
+            return
+        if self.auto_workers_var.get():
+            if workers:
+                self.download_controller.set_bounds(maximum=workers)
+            self.download_controller.start()
+        else:
+            self.download_controller.stop()
+            if workers:
+                self.scheduler.set_max_workers(workers)
+        self.scheduler.governor.set_rate(self.bandwidth_limit())
+
+    def on_concurrency_decision(self, decision):
+        """Log a worker count decision of an AimdController (controller thread)"""
+        self.metrics.record_decision(decision)
+        if decision['limit'] != decision['previous']:
+            rate = (format_rate(decision['throughput']) if decision['pool'] == 'downloads'
+                    else f"{decision['throughput']:.0f} URLs/s")
+            self.progress_bus.message(f"Parallel {decision['pool']}: {decision['previous']} -> "
+                                      f"{decision['limit']} ({decision['reason']}, {rate})")
+
+    def begin_download(self):
+        """Count a download or batch being started (main thread)"""
+        if self.active_downloads == 0:
+            self.progress_bus.reset()
+        self.active_downloads += 1
+        self.is_downloading = True
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.apply_download_settings()
+
+    def end_download(self):
+        """Count a download or batch that has finished, resetting the UI after the last one (main thread)"""
+        self.active_downloads -= 1
+        if self.active_downloads == 0:
+            self.is_downloading = False
+            self.scheduler.forget_finished()
+            self.cancel_btn.config(state=tk.DISABLED)
+            self.update_progress(0)
+            self.update_status("Ready")
+
+    def on_job_update(self, job):
+        """Publish a scheduler job state change to the progress bus (worker thread)"""
+        bus = self.progress_bus
+        if job.state == DownloadJob.RUNNING:
+            bus.publish(job.id, label=job.url, state='running')
+            bus.message(f"Starting download #{job.id}: {job.url}")
+        elif job.state in (DownloadJob.FETCHED, DownloadJob.POSTPROCESSING):
+            bus.publish(job.id, label=job.title, state='converting', speed=0.0)
+            if job.state == DownloadJob.POSTPROCESSING:
+                bus.message(f"Converting #{job.id}...")
+        elif job.finished:
+            summary = bus.finish(job.id)
+            if summary is not None:
+                self.metrics.record_job(summary, url=job.url, format=job.format, state=job.state,
+                                        extract_seconds=job.extract_seconds, fetch_seconds=job.fetch_seconds,
+                                        postprocess=job.postprocess, postprocess_seconds=job.postprocess_seconds)
+            if job.state == DownloadJob.DONE and job.skipped:
+                bus.message(f"✓ Already downloaded: {os.path.basename(job.filepath)}")
+            elif job.state == DownloadJob.DONE:
+                filename = os.path.basename(job.filepath) if job.filepath else f"{job.title}.{job.format}"
+                method = f" ({job.postprocess})" if job.postprocess else ""
+                bus.message(f"✓ Downloaded: {filename}{method}")
+            elif job.state == DownloadJob.FAILED:
+                bus.message(f"Error downloading {job.url}: {job.error}")
+
+    def flush_progress(self):
+        """Apply the progress published since the last frame to the download tab"""
+        try:
+            messages = self.progress_bus.drain_messages()
+            if messages:
+                self.add_to_download_list("\n".join(messages))
+            
+            snapshot = self.progress_bus.snapshot()
+            self.update_jobs_tree(snapshot['jobs'])
+            
+            scheduler = self.scheduler
+            if scheduler is not None and self.is_downloading:
+                counts = scheduler.counts()
+                total_videos = sum(counts.values())
+                now = time.monotonic()
+                if now - self.last_metrics_sample >= SAMPLE_SECONDS:
+                    self.last_metrics_sample = now
+                    self.metrics.record_sample(snapshot, queued=scheduler.pending())
+                if total_videos:
+                    finished = sum(counts.get(state, 0) for state in DownloadJob.FINISHED_STATES)
+                    converting = counts.get(DownloadJob.FETCHED, 0) + counts.get(DownloadJob.POSTPROCESSING, 0)
+                    partial = sum(job['fraction'] for job in snapshot['jobs'])
+                    self.update_progress((finished + partial) * 100 / total_videos)
+                    
+                    rate = f"{format_rate(snapshot['bytes_per_sec'])}, ETA {format_eta(snapshot['eta'])}"
+                    if total_videos == 1 and snapshot['active']:
+                        status = f"Downloading: {partial * 100:.1f}% - {rate}"
+                    elif total_videos == 1 and converting:
+                        status = "Download finished, converting..."
+                    else:
+                        status = (f"Downloaded {finished}/{total_videos} ({snapshot['active']} downloading, "
+                                  f"{converting} converting, {scheduler.pending()} queued) - {rate}")
+                        if snapshot['stalled']:
+                            status += f" - {snapshot['stalled']} stalled"
+                    if status != self.status_var.get():
+                        self.update_status(status)
+        finally:
+            self.root.after(PROGRESS_INTERVAL_MS, self.flush_progress)
+
+    def update_jobs_tree(self, jobs):
+        """Show one dashboard row per job that is downloading or converting"""
+        rows = {str(job['job_id']): job for job in jobs}
+        for iid in self.jobs_tree.get_children():
+            if iid not in rows:
+                self.jobs_tree.delete(iid)
+        for iid, job in rows.items():
+            if job['state'] == 'running':
+                progress = f"{job['fraction'] * 100:.1f}%" if job['total'] else "?"
+                values = (job['job_id'], job['label'] or '', progress, format_rate(job['speed'] or 0),
+                          format_eta(job['eta']), 'stalled' if job['stalled'] else 'downloading')
+            else:
+                values = (job['job_id'], job['label'] or '', "100%", "", "", job['state'])
+            tags = ('stalled',) if job['stalled'] else ()
+            if self.jobs_tree.exists(iid):
+                self.jobs_tree.item(iid, values=values, tags=tags)
+            else:
+                self.jobs_tree.insert('', tk.END, iid=iid, values=values, tags=tags)
+
+    def cancel_search(self):
+        """Cancel the current search"""
+        self.is_searching = False
+        self.search_btn.config(state=tk.NORMAL)
+        self.search_cancel_btn.config(state=tk.DISABLED)
+        self.search_status_var.set("Search canceled")
+
+    # Original download functionality methods (unchanged)
+    def update_status(self, message):
+        self.status_var.set(message)
+
+    def update_progress(self, progress):
+        self.progress_var.set(progress)
+
+    def add_to_download_list(self, message):
+        self.download_list.insert(tk.END, message + "\n")
+        # Keep the widget bounded on long batches
+        lines = int(self.download_list.index('end-1c').split('.')[0]) - 1
+        if lines > MAX_LOG_LINES:
+            self.download_list.delete('1.0', f"{lines - MAX_LOG_LINES + 1}.0")
+        self.download_list.see(tk.END)
+
+    def open_output_dir(self):
+        """Open the output directory in file explorer"""
+        if os.path.exists(self.output_dir):
+            if os.name == 'nt':  # Windows
+                os.startfile(self.output_dir)
+            else:  # macOS and Linux
+                webbrowser.open('file://' + self.output_dir)
+
+    def cancel_download(self):
+        """Cancel the current download"""
+        if self.is_downloading:
+            self.is_downloading = False
+            self.scheduler.cancel_all()
+            for batch_id in list(self.current_batch_ids):
+                # A user cancel is final; only crashes and early exits are resumable
+                self.journal.close_batch(batch_id)
+            self.update_status("Canceling download...")
+            self.add_to_download_list("Download canceled by user")
+            
+            # Reset UI
+            self.cancel_btn.config(state=tk.DISABLED)
+            self.update_progress(0)
+            self.update_status("Ready")
+
+    def on_closing(self):
+        """Handle window closing"""
+        if self.is_downloading or self.is_searching:
+            if messagebox.askokcancel("Quit", "An operation is in progress. Do you want to cancel and quit?"):
+                self.is_downloading = False
+                self.is_searching = False
+                self.scheduler.cancel_all()
+                self.root.destroy()
+        elif self.is_extracting:
+            if messagebox.askokcancel("Quit", "URL extraction is in progress. Do you want to quit?"):
+                self.is_extracting = False
+                self.root.destroy()
+        else:
+            self.root.destroy()
+
+    def download_video(self, url, output_format, accelerate, group):
+        """Download the URL from the Download tab ahead of any queued batch"""
+        try:
+            self.root.after(0, self.update_status, "Starting download...")
+            job = self.scheduler.submit(url, output_format, priority=INTERACTIVE, group=group,
+                                        output_dir=self.output_dir, accelerate=accelerate)
+            self.scheduler.wait(group)
+            self.scheduler.forget_group(group)
+            
+            if self.is_downloading and job.state == DownloadJob.FAILED:
+                self.root.after(0, self.update_status, f"Error: {job.error}")
+        finally:
+            self.root.after(0, self.end_download)
+
+    def start_download(self):
+        url = self.url_var.get().strip()
+        if not url:
+            messagebox.showerror("Error", "Please enter a YouTube URL")
+            return
+
+        self.begin_download()
+        group = ('download', next(self.download_groups))
+        self.download_thread = threading.Thread(
+            target=self.download_video,
+            args=(url, self.format_var.get(), self.accelerate_var.get(), group),
+            daemon=True,
+        )
+        self.download_thread.start()
+
+    def extract_playlist_urls(self, urls):
+        """Extract one or more playlists concurrently, showing live counts"""
+        counts = {}
+
+        def on_progress(url, title, count):
+            counts[url] = (title, count)
+            summary = ", ".join(f"{title[:30]}: {count}" for title, count in counts.values())
+            self.root.after(0, self.update_status, f"Extracting URLs... {summary}")
+
+        controller = None
+        if self.auto_workers_var.get():
+            controller = AimdController('extraction', initial=4, on_decision=self.on_concurrency_decision)
+            controller.start()
+        try:
+            self.root.after(0, self.update_status, "Extracting playlist info...")
+            results = playlist.extract_many(urls, self.output_dir, on_progress=on_progress,
+                                            should_stop=lambda: not self.is_extracting, controller=controller)
+
+            for url, output_filename, count, error in results:
+                if error is None:
+                    self.progress_bus.message(f"✓ Extracted {count} URLs to {output_filename}")
+                elif isinstance(error, (playlist.ExtractionError, playlist.ExtractionCanceled)):
+                    self.progress_bus.message(f"Error: {str(error)} ({url})")
+                else:
+                    self.progress_bus.message(f"Error extracting playlist {url}: {str(error)}")
+            self.root.after(0, self.update_status, "Playlist URL extraction complete.")
+
+        except Exception as e:
+            error_msg = f"Error extracting playlist: {str(e)}"
+            self.root.after(0, self.update_status, error_msg)
+        finally:
+            if controller is not None:
+                controller.stop()
+            if self.is_extracting:
+                self.is_extracting = False
+                self.root.after(0, self.download_btn.config, {'state': tk.NORMAL})
+                self.root.after(0, self.extract_list_btn.config, {'state': tk.NORMAL})
+                self.root.after(0, self.import_list_btn.config, {'state': tk.NORMAL})
+                self.root.after(0, self.mp3_radio.config, {'state': tk.NORMAL})
+                self.root.after(0, self.audio_radio.config, {'state': tk.NORMAL})
+                self.root.after(0, self.mp4_radio.config, {'state': tk.NORMAL})
+                self.root.after(0, self.update_status, "Ready")
+
+    def start_extract_playlist_urls(self):
+        # Several playlist/channel URLs can be entered separated by spaces
+        urls = self.url_var.get().split()
+        if not urls:
+            messagebox.showerror("Error", "Please enter a YouTube URL")
+            return
+        self.is_extracting = True
+        self.download_btn.config(state=tk.DISABLED)
+        self.extract_list_btn.config(state=tk.DISABLED)
+        self.import_list_btn.config(state=tk.DISABLED)
+        self.mp3_radio.config(state=tk.DISABLED)
+        self.audio_radio.config(state=tk.DISABLED)
+        self.mp4_radio.config(state=tk.DISABLED)
+        self.extract_thread = threading.Thread(target=self.extract_playlist_urls, args=(urls,), daemon=True)
+        self.extract_thread.start()
+
+    def select_output_dir(self):
+        """Open directory selection dialog and update output path"""
+        selected_dir = filedialog.askdirectory(initialdir=self.output_dir)
+        if selected_dir:
+            self.output_dir = selected_dir
+            self.dir_label.config(text=self.output_dir)
+            self.root.update_idletasks()
+
+
+def run():
+    """Start the Tk GUI"""
+    root = tk.Tk()
+    app = YouTubeDownloaderWithSearch(root)
+    try:
+        root.mainloop()
+    finally:
+        telemetry.close()
+
+
+if __name__ == "__main__":
+    run()
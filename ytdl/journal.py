@@ -0,0 +1,134 @@
+"""Crash-safe journal of batch download jobs
+
+Every batch and every job state change is written to a SQLite file under
+the data folder as it happens. A batch stays open until it completes or
+the user cancels it, so after a crash or an early exit the unfinished
+jobs can be resubmitted. Jobs already done are skipped, and yt-dlp picks
+up its .part files because the output template is unchanged.
+
+Batches fed from URL list files also checkpoint the byte offset reached
+in each file, so a resumed batch continues reading where it stopped.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from ytdl.utils import data_dir
+
+
+class JobJournal:
+    """Persistent record of batches and the state of each of their URLs"""
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), 'jobs.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS batches ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, "
+            "output_dir TEXT NOT NULL, format TEXT NOT NULL, closed INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, batch_id INTEGER NOT NULL, url TEXT NOT NULL, "
+            "state TEXT NOT NULL, output_path TEXT, error TEXT, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS imports ("
+            "batch_id INTEGER NOT NULL, path TEXT NOT NULL, offset INTEGER NOT NULL DEFAULT 0, "
+            "lines INTEGER NOT NULL DEFAULT 0, done INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (batch_id, path))"
+        )
+
+    def start_batch(self, output_dir, output_format):
+        """Open a new batch and return its id"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO batches (created_at, output_dir, format) VALUES (?, ?, ?)",
+                (time.time(), output_dir, output_format),
+            )
+            return cursor.lastrowid
+
+    def add_job(self, batch_id, url, state='queued'):
+        """Record a URL in a batch and return the job's journal id"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (batch_id, url, state, updated_at) VALUES (?, ?, ?, ?)",
+                (batch_id, url, state, time.time()),
+            )
+            return cursor.lastrowid
+
+    def update_job(self, job_id, state, output_path=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, output_path = COALESCE(?, output_path), error = ?, updated_at = ? "
+                "WHERE id = ?",
+                (state, output_path, error, time.time(), job_id),
+            )
+
+    def add_import(self, batch_id, path):
+        """Register a URL list file that feeds a batch"""
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO imports (batch_id, path) VALUES (?, ?)", (batch_id, path))
+
+    def save_checkpoint(self, batch_id, path, offset, lines, done=False):
+        """Record how far a URL list file has been read and submitted"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE imports SET offset = ?, lines = ?, done = ? WHERE batch_id = ? AND path = ?",
+                (offset, lines, int(done), batch_id, path),
+            )
+
+    def iter_batch_urls(self, batch_id):
+        """Yield every URL recorded for a batch, in submission order"""
+        with self._lock:
+            rows = self._conn.execute("SELECT url FROM jobs WHERE batch_id = ? ORDER BY id", (batch_id,)).fetchall()
+        for (url,) in rows:
+            yield url
+
+    def close_batch(self, batch_id):
+        """Mark a batch as finished so it is no longer offered for resume"""
+        with self._lock:
+            self._conn.execute("UPDATE batches SET closed = 1 WHERE id = ?", (batch_id,))
+
+    def unfinished_batches(self):
+        """Return open batches with the jobs that still need work
+
+        Each batch is a dict with id, created_at, output_dir, format, total,
+        pending, a list of {'id', 'url', 'state', 'output_path'} dicts, and
+        imports, a list of {'path', 'offset', 'lines'} dicts for URL list
+        files that were not read to the end.
+        """
+        with self._lock:
+            batch_rows = self._conn.execute(
+                "SELECT id, created_at, output_dir, format FROM batches WHERE closed = 0 ORDER BY id"
+            ).fetchall()
+            batches = []
+            for batch_id, created_at, output_dir, output_format in batch_rows:
+                job_rows = self._conn.execute(
+                    "SELECT id, url, state, output_path FROM jobs WHERE batch_id = ? ORDER BY id", (batch_id,)
+                ).fetchall()
+                pending = [{'id': job_id, 'url': url, 'state': state, 'output_path': output_path}
+                           for job_id, url, state, output_path in job_rows if state != 'done']
+                imports = [{'path': path, 'offset': offset, 'lines': lines}
+                           for path, offset, lines in self._conn.execute(
+                               "SELECT path, offset, lines FROM imports WHERE batch_id = ? AND done = 0",
+                               (batch_id,))]
+                if not pending and not imports:
+                    self._conn.execute("UPDATE batches SET closed = 1 WHERE id = ?", (batch_id,))
+                    continue
+                batches.append({
+                    'id': batch_id,
+                    'created_at': created_at,
+                    'output_dir': output_dir,
+                    'format': output_format,
+                    'total': len(job_rows),
+                    'pending': pending,
+                    'imports': imports,
+                })
+        return batches
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
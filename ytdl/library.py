@@ -0,0 +1,202 @@
+"""Local full-text index of search results and downloads
+
+Every video seen in a search and every finished download is kept in
+library.sqlite3 under the data folder. Titles and channel names are
+indexed with SQLite FTS5 (trigram tokenizer when available, so Japanese,
+Chinese and Korean titles match on substrings), and duration, views and
+publish date have their own indexes, so the library can be queried
+offline without spending API quota.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from ytdl.search import published_timestamp
+from ytdl.utils import data_dir
+
+# Trigram needs at least this many characters per term
+MIN_TRIGRAM_TERM = 3
+
+
+def clock_to_seconds(value):
+    """Convert '1:02:03', '4:05' or '90' to seconds"""
+    seconds = 0
+    for part in str(value).strip().split(':'):
+        seconds = seconds * 60 + int(part or 0)
+    return seconds
+
+
+class LibraryIndex:
+    """SQLite FTS5 index over video metadata and downloaded files"""
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), 'library.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            "rowid INTEGER PRIMARY KEY, video_id TEXT NOT NULL UNIQUE, "
+            "title TEXT NOT NULL DEFAULT '', channel TEXT NOT NULL DEFAULT '', "
+            "language TEXT, level TEXT, duration TEXT, duration_seconds INTEGER, views INTEGER, "
+            "published TEXT, url TEXT, downloaded_path TEXT, downloaded_format TEXT, downloaded_at REAL, "
+            "seen_at REAL NOT NULL)"
+        )
+        for column in ('duration_seconds', 'views', 'published', 'downloaded_at'):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS videos_{column} ON videos ({column})")
+        self.tokenizer = self._create_fts()
+
+    def _create_fts(self):
+        """Create the FTS table and its sync triggers; return the tokenizer or None without FTS5"""
+        row = self._conn.execute("SELECT sql FROM sqlite_master WHERE name = 'videos_fts'").fetchone()
+        if row is not None:
+            return 'trigram' if 'trigram' in row[0] else 'unicode61'
+        for tokenizer in ('trigram', 'unicode61'):
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE videos_fts USING fts5("
+                    f"title, channel, content='videos', content_rowid='rowid', tokenize='{tokenizer}')"
+                )
+                break
+            except sqlite3.OperationalError:
+                continue
+        else:
+            return None
+        self._conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS videos_ai AFTER INSERT ON videos BEGIN
+                INSERT INTO videos_fts (rowid, title, channel) VALUES (new.rowid, new.title, new.channel);
+            END;
+            CREATE TRIGGER IF NOT EXISTS videos_ad AFTER DELETE ON videos BEGIN
+                INSERT INTO videos_fts (videos_fts, rowid, title, channel)
+                VALUES ('delete', old.rowid, old.title, old.channel);
+            END;
+            CREATE TRIGGER IF NOT EXISTS videos_au AFTER UPDATE OF title, channel ON videos BEGIN
+                INSERT INTO videos_fts (videos_fts, rowid, title, channel)
+                VALUES ('delete', old.rowid, old.title, old.channel);
+                INSERT INTO videos_fts (rowid, title, channel) VALUES (new.rowid, new.title, new.channel);
+            END;
+        """)
+        # Index rows written before the FTS table existed
+        self._conn.execute("INSERT INTO videos_fts (videos_fts) VALUES ('rebuild')")
+        return tokenizer
+
+    def add_results(self, results, language=None, level=None):
+        """Insert or refresh search result video_info dicts
+
+        A language or level set on a video_info itself (batch searches)
+        takes precedence over the arguments.
+        """
+        now = time.time()
+        rows = [(
+            info['id'], info['title'], info['channel'], info.get('language', language), info.get('level', level),
+            info['duration'],
+            info.get('duration_seconds', clock_to_seconds(info['duration'])), info['views'], info['published'],
+            info['url'], now,
+        ) for info in results]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO videos (video_id, title, channel, language, level, duration, duration_seconds, "
+                    "views, published, url, seen_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(video_id) DO UPDATE SET title = excluded.title, channel = excluded.channel, "
+                    "language = COALESCE(excluded.language, language), level = COALESCE(excluded.level, level), "
+                    "duration = excluded.duration, duration_seconds = excluded.duration_seconds, "
+                    "views = excluded.views, published = excluded.published, url = excluded.url, "
+                    "seen_at = excluded.seen_at",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def record_download(self, video_id, path, output_format, title=None, url=None):
+        """Mark a video as downloaded, adding it if it was never seen in a search"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO videos (video_id, title, url, downloaded_path, downloaded_format, downloaded_at, seen_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET downloaded_path = excluded.downloaded_path, "
+                "downloaded_format = excluded.downloaded_format, downloaded_at = excluded.downloaded_at, "
+                "title = CASE WHEN title = '' THEN excluded.title ELSE title END, "
+                "url = COALESCE(url, excluded.url)",
+                (video_id, title or '', url or f"https://www.youtube.com/watch?v={video_id}", path, output_format,
+                 now, now),
+            )
+
+    def search(self, query='', min_duration=None, max_duration=None, min_views=None, published_after=None,
+               published_before=None, language=None, level=None, downloaded=None, limit=50):
+        """Return matching videos as dicts, best text match first
+
+        Durations are in seconds and dates are YYYY-MM-DD strings.
+        Without a query, the most recently seen videos come first.
+        """
+        conditions = []
+        params = []
+        match_terms = []
+        for term in query.split():
+            if self.tokenizer and (self.tokenizer != 'trigram' or len(term) >= MIN_TRIGRAM_TERM):
+                match_terms.append('"' + term.replace('"', '""') + '"')
+            else:
+                conditions.append("(v.title LIKE ? OR v.channel LIKE ?)")
+                params += [f"%{term}%", f"%{term}%"]
+        for clause, value in (
+            ("v.duration_seconds >= ?", min_duration),
+            ("v.duration_seconds <= ?", max_duration),
+            ("v.views >= ?", min_views),
+            ("v.published >= ?", published_after),
+            ("v.published <= ?", published_before),
+            ("v.language = ?", language),
+            ("v.level = ?", level),
+        ):
+            if value is not None:
+                conditions.append(clause)
+                params.append(value)
+        if downloaded is not None:
+            conditions.append("v.downloaded_path IS NOT NULL" if downloaded else "v.downloaded_path IS NULL")
+
+        if match_terms:
+            sql = ("SELECT v.* FROM videos_fts JOIN videos v ON v.rowid = videos_fts.rowid "
+                   "WHERE videos_fts MATCH ?")
+            params.insert(0, ' '.join(match_terms))
+            order = "ORDER BY videos_fts.rank"
+        else:
+            sql = "SELECT v.* FROM videos v WHERE 1"
+            order = "ORDER BY v.seen_at DESC"
+        if conditions:
+            sql += " AND " + " AND ".join(conditions)
+        sql += f" {order} LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._video_info(row) for row in rows]
+
+    def count(self):
+        """Return (videos, downloaded videos)"""
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*), COUNT(downloaded_path) FROM videos").fetchone()
+        return row[0], row[1]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _video_info(row):
+        return {
+            'id': row['video_id'],
+            'title': row['title'],
+            'channel': row['channel'],
+            'published': row['published'] or '',
+            'published_at': published_timestamp(row['published']),
+            'url': row['url'],
+            'duration': row['duration'] or '',
+            'duration_seconds': row['duration_seconds'] or 0,
+            'views': row['views'] or 0,
+            'language': row['language'],
+            'level': row['level'],
+            'downloaded_path': row['downloaded_path'],
+        }
@@ -0,0 +1,185 @@
+"""Playlist URL extraction
+
+Entries are streamed from yt-dlp's lazy playlist pages and written to
+<playlist>_urls.txt as they arrive instead of after the whole playlist
+has resolved. While a file is being written a small .state sidecar sits
+next to it; if the extraction is interrupted, running it again skips the
+URLs already in the file and continues from there.
+"""
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ytdl import telemetry
+from ytdl.utils import sanitize_filename
+
+# How often on_progress is called while entries stream in
+PROGRESS_EVERY = 100
+# Slice size used to walk playlists that support random page access
+SLICE_SIZE = 100
+
+
+class ExtractionError(Exception):
+    """Raised when a playlist has no usable video entries"""
+
+
+class ExtractionCanceled(Exception):
+    """Raised when should_stop() asks an extraction to stop early"""
+
+
+def state_path(output_filename):
+    directory, name = os.path.split(output_filename)
+    return os.path.join(directory, f".{name}.state")
+
+
+def count_complete_lines(path):
+    """Return the number of newline-terminated lines, dropping a partial last line"""
+    count = 0
+    complete_size = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            count += 1
+            complete_size += len(line)
+    if complete_size != os.path.getsize(path):
+        with open(path, 'r+b') as f:
+            f.truncate(complete_size)
+    return count
+
+
+def entry_url(entry):
+    if not entry:
+        return None
+    url = entry.get('url')
+    if url and url.startswith(('http://', 'https://')):
+        return url
+    if entry.get('id') and entry.get('ie_key', 'Youtube') == 'Youtube':
+        return f"https://www.youtube.com/watch?v={entry['id']}"
+    return url
+
+
+def iter_entries(entries, start):
+    """Iterate playlist entries from index start without materializing the list"""
+    if hasattr(entries, 'getslice'):
+        # PagedList: jump straight to the page holding entry `start`
+        while True:
+            chunk = entries.getslice(start, start + SLICE_SIZE)
+            if not chunk:
+                return
+            yield from chunk
+            start += len(chunk)
+    else:
+        # Continuation-token pages can only be walked in order; the skipped
+        # entries are fetched again but not written again
+        yield from itertools.islice(entries, start, None)
+
+
+def resolve_playlist(ydl, url):
+    """Return the unprocessed playlist info dict, following URL redirects"""
+    info = ydl.extract_info(url, download=False, process=False)
+    for _ in range(5):
+        if info.get('_type') not in ('url', 'url_transparent'):
+            break
+        info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+    return info
+
+
+def extract_playlist_urls(url, output_dir, on_progress=None, should_stop=None):
+    """Write the video URLs of a playlist to <playlist>_urls.txt
+
+    URLs are written and flushed as each page of entries comes in.
+    on_progress(url, title, count) is called periodically with the number
+    of URLs written so far, and should_stop() is polled between entries.
+    Returns (output_filename, number_of_urls).
+    """
+    import yt_dlp
+
+    ydl_opts = {
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+        'quiet': True,
+    }
+    with telemetry.span('playlist_extraction', url=url) as attrs, yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = resolve_playlist(ydl, url)
+
+        if info.get('entries') is None:
+            raise ExtractionError("No video entries found in the playlist.")
+
+        title = info.get('title') or 'playlist'
+        output_filename = os.path.join(output_dir, f"{sanitize_filename(title)}_urls.txt")
+        state_filename = state_path(output_filename)
+
+        start = 0
+        if os.path.exists(state_filename) and os.path.exists(output_filename):
+            with open(state_filename, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('url') == url:
+                start = count_complete_lines(output_filename)
+        with open(state_filename, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'title': title}, f)
+
+        count = start
+        with open(output_filename, 'a' if start else 'w', encoding='utf-8') as out:
+            for entry in iter_entries(info['entries'], start):
+                if should_stop and should_stop():
+                    raise ExtractionCanceled(f"Stopped after {count} URLs; run again to resume")
+                video_url = entry_url(entry)
+                # Keep one line per entry so the resume offset stays exact
+                out.write((video_url or '') + '\n')
+                count += 1
+                if count % PROGRESS_EVERY == 0:
+                    out.flush()
+                    if on_progress:
+                        on_progress(url, title, count)
+        attrs['count'] = count
+
+    os.remove(state_filename)
+    if on_progress:
+        on_progress(url, title, count)
+    if count == 0:
+        os.remove(output_filename)
+        raise ExtractionError("Could not extract video URLs.")
+    return output_filename, count
+
+
+def extract_many(urls, output_dir, max_workers=4, on_progress=None, should_stop=None, controller=None):
+    """Extract several playlists or channels concurrently
+
+    With an AimdController, the number of playlists extracted at once
+    follows its limit (up to its maximum) instead of max_workers, and URLs
+    written per second are reported to it. Returns a list of
+    (url, output_filename, count, error) in input order; error is None on
+    success.
+    """
+    written = {}
+    lock = threading.Lock()
+
+    def progress(url, title, count):
+        if controller is not None:
+            with lock:
+                controller.record(count - written.get(url, 0))
+                written[url] = count
+        if on_progress:
+            on_progress(url, title, count)
+
+    def run(url):
+        with controller.slot() if controller is not None else contextlib.nullcontext():
+            started = time.monotonic()
+            try:
+                output_filename, count = extract_playlist_urls(url, output_dir, progress, should_stop)
+            except Exception as e:
+                if controller is not None and not isinstance(e, ExtractionCanceled):
+                    controller.record_job(False, error=str(e))
+                return url, None, 0, e
+            if controller is not None:
+                controller.record_job(True, count, time.monotonic() - started)
+            return url, output_filename, count, None
+
+    workers = controller.maximum if controller is not None else max_workers
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls)))) as pool:
+        return list(pool.map(run, urls))
@@ -0,0 +1,108 @@
+"""Cache of extracted video metadata and selected formats
+
+Extraction (fetching the watch page and player, solving signatures) is
+the slowest part of starting a download. The info dict yt-dlp returns,
+including the formats it picked, is stored per video ID and format
+selector so a retried, resumed or repeated job can go straight to the
+download. Entries expire together with the signed media URLs inside
+them, which carry their own `expire` timestamp.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from ytdl import telemetry
+from ytdl.utils import data_dir
+
+# Entries are dropped this long before the media URLs actually expire
+EXPIRY_MARGIN = 600
+# Lifetime used when no URL in the info dict carries an expiry
+DEFAULT_TTL = 1800
+PRUNE_EVERY = 100
+
+EXPIRE_PATTERN = re.compile(r'[?&/]expire[=/](\d+)')
+
+
+def url_expiry(info):
+    """Return the earliest `expire` timestamp of the selected format URLs, or None"""
+    formats = info.get('requested_formats') or [info]
+    expiries = []
+    for fmt in formats:
+        for url in (fmt.get('url'), fmt.get('manifest_url')):
+            match = EXPIRE_PATTERN.search(url or '')
+            if match:
+                expiries.append(int(match.group(1)))
+    return min(expiries) if expiries else None
+
+
+class ProbeCache:
+    """SQLite-backed store of sanitized info dicts keyed by (video ID, format selector)"""
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), 'probe_cache.sqlite3')
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS probes ("
+            "video_id TEXT NOT NULL, selector TEXT NOT NULL, info BLOB NOT NULL, "
+            "expires_at REAL NOT NULL, PRIMARY KEY (video_id, selector))"
+        )
+        self._conn.execute("DELETE FROM probes WHERE expires_at < ?", (time.time(),))
+
+    def get(self, video_id, selector):
+        """Return the cached info dict, or None if missing or about to expire"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT info, expires_at FROM probes WHERE video_id = ? AND selector = ?",
+                (video_id, selector),
+            ).fetchone()
+            if row is None or row[1] < time.time():
+                self.misses += 1
+                telemetry.inc('ytdl_cache_requests_total', cache='probe', result='miss')
+                return None
+            self.hits += 1
+        telemetry.inc('ytdl_cache_requests_total', cache='probe', result='hit')
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, video_id, selector, info, expire=None):
+        """Store a sanitized info dict until shortly before its URLs expire
+
+        expire is the url_expiry() of the unsanitized info, which still
+        has the selected formats.
+        """
+        expires_at = expire - EXPIRY_MARGIN if expire else time.time() + DEFAULT_TTL
+        if expires_at <= time.time():
+            return
+        data = zlib.compress(json.dumps(info, ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO probes (video_id, selector, info, expires_at) VALUES (?, ?, ?, ?)",
+                (video_id, selector, data, expires_at),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._conn.execute("DELETE FROM probes WHERE expires_at < ?", (time.time(),))
+
+    def forget(self, video_id, selector):
+        with self._lock:
+            self._conn.execute("DELETE FROM probes WHERE video_id = ? AND selector = ?", (video_id, selector))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM probes")
+            self.hits = self.misses = 0
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM probes").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,264 @@
+"""Thread-safe progress event bus
+
+Download workers publish progress without ever touching the UI: each
+publish only updates the latest numbers for that job under a short lock,
+so thousands of yt-dlp hook calls per second coalesce into one record
+per job. The UI pulls a snapshot at a fixed rate (see ytdl.gui) and gets
+per-job and aggregate bytes/sec, ETA and queue depth.
+
+MetricsLog appends a summary of every finished job, plus periodic
+aggregate samples, to a JSON lines file for capacity planning.
+"""
+import collections
+import json
+import os
+import threading
+import time
+
+from ytdl.utils import data_dir
+
+# Smoothing factor for the per-job rate when yt-dlp reports no speed
+RATE_SMOOTHING = 0.3
+# A running job that has not received a byte for this long is stalled
+STALL_SECONDS = 15
+# How often aggregate throughput samples are written to the metrics file
+SAMPLE_SECONDS = 5
+
+
+class JobProgress:
+    """Latest coalesced progress of one job"""
+    __slots__ = ('job_id', 'label', 'state', 'downloaded', 'total', 'speed', 'eta', 'peak_speed',
+                 'stalls', 'stalled_seconds', 'started_at', 'updated_at', 'progressed_at',
+                 '_last_bytes', '_last_time')
+
+    def __init__(self, job_id, label=None):
+        now = time.monotonic()
+        self.job_id = job_id
+        self.label = label
+        self.state = 'queued'
+        self.downloaded = 0
+        self.total = None
+        self.speed = 0.0
+        self.eta = None
+        self.peak_speed = 0.0
+        self.stalls = 0
+        self.stalled_seconds = 0.0
+        self.started_at = now
+        self.updated_at = now
+        self.progressed_at = now
+        self._last_bytes = 0
+        self._last_time = now
+
+    @property
+    def fraction(self):
+        if self.total:
+            return min(1.0, self.downloaded / self.total)
+        return 0.0
+
+    def is_stalled(self, now):
+        return self.state == 'running' and now - self.progressed_at >= STALL_SECONDS
+
+    def as_dict(self, now):
+        return {
+            'job_id': self.job_id,
+            'label': self.label,
+            'state': self.state,
+            'downloaded': self.downloaded,
+            'total': self.total,
+            'speed': self.speed,
+            'eta': self.eta,
+            'fraction': self.fraction,
+            'stalled': self.is_stalled(now),
+        }
+
+    def summary(self, now):
+        """Return the metrics recorded for this job once it has finished"""
+        elapsed = now - self.started_at
+        return {
+            'job_id': self.job_id,
+            'label': self.label,
+            'bytes': self.downloaded,
+            'total': self.total,
+            'seconds': round(elapsed, 3),
+            'avg_bytes_per_sec': round(self.downloaded / elapsed) if elapsed > 0 else 0,
+            'peak_bytes_per_sec': round(self.peak_speed),
+            'stalls': self.stalls,
+            'stalled_seconds': round(self.stalled_seconds, 1),
+        }
+
+
+class ProgressBus:
+    """Coalescing progress channel between worker threads and the UI
+
+    publish()/publish_hook() and message() never block on the UI. snapshot()
+    and drain_messages() are meant to be polled from the UI thread.
+    """
+    def __init__(self, max_messages=1000):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._messages = collections.deque(maxlen=max_messages)
+        self._dropped_messages = 0
+        self._version = 0
+        self.finished_bytes = 0
+
+    def publish(self, job_id, label=None, state=None, downloaded=None, total=None, speed=None, eta=None):
+        """Record the latest numbers for a job, replacing older ones"""
+        now = time.monotonic()
+        with self._lock:
+            progress = self._jobs.get(job_id)
+            if progress is None:
+                progress = self._jobs[job_id] = JobProgress(job_id, label)
+            if label is not None:
+                progress.label = label
+            if state is not None:
+                progress.state = state
+            if total is not None:
+                progress.total = total
+            if eta is not None:
+                progress.eta = eta
+            if downloaded is not None:
+                if downloaded > progress.downloaded:
+                    idle = now - progress.progressed_at
+                    if idle >= STALL_SECONDS and progress.state == 'running':
+                        progress.stalls += 1
+                        progress.stalled_seconds += idle
+                    progress.progressed_at = now
+                elapsed = now - progress._last_time
+                if speed is None and elapsed > 0 and downloaded >= progress._last_bytes:
+                    sample = (downloaded - progress._last_bytes) / elapsed
+                    speed = progress.speed + RATE_SMOOTHING * (sample - progress.speed)
+                progress.downloaded = downloaded
+                progress._last_bytes = downloaded
+                progress._last_time = now
+            if speed is not None:
+                progress.speed = speed
+                progress.peak_speed = max(progress.peak_speed, speed)
+            progress.updated_at = now
+            self._version += 1
+
+    def publish_hook(self, job_id, d):
+        """Publish a yt-dlp progress hook dict using its numeric fields"""
+        if d.get('status') == 'downloading':
+            # Use the numeric fields; the _*_str ones are formatted for the console
+            self.publish(
+                job_id,
+                label=(d.get('info_dict') or {}).get('title'),
+                state='running',
+                downloaded=d.get('downloaded_bytes'),
+                total=d.get('total_bytes') or d.get('total_bytes_estimate'),
+                speed=d.get('speed'),
+                eta=d.get('eta'),
+            )
+        elif d.get('status') == 'finished':
+            self.publish(job_id, downloaded=d.get('downloaded_bytes') or d.get('total_bytes'), speed=0.0, eta=0)
+
+    def finish(self, job_id):
+        """Forget a finished job, keeping its bytes in the totals
+
+        Returns the job's metrics summary, or None if it never reported progress.
+        """
+        with self._lock:
+            progress = self._jobs.pop(job_id, None)
+            if progress is None:
+                return None
+            self.finished_bytes += progress.downloaded
+            self._version += 1
+            return progress.summary(time.monotonic())
+
+    def message(self, text):
+        """Queue a log line for the UI; the oldest lines are dropped when full"""
+        with self._lock:
+            if len(self._messages) == self._messages.maxlen:
+                self._dropped_messages += 1
+            self._messages.append(text)
+
+    def drain_messages(self):
+        """Return and clear the queued log lines"""
+        with self._lock:
+            messages = list(self._messages)
+            self._messages.clear()
+            dropped, self._dropped_messages = self._dropped_messages, 0
+        if dropped:
+            messages.insert(0, f"... {dropped} earlier messages skipped")
+        return messages
+
+    def snapshot(self):
+        """Return per-job progress dicts and aggregate rate/ETA/bytes"""
+        now = time.monotonic()
+        with self._lock:
+            jobs = [progress.as_dict(now) for progress in self._jobs.values()]
+            version = self._version
+            finished_bytes = self.finished_bytes
+        active = [job for job in jobs if job['state'] == 'running']
+        rate = sum(job['speed'] or 0 for job in active)
+        remaining = sum(job['total'] - job['downloaded'] for job in active if job['total'])
+        return {
+            'version': version,
+            'jobs': jobs,
+            'active': len(active),
+            'stalled': sum(1 for job in active if job['stalled']),
+            'bytes_per_sec': rate,
+            'eta': remaining / rate if rate > 0 else None,
+            'downloaded': finished_bytes + sum(job['downloaded'] for job in jobs),
+        }
+
+    def reset(self):
+        """Forget all job progress, e.g. before a new batch; queued messages are kept"""
+        with self._lock:
+            self._jobs.clear()
+            self.finished_bytes = 0
+            self._version += 1
+
+
+class MetricsLog:
+    """Append-only JSON lines file of job summaries and throughput samples"""
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), 'metrics.jsonl')
+        self._lock = threading.Lock()
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def record_job(self, summary, **fields):
+        """Record a finished job's summary; fields adds e.g. url, format and state"""
+        self._append({'type': 'job', 'time': round(time.time(), 3), **summary, **fields})
+
+    def record_decision(self, decision):
+        """Record a worker count decision of an AimdController"""
+        self._append({'type': 'concurrency', 'time': round(time.time(), 3), **decision})
+
+    def record_sample(self, snapshot, queued=0):
+        """Record the aggregate throughput of a progress snapshot"""
+        self._append({
+            'type': 'sample',
+            'time': round(time.time(), 3),
+            'active': snapshot['active'],
+            'stalled': snapshot['stalled'],
+            'queued': queued,
+            'bytes_per_sec': round(snapshot['bytes_per_sec']),
+            'downloaded': snapshot['downloaded'],
+        })
+
+
+def format_rate(bytes_per_sec):
+    """Format a transfer rate for display, e.g. '1.4 MB/s'"""
+    for unit in ('B/s', 'KB/s', 'MB/s'):
+        if bytes_per_sec < 1024:
+            return f"{bytes_per_sec:.0f} {unit}" if unit == 'B/s' else f"{bytes_per_sec:.1f} {unit}"
+        bytes_per_sec /= 1024
+    return f"{bytes_per_sec:.1f} GB/s"
+
+
+def format_eta(seconds):
+    """Format an ETA in seconds as m:ss or h:mm:ss"""
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
@@ -0,0 +1,355 @@
+"""Client for the download daemon (see ytdl.daemon)
+
+DaemonClient wraps the HTTP/JSON API. RemoteScheduler stands in for a
+DownloadScheduler: it submits jobs to the daemon, follows its event log
+and calls on_update / on_progress with mirrored jobs. The CLI and the GUI
+therefore drive a daemon exactly as they drive a local scheduler,
+journal included. Only the standard library is used, so clients need
+neither requests nor yt_dlp.
+"""
+import collections
+import json
+import logging
+import os
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from ytdl.daemon import DEFAULT_HOST, DEFAULT_PORT, DaemonError
+from ytdl.downloader import BULK, PRIORITY_NAMES, DownloadJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+# Long-poll length used to follow the event log
+POLL_SECONDS = 25
+# Job events for jobs not (yet) known to the client, kept for submit()
+MAX_ORPHANS = 1000
+STATE_ORDER = {state: rank for rank, state in enumerate(
+    (DownloadJob.QUEUED, DownloadJob.RUNNING, DownloadJob.FETCHED, DownloadJob.POSTPROCESSING))}
+
+
+def daemon_url():
+    return os.getenv('YTDL_DAEMON_URL') or DEFAULT_URL
+
+
+class DaemonClient:
+    """Calls the daemon's JSON API; failures raise DaemonError"""
+    def __init__(self, url=None, token=None, timeout=30):
+        self.url = (url or daemon_url()).rstrip('/')
+        self.token = token or os.getenv('YTDL_DAEMON_TOKEN')
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, query=None, timeout=None):
+        query = {key: value for key, value in (query or {}).items() if value is not None}
+        url = f"{self.url}{path}" + (f"?{urllib.parse.urlencode(query)}" if query else "")
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(url, data=data, method=method)
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        if self.token:
+            request.add_header('Authorization', f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error') or str(e)
+            except (ValueError, AttributeError):
+                # Not the daemon's {'error': ...} object, e.g. a proxy's error page
+                message = str(e)
+            raise DaemonError(message, e.code)
+        except (urllib.error.URLError, OSError) as e:
+            reason = getattr(e, 'reason', e)
+            raise DaemonError(f"Cannot reach the daemon at {self.url}: {reason}", 503)
+
+    def status(self):
+        return self.request('GET', '/status')
+
+    def submit(self, urls, output_format='mp3', priority='bulk', group=None, output_dir=None, accelerate=None):
+        body = {'urls': urls, 'format': output_format, 'priority': priority, 'group': group,
+                'output_dir': output_dir, 'accelerate': accelerate}
+        return self.request('POST', '/jobs', body)['jobs']
+
+    def job(self, job_id):
+        return self.request('GET', f"/jobs/{job_id}")
+
+    def jobs(self, group=None):
+        return self.request('GET', '/jobs', query={'group': group})['jobs']
+
+    def cancel(self, job_id):
+        return self.request('DELETE', f"/jobs/{job_id}")['canceled']
+
+    def cancel_group(self, group=None):
+        return self.request('DELETE', '/jobs', query={'group': group})['canceled']
+
+    def search(self, keywords, **params):
+        return self.request('POST', '/search', dict(params, keywords=keywords))
+
+    def extract(self, urls, **params):
+        return self.request('POST', '/extract', dict(params, urls=urls))
+
+    def task(self, task_id):
+        return self.request('GET', f"/tasks/{task_id}")
+
+    def events(self, after, timeout=0):
+        """Return {'events', 'missed', 'last'} for the events after id `after`"""
+        return self.request('GET', '/events', query={'after': after, 'timeout': timeout},
+                            timeout=timeout + self.timeout)
+
+    def settings(self, max_workers=None, adaptive=None, bandwidth=None):
+        """Change the daemon's settings; None leaves a setting alone and bandwidth 0 removes the limit"""
+        return self.request('POST', '/settings', {'max_workers': max_workers, 'adaptive': adaptive,
+                                                  'bandwidth': bandwidth})
+
+    def shutdown(self):
+        return self.request('POST', '/shutdown', {})
+
+    def wait_task(self, task, on_event=None):
+        """Follow the event log until a task dict from search()/extract() finishes; returns it with its result
+
+        on_event(event) gets the task's own 'task' and 'message' events.
+        """
+        after = self.status()['last_event']
+        current = self.task(task['id'])
+        while current['state'] == 'running':
+            reply = self.events(after, POLL_SECONDS)
+            for event in reply['events']:
+                after = event['id']
+                if (event['type'] == 'task' and event['task']['id'] == task['id']
+                        or event['type'] == 'message' and event.get('task') == task['id']):
+                    if on_event:
+                        on_event(event)
+            if reply['missed']:
+                after = reply['last']
+            current = self.task(task['id'])
+        return current
+
+
+class RemoteJob:
+    """Client-side mirror of a daemon job, with the attributes of a DownloadJob"""
+    def __init__(self, data, group=None, priority=BULK):
+        self.group = group
+        self.priority = priority
+        self.journal_id = None
+        self.update(data)
+
+    def update(self, data):
+        for key, value in data.items():
+            # group and priority stay in the caller's form
+            if key not in ('group', 'priority'):
+                setattr(self, key, value)
+
+    @property
+    def finished(self):
+        return self.state in DownloadJob.FINISHED_STATES
+
+
+class RemoteScheduler:
+    """A DownloadScheduler whose jobs run on a daemon
+
+    Supports the calls the CLI and GUI make on a local scheduler: submit,
+    wait, counts, pending, cancel, cancel_all, set_max_workers,
+    forget_group, forget_finished and shutdown. Only the jobs submitted
+    through this instance are mirrored and counted. output_dir and
+    accelerate are the defaults sent with each job (the daemon's own are
+    used when they are None).
+    """
+    def __init__(self, client, on_update=None, on_progress=None, journal=None, output_dir=None, accelerate=None):
+        self.client = client
+        self.on_update = on_update
+        self.on_progress = on_progress
+        self.journal = journal
+        self.output_dir = output_dir
+        self.accelerate = accelerate
+        status = client.status()
+        self.max_workers = status['max_workers']
+        self._after = status['last_event']
+        self._jobs = {}
+        self._counts = {}
+        self._groups = {}
+        self._orphans = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._follow, name='daemon-events', daemon=True)
+        self._thread.start()
+
+    def submit(self, url, output_format, batch_id=None, journal_id=None, fetched_path=None, priority=BULK,
+               group=None, output_dir=None, accelerate=None):
+        """Queue a URL on the daemon and return its RemoteJob
+
+        fetched_path is accepted for compatibility; the daemon fetches the
+        video again (its archive and probe cache make that cheap).
+        """
+        if self.journal is not None and journal_id is None and batch_id is not None:
+            journal_id = self.journal.add_job(batch_id, url)
+        data = self.client.submit([url], output_format, PRIORITY_NAMES.get(priority, 'bulk'), group_name(group),
+                                  output_dir or self.output_dir,
+                                  self.accelerate if accelerate is None else accelerate)[0]
+        with self._lock:
+            job = RemoteJob(data, group, priority)
+            job.journal_id = journal_id
+            # The follower may already have seen later states of this job
+            later = self._orphans.pop(job.id, None)
+            if later is not None and self._rank(later['state']) > self._rank(job.state):
+                job.update(later)
+            self._count(job.state, group, 1)
+            if not job.finished:
+                self._jobs[job.id] = job
+            self._changed.notify_all()
+        self._journal_update(job)
+        if self.on_update:
+            self.on_update(job)
+        return job
+
+    def set_max_workers(self, max_workers):
+        self.configure(max_workers=max_workers)
+
+    def configure(self, max_workers=None, adaptive=None, bandwidth=None):
+        """Change the daemon's worker count, adaptive tuning or rate limit (shared by all its clients)"""
+        status = self.client.settings(max_workers, adaptive, bandwidth)
+        self.max_workers = status['max_workers']
+
+    def cancel(self, job):
+        try:
+            self.client.cancel(job.id)
+        except DaemonError as e:
+            logger.warning("Canceling job %s failed: %s", job.id, e)
+
+    def cancel_all(self):
+        for job in self.jobs:
+            self.cancel(job)
+
+    @property
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def pending(self):
+        return self.counts().get(DownloadJob.QUEUED, 0)
+
+    def wait(self, group=None):
+        """Block until every job submitted here (or every job of group) has finished"""
+        with self._changed:
+            while self._unfinished(self._counts if group is None else self._groups.get(group, {})):
+                self._changed.wait(1.0)
+
+    def counts(self, group=None):
+        with self._lock:
+            counts = self._counts if group is None else self._groups.get(group, {})
+            return {state: count for state, count in counts.items() if count}
+
+    def forget_group(self, group):
+        with self._lock:
+            self._groups.pop(group, None)
+
+    def forget_finished(self):
+        with self._lock:
+            for state in DownloadJob.FINISHED_STATES:
+                self._counts.pop(state, None)
+
+    def shutdown(self):
+        """Stop following the daemon's events; jobs still queued there keep running"""
+        self._stop.set()
+
+    @staticmethod
+    def _rank(state):
+        return STATE_ORDER.get(state, len(STATE_ORDER))
+
+    @staticmethod
+    def _unfinished(counts):
+        return sum(count for state, count in counts.items() if state not in DownloadJob.FINISHED_STATES)
+
+    def _count(self, state, group, delta):
+        # Called with the lock held
+        self._counts[state] = self._counts.get(state, 0) + delta
+        if group is not None:
+            counts = self._groups.setdefault(group, {})
+            counts[state] = counts.get(state, 0) + delta
+
+    def _follow(self):
+        failing = False
+        while not self._stop.is_set():
+            try:
+                reply = self.client.events(self._after, POLL_SECONDS)
+            except DaemonError as e:
+                if not failing:
+                    logger.warning("Lost the daemon's event stream: %s", e)
+                failing = True
+                self._stop.wait(1.0)
+                continue
+            failing = False
+            for event in reply['events']:
+                self._after = event['id']
+                if event['type'] == 'job':
+                    self._apply(event['job'])
+                elif event['type'] == 'progress' and self.on_progress:
+                    self._publish_progress(event['jobs'])
+            if reply['missed']:
+                self._after = reply['last']
+                self._resync()
+
+    def _apply(self, data):
+        with self._lock:
+            job = self._jobs.get(data['id'])
+            if job is None or self._rank(data['state']) < self._rank(job.state):
+                if job is None:
+                    self._orphans[data['id']] = data
+                    while len(self._orphans) > MAX_ORPHANS:
+                        self._orphans.popitem(last=False)
+                return
+            previous = job.state
+            job.update(data)
+            if job.finished:
+                del self._jobs[job.id]
+        if job.state == previous:
+            return
+        self._journal_update(job)
+        if self.on_update:
+            self.on_update(job)
+        # Counted only now so that wait() returns after on_update has seen the final state
+        with self._changed:
+            self._count(previous, job.group, -1)
+            self._count(job.state, job.group, 1)
+            self._changed.notify_all()
+
+    def _publish_progress(self, entries):
+        with self._lock:
+            jobs = [(self._jobs.get(entry['job_id']), entry) for entry in entries]
+        for job, entry in jobs:
+            if job is not None and entry['state'] == 'running':
+                self.on_progress(job, {
+                    'status': 'downloading',
+                    'downloaded_bytes': entry['downloaded'],
+                    'total_bytes': entry['total'],
+                    'speed': entry['speed'],
+                    'eta': entry['eta'],
+                    'info_dict': {'title': entry['label']},
+                })
+
+    def _resync(self):
+        """Re-read the jobs still in progress after events were missed"""
+        for job in self.jobs:
+            try:
+                data = self.client.job(job.id)
+            except DaemonError as e:
+                if e.status != 404:
+                    continue
+                # The daemon restarted or no longer remembers the job
+                data = {'id': job.id, 'state': DownloadJob.FAILED, 'error': "Unknown to the daemon"}
+            self._apply(data)
+
+    def _journal_update(self, job):
+        if self.journal is not None and job.journal_id is not None:
+            self.journal.update_job(job.journal_id, job.state, job.filepath, job.error)
+
+
+def group_name(group):
+    """Return the daemon-side name of a scheduler group (tuples such as ('batch', 3) become 'batch-3')"""
+    if group is None or isinstance(group, str):
+        return group
+    if isinstance(group, tuple):
+        return '-'.join(str(part) for part in group)
+    return str(group)
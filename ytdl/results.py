@@ -0,0 +1,263 @@
+"""Compact storage for large search result sets
+
+ResultStore keeps search results column by column instead of one dict per
+video: durations, view counts and publish times live in numeric arrays,
+repeated channel names are stored once, and URLs and display strings are
+rebuilt on demand. Each numeric column also has a sorted index, brought
+up to date with one merge when it is next queried, which ResultOrder
+uses to sort and filter without rescanning every row. SelectionBits
+tracks which rows are selected in a single integer bitset.
+"""
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from ytdl.search import format_clock
+
+# Sortable keys and the ResultStore column behind each
+SORT_COLUMNS = {
+    'duration': 'seconds',
+    'views': 'views',
+    'published': 'published_at',
+}
+
+
+class ResultStore:
+    """Column-oriented list of video_info rows"""
+    __slots__ = ('ids', 'titles', 'channels', 'published_at', 'seconds', 'views', '_channel_names', '_sorted')
+
+    def __init__(self):
+        self.ids = []
+        self.titles = []
+        self.channels = []
+        self.published_at = array('q')
+        self.seconds = array('q')
+        self.views = array('q')
+        self._channel_names = {}
+        # key -> (sorted values, row index of each value)
+        self._sorted = {key: (array('q'), array('q')) for key in SORT_COLUMNS}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, video_info):
+        channel = video_info['channel']
+        self.ids.append(video_info['id'])
+        self.titles.append(video_info['title'])
+        self.channels.append(self._channel_names.setdefault(channel, channel))
+        self.published_at.append(video_info['published_at'])
+        self.seconds.append(video_info['duration_seconds'])
+        self.views.append(video_info['views'])
+
+    def value(self, key, index):
+        return getattr(self, SORT_COLUMNS[key])[index]
+
+    def duration(self, index):
+        return format_clock(self.seconds[index])
+
+    def published(self, index):
+        return time.strftime('%Y-%m-%d', time.gmtime(self.published_at[index]))
+
+    def rows_between(self, key, low=None, high=None):
+        """Return the rows whose key is within [low, high], in ascending key order"""
+        values, rows = self._sorted_index(key)
+        start = 0 if low is None else bisect_left(values, low)
+        end = len(values) if high is None else bisect_right(values, high)
+        return rows[start:end]
+
+    def extend(self, results):
+        for video_info in results:
+            self.append(video_info)
+
+    def _sorted_index(self, key):
+        """Return (sorted values, rows) of a key, merging in the rows appended since it was last used"""
+        values, rows = self._sorted[key]
+        if len(rows) < len(self.ids):
+            column = getattr(self, SORT_COLUMNS[key])
+            # sorted() is stable, so equal values keep arrival order
+            new_rows = sorted(range(len(rows), len(self.ids)), key=column.__getitem__)
+            values, rows = merge_sorted(values, rows, [column[index] for index in new_rows], new_rows)
+            self._sorted[key] = (values, rows)
+        return values, rows
+
+    def url(self, index):
+        return f"https://www.youtube.com/watch?v={self.ids[index]}"
+
+    def info(self, index):
+        """Rebuild the video_info dict of one row"""
+        return {
+            'id': self.ids[index],
+            'title': self.titles[index],
+            'channel': self.channels[index],
+            'published': self.published(index),
+            'published_at': self.published_at[index],
+            'url': self.url(index),
+            'duration': self.duration(index),
+            'duration_seconds': self.seconds[index],
+            'views': self.views[index],
+        }
+
+    def clear(self):
+        self.ids.clear()
+        self.titles.clear()
+        self.channels.clear()
+        self.published_at = array('q')
+        self.seconds = array('q')
+        self.views = array('q')
+        self._channel_names.clear()
+        self._sorted = {key: (array('q'), array('q')) for key in SORT_COLUMNS}
+
+
+class ResultOrder:
+    """Rows of a ResultStore in display order
+
+    Rows can be sorted by one key of SORT_COLUMNS and filtered by an
+    inclusive (low, high) range per key; either bound may be None. With
+    neither, rows are shown in arrival order and no list is kept. Each new
+    page is merged in with extend() instead of re-sorting everything.
+    """
+    __slots__ = ('store', 'key', 'descending', 'filters', 'rows', '_values')
+
+    def __init__(self, store):
+        self.store = store
+        self.key = None
+        self.descending = False
+        self.filters = {}
+        self.rows = None
+        self._values = None
+
+    def __len__(self):
+        return len(self.store) if self.rows is None else len(self.rows)
+
+    def row(self, position):
+        """Return the store index shown at a display position"""
+        return position if self.rows is None else self.rows[position]
+
+    def __iter__(self):
+        return iter(range(len(self.store)) if self.rows is None else self.rows)
+
+    def set(self, key=None, descending=False, filters=None):
+        """Change the sort key and filters and rebuild the order"""
+        self.key = key
+        self.descending = descending
+        self.filters = {name: bounds for name, bounds in (filters or {}).items() if bounds != (None, None)}
+        self.rebuild()
+
+    def matches(self, index):
+        for key, (low, high) in self.filters.items():
+            value = self.store.value(key, index)
+            if (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+
+    def rebuild(self):
+        if self.key is None and not self.filters:
+            self.rows = self._values = None
+            return
+        # Start from the sort key's index, narrowed by that key's own range
+        key = self.key or next(iter(self.filters))
+        low, high = self.filters.get(key, (None, None))
+        rows = [index for index in self.store.rows_between(key, low, high) if self.matches(index)]
+        if self.key is None:
+            rows.sort()
+        elif self.descending:
+            # Reversed key order, equal keys still in arrival order
+            rows.sort(key=lambda index: -self.store.value(self.key, index))
+        self.rows = rows
+        self._values = [self._sort_value(index) for index in rows]
+
+    def extend(self, start):
+        """Place the store rows appended since row `start`"""
+        if self.rows is None:
+            return
+        rows = sorted((index for index in range(start, len(self.store)) if self.matches(index)),
+                      key=self._sort_value)
+        self._values, self.rows = merge_sorted(self._values, self.rows, [self._sort_value(index) for index in rows],
+                                               rows)
+
+    def _sort_value(self, index):
+        if self.key is None:
+            return index
+        value = self.store.value(self.key, index)
+        return -value if self.descending else value
+
+
+def merge_sorted(values, rows, new_values, new_rows):
+    """Merge rows sorted by new_values into rows sorted by values; returns the new (values, rows)
+
+    Works on lists and arrays. Existing rows come first among equal
+    values. Runs between insertion points are copied as slices, so a
+    whole page costs one pass instead of one insert per row.
+    """
+    merged_values, merged_rows = values[:0], rows[:0]
+    previous = 0
+    for value, row in zip(new_values, new_rows):
+        position = bisect_right(values, value, previous)
+        merged_values += values[previous:position]
+        merged_rows += rows[previous:position]
+        merged_values.append(value)
+        merged_rows.append(row)
+        previous = position
+    merged_values += values[previous:]
+    merged_rows += rows[previous:]
+    return merged_values, merged_rows
+
+
+class SelectionBits:
+    """Row selection stored as one integer bitset
+
+    A row is selected when `invert` differs from its bit, so selecting or
+    clearing every row only resets the bitset and flips `invert`.
+    """
+    __slots__ = ('size', 'bits', 'invert')
+
+    def __init__(self, size=0):
+        self.size = size
+        self.bits = 0
+        self.invert = False
+
+    def __contains__(self, index):
+        return bool(self.bits >> index & 1) != self.invert
+
+    def __len__(self):
+        """Return the number of selected rows"""
+        flipped = bin(self.bits).count('1')
+        return self.size - flipped if self.invert else flipped
+
+    def grow(self, size):
+        """Add unselected rows up to size"""
+        if self.invert and size > self.size:
+            # New rows must not inherit an earlier select-all
+            self.bits |= ((1 << (size - self.size)) - 1) << self.size
+        self.size = max(self.size, size)
+
+    def toggle(self, index):
+        self.bits ^= 1 << index
+        return index in self
+
+    def select_all(self):
+        self.bits = 0
+        self.invert = True
+
+    def clear(self):
+        self.bits = 0
+        self.invert = False
+
+    def select(self, indexes):
+        """Select the given rows, leaving the others as they are"""
+        for index in indexes:
+            if index not in self:
+                self.bits ^= 1 << index
+
+    def reset(self, size=0):
+        self.size = size
+        self.clear()
+
+    def __iter__(self):
+        """Yield the selected row indexes in order"""
+        # One pass over the binary digits, lowest bit first
+        flags = bin(self.bits)[:1:-1]
+        for index in range(self.size):
+            flipped = index < len(flags) and flags[index] == '1'
+            if flipped != self.invert:
+                yield index
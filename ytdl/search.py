@@ -0,0 +1,273 @@
+"""YouTube Data API search"""
+import calendar
+import contextlib
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ytdl import cache as api_cache
+from ytdl.api import ApiClient
+from ytdl.details import DetailsFetcher
+
+# The API refuses maxResults above 50
+PAGE_SIZE = 50
+
+# Values accepted by the API's search filters
+VIDEO_DURATIONS = ('any', 'short', 'medium', 'long')
+SEARCH_ORDERS = ('relevance', 'date', 'viewCount', 'rating', 'title')
+# Languages and levels that build_search_query knows
+LANGUAGES = ('ja', 'zh', 'ko', 'en')
+LEVELS = ('beginner', 'intermediate', 'advanced')
+
+LANGUAGE_SUFFIXES = {
+    'ja': ' 日本語',
+    'zh': ' 中文',
+    'ko': ' 한국어',
+}
+
+
+def build_search_query(keyword, language, level):
+    """Modify search query based on language and level"""
+    return f"{keyword} {level} lesson" + LANGUAGE_SUFFIXES.get(language, '')
+
+
+def duration_seconds(duration_str):
+    """Parse ISO 8601 duration (PT1H2M3S, P1DT2H) to seconds"""
+    match = re.match(r'P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$', duration_str)
+    if not match:
+        return 0
+    days, hours, minutes, seconds = (int(value) if value else 0 for value in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def format_clock(total_seconds):
+    """Format seconds as H:MM:SS or M:SS"""
+    hours, rest = divmod(int(total_seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours > 0:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def parse_duration(duration_str):
+    """Parse ISO 8601 duration to readable format"""
+    return format_clock(duration_seconds(duration_str))
+
+
+def published_timestamp(published):
+    """Convert an RFC 3339 time or YYYY-MM-DD date (UTC) to epoch seconds"""
+    if not published:
+        return 0
+    return calendar.timegm(time.strptime(published[:19], '%Y-%m-%dT%H:%M:%S' if len(published) > 10 else '%Y-%m-%d'))
+
+
+def rfc3339(date):
+    """Turn YYYY-MM-DD into the RFC 3339 time the API expects; full times pass through"""
+    return date if 'T' in date else f"{date}T00:00:00Z"
+
+
+class SearchClient:
+    """Search for videos using YouTube Data API
+
+    Requests go through an ApiClient (pass a shared one to reuse its
+    connection pool and quota budget). If an ApiCache is given, search
+    responses and per-video details are served from it when fresh, so
+    repeated searches cost no quota. Video details are looked up through a
+    DetailsFetcher; pass a shared one so concurrent searches fill the same
+    50-ID batches.
+    """
+    def __init__(self, api_key, cache=None, client=None, details=None):
+        self.client = client or ApiClient(api_key)
+        self.cache = cache
+        self.details = details or DetailsFetcher(self.client, cache)
+
+    def search(self, keyword, language='ja', level='beginner', max_results=25, **filters):
+        """Return a list of video_info dicts for a keyword/language/level"""
+        return [video_info
+                for page in self.iter_pages(keyword, language, level, max_results, **filters)
+                for video_info in page]
+
+    def iter_pages(self, keyword, language='ja', level='beginner', max_results=25, **filters):
+        """Yield lists of video_info dicts, one per result page
+
+        Pages are fetched lazily by following nextPageToken until
+        max_results videos have been produced. The next search request runs
+        in the background while the current page's video details are
+        fetched, so the first page arrives after one search round trip and
+        later ones keep streaming in.
+
+        The filters duration ('short' < 4 min, 'medium' 4-20 min, 'long'
+        > 20 min), order (see SEARCH_ORDERS) and published_after /
+        published_before (YYYY-MM-DD or RFC 3339) are applied by the API,
+        so filtered-out videos cost no detail lookups.
+        """
+        for items in self._iter_items(keyword, language, level, max_results, **filters):
+            # Get video details (duration, view count, etc.)
+            video_details = self.get_video_details([item['id']['videoId'] for item in items])
+            page = [make_video_info(item, video_details.get(item['id']['videoId'], {})) for item in items]
+            if page:
+                yield page
+
+    def iter_matrix(self, keywords, languages, levels, max_results=25, workers=4, controller=None, **filters):
+        """Search every keyword x language x level combination and yield deduplicated pages
+
+        The searches run concurrently on `workers` threads and share the
+        ApiClient's rate limiter and quota budget. Videos found by more than
+        one search are kept once, tagged with the language and level of
+        the first search that returned them. Details of each new video are
+        requested as soon as it is seen and pages of PAGE_SIZE videos are
+        yielded in the order they were found. max_results applies to each
+        search. If a search fails, the other searches still finish and
+        the first error is raised at the end. With an AimdController the
+        number of concurrent searches follows its limit instead of
+        `workers`, and videos found per second are reported to it.
+        """
+        queries = [(keyword, language, level) for keyword in keywords for language in languages for level in levels]
+        events = queue.Queue()
+        stop_event = threading.Event()
+
+        def run_query(query):
+            started = time.monotonic()
+            found = 0
+            try:
+                with controller.slot() if controller is not None else contextlib.nullcontext():
+                    for items in self._iter_items(*query, max_results, **filters):
+                        if stop_event.is_set():
+                            break
+                        found += len(items)
+                        if controller is not None:
+                            controller.record(len(items))
+                        events.put((query, items))
+                if controller is not None:
+                    controller.record_job(True, found, time.monotonic() - started)
+            except Exception as e:
+                if controller is not None:
+                    controller.record_job(False, error=str(e))
+                events.put((query, e))
+            finally:
+                events.put((query, None))
+
+        if controller is not None:
+            workers = controller.maximum
+        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(queries))))
+        seen = set()
+        pending = []
+        errors = []
+        try:
+            for query in queries:
+                pool.submit(run_query, query)
+            remaining = len(queries)
+            while remaining:
+                query, items = events.get()
+                if items is None:
+                    remaining -= 1
+                elif isinstance(items, Exception):
+                    errors.append(items)
+                else:
+                    for item in items:
+                        video_id = item['id']['videoId']
+                        if video_id not in seen:
+                            seen.add(video_id)
+                            pending.append((item, query, self.details.submit(video_id)))
+                # Wait for a full page unless nothing more is coming
+                while len(pending) >= PAGE_SIZE or (pending and not remaining):
+                    batch, pending = pending[:PAGE_SIZE], pending[PAGE_SIZE:]
+                    yield self._details_page(batch)
+        finally:
+            stop_event.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+        if errors:
+            raise errors[0]
+
+    def _details_page(self, batch):
+        """Build video_info dicts for (search item, query, details future) triples"""
+        page = []
+        for item, (keyword, language, level), details in batch:
+            video_info = make_video_info(item, details.result())
+            video_info.update(keyword=keyword, language=language, level=level)
+            page.append(video_info)
+        return page
+
+    def _iter_items(self, keyword, language, level, max_results, duration=None, order=None,
+                    published_after=None, published_before=None):
+        """Yield the raw search items of each result page, prefetching the next page"""
+        params = {
+            'part': 'snippet',
+            'q': build_search_query(keyword, language, level),
+            'type': 'video',
+            'relevanceLanguage': language
+        }
+        if duration and duration != 'any':
+            params['videoDuration'] = duration
+        if order and order != 'relevance':
+            params['order'] = order
+        if published_after:
+            params['publishedAfter'] = rfc3339(published_after)
+        if published_before:
+            params['publishedBefore'] = rfc3339(published_before)
+
+        def fetch_page(page_token, remaining):
+            page_params = dict(params, maxResults=min(PAGE_SIZE, remaining))
+            if page_token:
+                page_params['pageToken'] = page_token
+            return self._get_cached('search', page_params, api_cache.SEARCH_TTL)
+
+        produced = 0
+        pool = ThreadPoolExecutor(max_workers=1)
+        try:
+            next_page = pool.submit(fetch_page, None, max_results)
+            while next_page is not None:
+                data = next_page.result()
+                items = data.get('items', [])[:max_results - produced]
+                produced += len(items)
+                
+                next_page = None
+                page_token = data.get('nextPageToken')
+                if items and page_token and produced < max_results:
+                    next_page = pool.submit(fetch_page, page_token, max_results - produced)
+                
+                if items:
+                    yield items
+        finally:
+            pool.shutdown(wait=False)
+
+    def get_video_details(self, video_ids):
+        """Return {video_id: {'contentDetails': ..., 'statistics': ...}}
+
+        Lookups go through the shared DetailsFetcher, which serves fresh
+        entries from the cache and batches the rest with other callers.
+        """
+        return self.details.get_many(video_ids)
+
+    def _get(self, endpoint, params):
+        return self.client.get(endpoint, params)
+
+    def _get_cached(self, endpoint, params, ttl):
+        if self.cache is None:
+            return self._get(endpoint, params)
+        key = api_cache.make_key(endpoint, params)
+        data = self.cache.get(key)
+        if data is None:
+            data = self._get(endpoint, params)
+            self.cache.set(key, data, ttl)
+        return data
+
+
+def make_video_info(item, details):
+    """Build the video_info dict for a search item and its details"""
+    video_id = item['id']['videoId']
+    snippet = item['snippet']
+    seconds = duration_seconds(details.get('contentDetails', {}).get('duration', 'PT0S'))
+    return {
+        'id': video_id,
+        'title': snippet['title'],
+        'channel': snippet['channelTitle'],
+        'published': snippet['publishedAt'][:10],
+        'published_at': published_timestamp(snippet['publishedAt']),
+        'url': f"https://www.youtube.com/watch?v={video_id}",
+        'duration': format_clock(seconds),
+        'duration_seconds': seconds,
+        'views': int(details.get('statistics', {}).get('viewCount', 0))
+    }
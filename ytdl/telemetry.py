@@ -0,0 +1,363 @@
+"""Tracing spans, counters and histograms
+
+Every pipeline stage runs inside a span: search and details requests,
+playlist extraction, and format selection, fetch and postprocess for
+each download job. A span adds its duration to the ytdl_stage_seconds
+histogram and, when a trace file is configured, is written to it as one
+JSON line tagged with the job and video it belongs to. Counters and
+histograms cover bytes, retries, cache hits and job outcomes.
+
+The registry is module level, like the logging module, so code deep in
+the engine can report without a handle being passed around:
+
+    from ytdl import telemetry
+
+    with telemetry.span('fetch', format='mp4') as attrs:
+        ...
+        attrs['bytes'] = size
+    telemetry.inc('ytdl_retries_total', source='api')
+
+Metrics are exported in the Prometheus text format with
+write_prometheus(path), export_to(path) (rewritten periodically) or
+serve_prometheus(port) (an HTTP /metrics endpoint). profile() wraps a
+block in cProfile, or pyinstrument when it is installed and asked for.
+"""
+import bisect
+import contextlib
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = tuple(2 ** n for n in range(16, 34, 2))
+EXPORT_INTERVAL = 15.0
+
+HELP = {
+    'ytdl_stage_seconds': "Wall-clock time spent in each pipeline stage",
+    'ytdl_job_bytes': "Bytes received per finished download job",
+    'ytdl_bytes_total': "Media bytes received",
+    'ytdl_api_requests_total': "YouTube Data API requests by endpoint and final status",
+    'ytdl_retries_total': "Retried requests by source (api, yt-dlp)",
+    'ytdl_cache_requests_total': "Cache lookups by cache and result",
+    'ytdl_jobs_total': "Download jobs finished, by state",
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction):
+        """Estimate a quantile as the upper bound of the bucket it falls in"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Telemetry:
+    """Thread-safe registry of counters, histograms and trace spans"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (name, sorted label items) -> value / Histogram
+        self._counters = {}
+        self._histograms = {}
+        self._trace = None
+        self._local = threading.local()
+        self._span_ids = itertools.count(1)
+        self._export_stop = None
+        self._export_thread = None
+        self._export_path = None
+
+    def configure(self, trace_path=None):
+        """Append spans to trace_path as JSON lines (None stops tracing)"""
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+            self._trace = open(trace_path, 'a', encoding='utf-8', buffering=1) if trace_path else None
+
+    @property
+    def tracing(self):
+        return self._trace is not None
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextlib.contextmanager
+    def context(self, **fields):
+        """Tag every span started by this thread inside the block, e.g. with job=..."""
+        previous = getattr(self._local, 'fields', {})
+        self._local.fields = {**previous, **fields}
+        try:
+            yield
+        finally:
+            self._local.fields = previous
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """Time a stage; yields a dict the block can add attributes to"""
+        stack = self._local.__dict__.setdefault('stack', [])
+        span_id = next(self._span_ids)
+        parent = stack[-1] if stack else None
+        stack.append(span_id)
+        started_at = time.time()
+        started = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            stack.pop()
+            self.observe('ytdl_stage_seconds', duration, stage=name)
+            if self._trace is not None:
+                record = {'type': 'span', 'name': name, 'id': span_id, 'parent': parent, 'pid': os.getpid(),
+                          'start': round(started_at, 6), 'duration': round(duration, 6),
+                          **getattr(self._local, 'fields', {}), **attrs}
+                if error:
+                    record['error'] = error
+                self.event(record)
+
+    def event(self, record):
+        """Write one record to the trace file, if tracing"""
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            if self._trace is not None:
+                self._trace.write(line)
+
+    def snapshot(self):
+        """Return counters and histograms as a JSON-serialisable dict"""
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels), 'count': histogram.count,
+                           'sum': round(histogram.sum, 6), 'p50': histogram.quantile(0.5),
+                           'p95': histogram.quantile(0.95)}
+                          for (name, labels), histogram in sorted(self._histograms.items())]
+        return {'counters': counters, 'histograms': histograms}
+
+    def render_prometheus(self):
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                describe(name, 'counter')
+                lines.append(f"{name}{format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                describe(name, 'histogram')
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else str(bound)
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write the metrics to path atomically (for node_exporter's textfile collector)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def export_to(self, path, interval=EXPORT_INTERVAL):
+        """Rewrite path with the metrics every interval seconds until close()"""
+        self._export_path = path
+        self._export_stop = threading.Event()
+
+        def run(stop):
+            while not stop.wait(interval):
+                self.write_prometheus(path)
+
+        self._export_thread = threading.Thread(target=run, args=(self._export_stop,), daemon=True)
+        self._export_thread.start()
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def close(self):
+        """Write the final metrics to the export file and the trace, and stop both"""
+        if self._export_stop is not None:
+            self._export_stop.set()
+            self._export_thread.join()
+            self.write_prometheus(self._export_path)
+            self._export_stop = self._export_thread = self._export_path = None
+        if self._trace is not None:
+            self.event({'type': 'metrics', 'time': round(time.time(), 3), **self.snapshot()})
+        self.configure(None)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (f'{key}="{escape_label(value)}"' for key, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Telemetry()
+configure = registry.configure
+inc = registry.inc
+observe = registry.observe
+context = registry.context
+span = registry.span
+event = registry.event
+snapshot = registry.snapshot
+render_prometheus = registry.render_prometheus
+write_prometheus = registry.write_prometheus
+export_to = registry.export_to
+close = registry.close
+
+
+def serve_prometheus(port, host='127.0.0.1', telemetry=registry):
+    """Serve the metrics at http://host:port/metrics from a background thread; returns the server"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = telemetry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def configure_from_env():
+    """Set up tracing and exports from YTDL_TRACE, YTDL_PROMETHEUS_FILE and YTDL_METRICS_PORT"""
+    if os.getenv('YTDL_TRACE'):
+        configure(os.getenv('YTDL_TRACE'))
+    if os.getenv('YTDL_PROMETHEUS_FILE'):
+        export_to(os.getenv('YTDL_PROMETHEUS_FILE'))
+    if os.getenv('YTDL_METRICS_PORT'):
+        serve_prometheus(int(os.getenv('YTDL_METRICS_PORT')))
+
+
+@contextlib.contextmanager
+def profile(path, profiler='cprofile'):
+    """Profile the block (this thread only) and save the result
+
+    cProfile output goes to path as a .prof file for pstats or snakeviz;
+    pyinstrument, if installed, writes an HTML report next to it. The
+    yielded dict's 'path' is the file that gets written.
+    """
+    result = {'path': path}
+    if profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed; profiling with cProfile")
+            profiler = 'cprofile'
+    if profiler == 'pyinstrument':
+        result['path'] = os.path.splitext(path)[0] + '.html'
+        instrument = Profiler()
+        instrument.start()
+        try:
+            yield result
+        finally:
+            instrument.stop()
+            with open(result['path'], 'w', encoding='utf-8') as f:
+                f.write(instrument.output_html())
+    else:
+        import cProfile
+
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+        try:
+            yield result
+        finally:
+            cprofile.disable()
+            cprofile.dump_stats(path)
+    logger.info("Profile written to %s", result['path'])
+
+
+def summarize_trace(path):
+    """Read a trace file and return (jobs, stages)
+
+    jobs is a list of {'pid', 'job', 'video_id', 'stages'} in order of
+    appearance, where stages maps each span name (plus 'queued' and
+    'total' from the job record) to seconds. stages maps every span name
+    to [count, seconds] over the whole trace, jobs or not.
+    """
+    jobs = {}
+    stages = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            kind = record.get('type')
+            if kind == 'span':
+                totals = stages.setdefault(record['name'], [0, 0.0])
+                totals[0] += 1
+                totals[1] += record['duration']
+            if kind not in ('span', 'job') or record.get('job') is None:
+                continue
+            entry = jobs.setdefault((record.get('pid'), record['job']),
+                                    {'pid': record.get('pid'), 'job': record['job'], 'video_id': None, 'stages': {}})
+            entry['video_id'] = record.get('video_id') or entry['video_id']
+            if kind == 'span':
+                entry['stages'][record['name']] = entry['stages'].get(record['name'], 0.0) + record['duration']
+            else:
+                entry['stages']['queued'] = record['queued']
+                entry['stages']['total'] = record['total']
+    return list(jobs.values()), stages
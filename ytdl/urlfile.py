@@ -0,0 +1,101 @@
+"""Streaming import of URL list files into the download scheduler
+
+Files such as the <playlist>_urls.txt written by playlist extraction are
+read line by line and submitted as they are read. Submission pauses
+while the scheduler already has max_pending jobs waiting, so a list with
+tens of thousands of lines never sits in memory. Duplicate videos are
+skipped as they appear, and with a journal the byte offset reached in
+each file is checkpointed periodically for resume.
+"""
+import time
+
+from ytdl.utils import extract_video_id
+
+
+def iter_url_lines(path, offset=0):
+    """Yield (url, offset_after_line, is_url) for each line from a byte offset
+
+    Blank lines and lines starting with '#' are yielded with is_url False
+    so the caller can still advance its offset past them.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for raw in f:
+            offset += len(raw)
+            url = raw.decode('utf-8', 'replace').strip()
+            yield url, offset, bool(url) and not url.startswith('#')
+
+
+class UrlFileImporter:
+    """Feed URL list files into a DownloadScheduler without loading them
+
+    submit_options (priority, group, output_dir, ...) are passed on to
+    every scheduler.submit() call.
+    """
+    def __init__(self, scheduler, output_format, journal=None, batch_id=None,
+                 max_pending=None, checkpoint_every=200, **submit_options):
+        self.scheduler = scheduler
+        self.output_format = output_format
+        self.submit_options = submit_options
+        self.journal = journal
+        self.batch_id = batch_id
+        self.max_pending = max_pending or scheduler.max_workers * 4
+        self.checkpoint_every = checkpoint_every
+        self.lines = 0
+        self.submitted = 0
+        self.duplicates = 0
+        self._seen = set()
+
+    def seed(self, urls):
+        """Mark URLs as already submitted, e.g. the jobs of a resumed batch"""
+        for url in urls:
+            self._seen.add(extract_video_id(url) or url)
+
+    def import_file(self, path, offset=0, lines=0, should_stop=None, on_progress=None):
+        """Submit the URLs of one file starting at a byte offset
+
+        Returns True if the file was read to the end, False if should_stop()
+        interrupted it (the checkpoint then points at the next line).
+        """
+        if self.journal is not None:
+            self.journal.add_import(self.batch_id, path)
+        for url, offset, is_url in iter_url_lines(path, offset):
+            lines += 1
+            self.lines += 1
+            if is_url:
+                key = extract_video_id(url) or url
+                if key in self._seen:
+                    self.duplicates += 1
+                else:
+                    self._seen.add(key)
+                    if not self._wait_for_capacity(should_stop):
+                        return False
+                    self.scheduler.submit(url, self.output_format, batch_id=self.batch_id, **self.submit_options)
+                    self.submitted += 1
+            if lines % self.checkpoint_every == 0:
+                self._checkpoint(path, offset, lines)
+                if on_progress:
+                    on_progress(path, lines)
+        self._checkpoint(path, offset, lines, done=True)
+        if on_progress:
+            on_progress(path, lines)
+        return True
+
+    def run(self, imports, should_stop=None, on_progress=None):
+        """Import a list of {'path', 'offset', 'lines'} dicts in order"""
+        for entry in imports:
+            if not self.import_file(entry['path'], entry.get('offset', 0), entry.get('lines', 0),
+                                    should_stop, on_progress):
+                return False
+        return True
+
+    def _wait_for_capacity(self, should_stop):
+        while self.scheduler.pending() >= self.max_pending:
+            if should_stop and should_stop():
+                return False
+            time.sleep(0.1)
+        return not (should_stop and should_stop())
+
+    def _checkpoint(self, path, offset, lines, done=False):
+        if self.journal is not None:
+            self.journal.save_checkpoint(self.batch_id, path, offset, lines, done)
@@ -0,0 +1,45 @@
+"""Small helpers shared by the GUI and the CLI"""
+import os
+import re
+from pathlib import Path
+
+
+def default_output_dir_path():
+    """Return the default download folder without creating it"""
+    return str(Path.home() / "Downloads" / "YouTube_Audio")
+
+
+def default_output_dir():
+    """Return the default download folder, creating it if needed"""
+    output_dir = default_output_dir_path()
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
+
+
+def sanitize_filename(name):
+    """Remove characters that are invalid for filenames."""
+    return re.sub(r'[\\/*?:"<>|]', "_", name)
+
+
+def data_dir():
+    """Return the folder for caches and state files, creating it if needed
+
+    Defaults to ~/.youtube_downloader and can be moved with YTDL_DATA_DIR.
+    """
+    path = os.getenv('YTDL_DATA_DIR') or str(Path.home() / ".youtube_downloader")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+VIDEO_ID_PATTERN = re.compile(
+    r'(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/|v/)|youtu\.be/)([0-9A-Za-z_-]{11})'
+)
+
+
+def extract_video_id(url):
+    """Return the 11-character video ID of a YouTube URL without any network call
+
+    Returns None for URLs that are not recognisable single-video URLs.
+    """
+    match = VIDEO_ID_PATTERN.search(url)
+    return match.group(1) if match else None